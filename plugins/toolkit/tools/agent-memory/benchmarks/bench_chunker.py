@@ -0,0 +1,140 @@
+# ABOUTME: Microbenchmark for the chunker — streaming iter_chunks vs whole-text chunk_markdown.
+# ABOUTME: Reports MB/s and peak traced memory on a synthetic session transcript.
+
+"""Usage: python benchmarks/bench_chunker.py [--mb N] [--baseline GIT_REF]
+
+Writes a synthetic transcript of about --mb megabytes (headed turns, long
+tool-output sections with no headings, blank runs) to a temp file, then
+chunks it three ways:
+
+  read+list   Path.read_text() then chunk_markdown(), as indexing used to
+  stream      iter_chunks() over 64 KB reads of the file, keeping the chunks
+  stream/drop the same, discarding each chunk (the chunker's own cost)
+
+--baseline loads chunker.py from a git revision (e.g. HEAD~1) and adds a
+read+list row for it. Peak memory is traced by tracemalloc, so it counts
+Python allocations only; timings are from a separate untraced run.
+"""
+
+import argparse
+import importlib.util
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import agent_memory
+from agent_memory.chunker import iter_chunks
+
+_BLOCK = 1 << 16
+
+
+def _write_transcript(path: Path, megabytes: float) -> None:
+    rng = random.Random(0)
+    words = ["memory", "index", "vector", "search", "decided", "session",
+             "sqlite", "embedding", "agent", "refactor", "test", "deploy"]
+    target = int(megabytes * 1_000_000)
+    written = turn = 0
+    with path.open("w") as f:
+        while written < target:
+            turn += 1
+            lines = [f"## Turn {turn}\n", "\n"]
+            for _ in range(rng.randint(1, 6)):
+                lines.append(" ".join(rng.choices(words, k=rng.randint(5, 30))) + "\n")
+            if turn % 7 == 0:  # long tool output, split by size
+                lines.extend(
+                    f"{i:05d} | " + " ".join(rng.choices(words, k=12)) + "\n"
+                    for i in range(rng.randint(50, 400))
+                )
+            lines.append("\n" * rng.randint(1, 3))
+            block = "".join(lines)
+            f.write(block)
+            written += len(block)
+
+
+def _load_baseline(ref: str):
+    """Import chunker.py as it was at a git revision, as a sibling module."""
+    src = Path(agent_memory.__file__).with_name("chunker.py")
+    rel = subprocess.run(
+        ["git", "ls-files", "--full-name", src.name], cwd=src.parent,
+        capture_output=True, text=True, check=True,
+    ).stdout.strip()
+    code = subprocess.run(
+        ["git", "show", f"{ref}:{rel}"], cwd=src.parent,
+        capture_output=True, text=True, check=True,
+    ).stdout
+    spec = importlib.util.spec_from_loader("agent_memory._chunker_baseline", loader=None)
+    module = importlib.util.module_from_spec(spec)
+    module.__package__ = "agent_memory"
+    sys.modules[spec.name] = module  # dataclasses look their module up
+    exec(compile(code, f"{ref}:{rel}", "exec"), module.__dict__)
+    return module
+
+
+def _read_list(chunker):
+    def run(path: Path) -> int:
+        return len(chunker.chunk_markdown(path.read_text(), str(path)))
+    return run
+
+
+def _blocks(f):
+    """Read in fixed-size blocks, as the indexer does, rather than by line."""
+    return iter(lambda: f.read(_BLOCK), "")
+
+
+def _stream(path: Path) -> int:
+    with path.open() as f:
+        return len(list(iter_chunks(_blocks(f), str(path))))
+
+
+def _stream_drop(path: Path) -> int:
+    n = 0
+    with path.open() as f:
+        for _ in iter_chunks(_blocks(f), str(path)):
+            n += 1
+    return n
+
+
+def _measure(fn, path: Path) -> tuple[float, float, int]:
+    """Return (seconds, peak traced MB, chunks)."""
+    start = time.perf_counter()
+    chunks = fn(path)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    fn(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak / 1e6, chunks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=float, default=50)
+    parser.add_argument("--baseline", help="git revision to load chunker.py from")
+    args = parser.parse_args()
+
+    runs = [("read+list", _read_list(sys.modules["agent_memory.chunker"]))]
+    if args.baseline:
+        runs.insert(0, (f"{args.baseline} read+list", _read_list(_load_baseline(args.baseline))))
+    runs += [("stream", _stream), ("stream/drop", _stream_drop)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "transcript.md"
+        _write_transcript(path, args.mb)
+        size = path.stat().st_size / 1e6
+        print(f"{size:.1f} MB transcript")
+        counts = set()
+        for name, fn in runs:
+            seconds, peak, chunks = _measure(fn, path)
+            counts.add(chunks)
+            print(f"  {name:>18}: {seconds:6.2f}s  {size / seconds:6.1f} MB/s  "
+                  f"peak {peak:7.1f} MB  {chunks} chunks")
+        if len(counts) > 1:
+            print("  WARNING: chunk counts differ between implementations")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# ABOUTME: Scaling benchmark for embedding throughput across FastEmbed data-parallel workers.
+# ABOUTME: Reports chunks/sec and speedup for 1..N workers on synthetic chunk text.
+
+"""Usage: python benchmarks/bench_embed_scaling.py [--chunks N] [--max-workers N]
+
+Loads the real embedding model (run `agent-memory install` first). Worker
+counts double from 1 up to --max-workers (default: CPU count), always
+including the maximum. Each run includes FastEmbed's worker pool startup,
+as `index --workers` does. AGENT_MEMORY_EMBED_THREADS and
+AGENT_MEMORY_EMBED_BATCH_SIZE apply as they do for indexing.
+"""
+
+import argparse
+import os
+import random
+import time
+
+from agent_memory.config import CHUNK_MAX_CHARS, get_embed_batch_size
+
+
+def _make_chunks(n: int) -> list[str]:
+    rng = random.Random(0)
+    words = ["memory", "index", "vector", "search", "decided", "session",
+             "sqlite", "embedding", "agent", "refactor", "test", "deploy"]
+    chunks = []
+    for _ in range(n):
+        text = " ".join(rng.choice(words) for _ in range(CHUNK_MAX_CHARS // 8))
+        chunks.append(text[:CHUNK_MAX_CHARS])
+    return chunks
+
+
+def _worker_counts(max_workers: int) -> list[int]:
+    counts = []
+    n = 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    counts.append(max_workers)
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=4096)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    import agent_memory.embedder as embedder
+
+    embedder.disable_daemon()
+    chunks = _make_chunks(args.chunks)
+    embedder.embed_texts_array(chunks[:8])  # load the model outside the timings
+
+    print(f"{args.chunks} chunks of ~{CHUNK_MAX_CHARS} chars, "
+          f"batch size {get_embed_batch_size()}, {os.cpu_count()} CPUs")
+    baseline = None
+    for workers in _worker_counts(args.max_workers):
+        embedder.set_workers(workers)
+        start = time.perf_counter()
+        embedder.embed_texts_array(chunks)
+        rate = args.chunks / (time.perf_counter() - start)
+        baseline = baseline or rate
+        print(f"workers={workers:>3}: {rate:9.1f} chunks/s  x{rate / baseline:.2f}")
+
+
+if __name__ == "__main__":
+    main()
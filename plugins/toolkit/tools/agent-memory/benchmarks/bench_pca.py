@@ -0,0 +1,120 @@
+# ABOUTME: Benchmark for the PCA-reduced vector index — recall@k vs latency per dimension.
+# ABOUTME: Compares exact float32 KNN with PCA shortlists re-ranked by full vectors.
+
+"""Usage: python benchmarks/bench_pca.py [--chunks N] [--queries N] [--k N]
+                                       [--dims 32,64,128,192] [--multiplier N]
+                                       [--decay X]
+
+Uses synthetic unit vectors whose variance decays across dimensions
+(axis i scaled by i**-decay), as sentence embeddings' does; PCA has
+nothing to exploit in isotropic noise, so lower --decay is the harder case. Each row runs against the same database:
+the PCA index is rebuilt per dimension and queried through knn(), so
+re-ranking reads the embedding cache exactly as search does.
+"""
+
+import argparse
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+import agent_memory.vectors as vectors_mod
+from agent_memory.cache import cache_store
+from agent_memory.config import EMBEDDING_DIM, RERANK_MULTIPLIER
+from agent_memory.db import init_db
+from agent_memory.store import insert_chunks
+from agent_memory.vectors import build_projection, drop_projection, knn
+
+_BATCH = 1000
+
+
+def _make_vectors(n: int, decay: float, seed: int = 0) -> np.ndarray:
+    """Unit vectors with a power-law spectrum in a random orientation."""
+    rng = np.random.default_rng(0)
+    rotation, _ = np.linalg.qr(rng.standard_normal((EMBEDDING_DIM, EMBEDDING_DIM)))
+    scale = np.arange(1, EMBEDDING_DIM + 1) ** -decay
+    rng = np.random.default_rng(seed)
+    vectors = (rng.standard_normal((n, EMBEDDING_DIM)) * scale) @ rotation
+    vectors = vectors.astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _table_bytes(conn: sqlite3.Connection, name: str) -> int | None:
+    """Bytes used by a vec0 table's shadow tables, if dbstat is available."""
+    try:
+        return conn.execute(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name LIKE ?", (f"{name}%",)
+        ).fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+
+
+def _populate(conn: sqlite3.Connection, vectors: np.ndarray) -> list[int]:
+    rowids: list[int] = []
+    for start in range(0, len(vectors), _BATCH):
+        batch = vectors[start:start + _BATCH]
+        rows = [
+            (f"id-{i}", "/bench.md", "memory", i, i, f"hash-{i}", "", f"chunk {i}")
+            for i in range(start, start + len(batch))
+        ]
+        cache_store(conn, {row[5]: vec for row, vec in zip(rows, batch)})
+        rowids.extend(insert_chunks(conn, rows, batch))
+        conn.commit()
+    return rowids
+
+
+def _measure(conn, rowids, queries, truth, k: int) -> tuple[float, float, float]:
+    """Return (p50 ms, p95 ms, recall@k) of knn() over the queries."""
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = knn(conn, query, k)
+        latencies.append(time.perf_counter() - start)
+        hits += len({rowid for rowid, _ in found} & set(rowids[expected].tolist()))
+    return (np.median(latencies) * 1000, np.percentile(latencies, 95) * 1000,
+            hits / (len(queries) * k))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--dims", default="32,64,128,192")
+    parser.add_argument("--multiplier", type=int, default=RERANK_MULTIPLIER["pca"])
+    parser.add_argument("--decay", type=float, default=0.5)
+    args = parser.parse_args()
+    # knn reads the shortlist size from the module-level table
+    vectors_mod.RERANK_MULTIPLIER = {**RERANK_MULTIPLIER, "pca": args.multiplier}
+
+    vectors = _make_vectors(args.chunks, args.decay)
+    queries = _make_vectors(args.queries, args.decay, seed=1)
+    truth = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.k]
+
+    print(f"{args.chunks} chunks x {EMBEDDING_DIM} dims, {args.queries} queries, "
+          f"decay {args.decay}, shortlist {args.multiplier}k")
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = init_db(Path(tmp) / "pca.db")
+        rowids = np.array(_populate(conn, vectors))
+
+        p50, p95, recall = _measure(conn, rowids, queries, truth, args.k)
+        size = _table_bytes(conn, "chunks_vec")
+        print(f" full {EMBEDDING_DIM:>3}: index {size / 1e6:6.1f} MB  fit      -  "
+              f"p50 {p50:7.2f} ms  p95 {p95:7.2f} ms  recall@{args.k} {recall:.3f}")
+
+        for dims in (int(d) for d in args.dims.split(",")):
+            start = time.perf_counter()
+            build_projection(conn, dims)
+            fit = time.perf_counter() - start
+            p50, p95, recall = _measure(conn, rowids, queries, truth, args.k)
+            size = _table_bytes(conn, "chunks_vec_pca")
+            print(f"  pca {dims:>3}: index {size / 1e6:6.1f} MB  fit {fit:5.1f}s  "
+                  f"p50 {p50:7.2f} ms  p95 {p95:7.2f} ms  recall@{args.k} {recall:.3f}")
+        drop_projection(conn)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# ABOUTME: Benchmark for chunks_vec storage types — float32 vs int8 vs bit quantization.
+# ABOUTME: Reports index and cache size, KNN latency, and recall@k against exact float search.
+
+"""Usage: python benchmarks/bench_quantization.py [--chunks N] [--queries N] [--k N]
+                                                [--storage float32|float16]
+
+Uses synthetic clustered unit vectors (no model). Each storage type gets
+its own throwaway database populated through the normal store path, so
+quantized runs re-rank against the float32 embedding cache exactly as
+search does. --storage sets the element type of the embedding cache.
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from agent_memory.cache import cache_store
+from agent_memory.config import EMBEDDING_DIM, VEC_QUANTIZATIONS
+from agent_memory.db import init_db
+from agent_memory.store import insert_chunks
+from agent_memory.vectors import knn
+
+_BATCH = 1000
+
+
+def _make_vectors(n: int, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(n // 50, 1), EMBEDDING_DIM))
+    vectors = centers[rng.integers(0, len(centers), n)]
+    vectors = vectors + 0.6 * rng.standard_normal((n, EMBEDDING_DIM))
+    vectors = vectors.astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _table_bytes(conn: sqlite3.Connection, pattern: str) -> int | None:
+    """Bytes used by tables and indexes matching pattern, if dbstat is available."""
+    try:
+        row = conn.execute(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name LIKE ?", (pattern,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0]
+
+
+def _populate(conn: sqlite3.Connection, vectors: np.ndarray) -> list[int]:
+    rowids: list[int] = []
+    for start in range(0, len(vectors), _BATCH):
+        batch = vectors[start:start + _BATCH]
+        rows = [
+            (f"id-{i}", "/bench.md", "memory", i, i, f"hash-{i}", "", f"chunk {i}")
+            for i in range(start, start + len(batch))
+        ]
+        cache_store(conn, {row[5]: vec for row, vec in zip(rows, batch)})
+        rowids.extend(insert_chunks(conn, rows, batch))
+        conn.commit()
+    return rowids
+
+
+def _run(quantization: str, vectors, queries, truth, k: int, tmp: Path) -> None:
+    os.environ["AGENT_MEMORY_VEC_QUANTIZATION"] = quantization
+    conn = init_db(tmp / f"{quantization}.db")
+    rowids = np.array(_populate(conn, vectors))
+
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = knn(conn, query, k)
+        latencies.append(time.perf_counter() - start)
+        hits += len({rowid for rowid, _ in found} & set(rowids[expected].tolist()))
+    size = _table_bytes(conn, "chunks_vec%")
+    cache_size = _table_bytes(conn, "%embedding_cache%")
+    conn.close()
+
+    def mb(value: int | None) -> str:
+        return f"{value / 1e6:6.1f} MB" if value is not None else "   n/a"
+
+    print(f"{quantization:>6}: index {mb(size)}  cache {mb(cache_size)}  "
+          f"p50 {np.median(latencies) * 1000:7.2f} ms  "
+          f"p95 {np.percentile(latencies, 95) * 1000:7.2f} ms  "
+          f"recall@{k} {hits / (len(queries) * k):.3f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--storage", choices=["float32", "float16"], default="float32")
+    args = parser.parse_args()
+    os.environ["AGENT_MEMORY_EMBED_STORAGE"] = args.storage
+
+    vectors = _make_vectors(args.chunks)
+    queries = _make_vectors(args.queries, seed=1)
+    truth = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.k]
+
+    print(f"{args.chunks} chunks x {EMBEDDING_DIM} dims, {args.queries} queries, "
+          f"{args.storage} cache")
+    with tempfile.TemporaryDirectory() as tmp:
+        for quantization in VEC_QUANTIZATIONS:
+            _run(quantization, vectors, queries, truth, args.k, Path(tmp))
+
+
+if __name__ == "__main__":
+    main()
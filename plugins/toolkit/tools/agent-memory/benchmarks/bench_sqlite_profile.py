@@ -0,0 +1,114 @@
+# ABOUTME: Benchmark for the SQLite connection profiles — index and search throughput.
+# ABOUTME: Builds one database per profile from the same synthetic chunks and times both.
+
+"""Usage: python benchmarks/bench_sqlite_profile.py [--chunks N] [--batch N]
+                                                  [--queries N] [--profiles a,b]
+
+Each profile (see SQLITE_PROFILES) gets its own database, filled with
+the same synthetic chunks and vectors through insert_chunks(), one commit
+per --batch chunks as incremental indexing does. Search then reopens the
+database with open_db() and runs BM25 (search_keyword) and vector (knn)
+queries. Vectors are random unit vectors, so no model is loaded; the
+numbers cover SQLite alone. The OS page cache is warm for every run, so
+mmap's gain on databases larger than RAM shows up less here.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from agent_memory.cache import cache_store
+from agent_memory.config import EMBEDDING_DIM, SQLITE_PROFILES
+from agent_memory.db import init_db, open_db
+from agent_memory.search import search_keyword
+from agent_memory.store import insert_chunks
+from agent_memory.vectors import knn
+
+_WORDS = ["memory", "index", "vector", "search", "decided", "session", "sqlite",
+          "embedding", "agent", "refactor", "test", "deploy", "cache", "daemon",
+          "chunk", "schema", "migration", "profile", "latency", "budget"]
+
+
+def _chunks(n: int, seed: int = 0):
+    """Yield (row, vector) pairs: short random-word texts with unit vectors."""
+    rng = random.Random(seed)
+    vectors = np.random.default_rng(seed).standard_normal((n, EMBEDDING_DIM))
+    vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+    for i in range(n):
+        text = " ".join(rng.choices(_WORDS, k=rng.randint(40, 200))) + f" note{i}"
+        row = (f"id-{i}", f"/logs/{i // 50}.md", "daily", i, i, f"hash-{i}", "", text)
+        yield row, vectors[i]
+
+
+def _index(db: Path, n: int, batch: int) -> float:
+    """Insert n chunks, committing every batch; return chunks per second."""
+    conn = init_db(db)
+    start = time.perf_counter()
+    rows, vectors = [], []
+    for row, vector in _chunks(n):
+        rows.append(row)
+        vectors.append(vector)
+        if len(rows) == batch:
+            _store(conn, rows, vectors)
+            rows, vectors = [], []
+    if rows:
+        _store(conn, rows, vectors)
+    seconds = time.perf_counter() - start
+    conn.close()
+    return n / seconds
+
+
+def _store(conn, rows, vectors) -> None:
+    vectors = np.stack(vectors)
+    cache_store(conn, {row[5]: vec for row, vec in zip(rows, vectors)})
+    insert_chunks(conn, rows, vectors)
+    conn.commit()
+
+
+def _search(db: Path, queries: int, k: int = 20) -> tuple[float, float]:
+    """Return (BM25 queries/s, vector queries/s) on a freshly opened connection."""
+    rng = random.Random(1)
+    terms = [" ".join(rng.sample(_WORDS, 2)) for _ in range(queries)]
+    vectors = np.random.default_rng(1).standard_normal((queries, EMBEDDING_DIM))
+    vectors = vectors.astype(np.float32)
+
+    conn = open_db(db)
+    start = time.perf_counter()
+    for term in terms:
+        search_keyword(conn, term, limit=k)
+    keyword = queries / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for vector in vectors:
+        knn(conn, vector, k)
+    vector_qps = queries / (time.perf_counter() - start)
+    conn.close()
+    return keyword, vector_qps
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--profiles", default=",".join(SQLITE_PROFILES))
+    args = parser.parse_args()
+
+    print(f"{args.chunks} chunks, commit every {args.batch}, {args.queries} queries")
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in args.profiles.split(","):
+            os.environ["AGENT_MEMORY_SQLITE_PROFILE"] = profile
+            db = Path(tmp) / f"{profile}.db"
+            index_rate = _index(db, args.chunks, args.batch)
+            keyword, vector = _search(db, args.queries)
+            size = db.stat().st_size / 1e6
+            print(f"  {profile:>8}: index {index_rate:7.0f} chunks/s  "
+                  f"bm25 {keyword:7.0f} q/s  knn {vector:6.0f} q/s  ({size:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
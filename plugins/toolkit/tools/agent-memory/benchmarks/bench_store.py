@@ -0,0 +1,100 @@
+# ABOUTME: Benchmark for bulk chunk writes — per-row statements vs multi-row INSERTs.
+# ABOUTME: Reports chunks/sec and top-level SQL statements per chunk for each approach.
+
+"""Usage: python benchmarks/bench_store.py [--chunks N]
+
+Runs against a throwaway database with synthetic vectors, so no model is
+loaded. The "legacy" path mirrors the original loop of per-chunk statements,
+written against the current chunk_texts/chunk_locations tables; "bulk" is
+agent_memory.store.insert_chunks.
+"""
+
+import argparse
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from agent_memory.config import EMBEDDING_DIM
+from agent_memory.db import has_sqlite_vec, init_db
+from agent_memory.embedder import serialize_f32
+from agent_memory.store import insert_chunks
+
+
+def _legacy_insert(conn: sqlite3.Connection, rows, vectors) -> None:
+    """Original approach: text, id lookup, location, FTS and vec statements per chunk."""
+    for row, vec in zip(rows, vectors):
+        chunk_id, path, source, start_line, end_line, c_hash, model, text = row
+        conn.execute(
+            "INSERT OR IGNORE INTO chunk_texts (hash, model, text) VALUES (?, ?, ?)",
+            (c_hash, model, text),
+        )
+        rowid = conn.execute(
+            "SELECT id FROM chunk_texts WHERE hash = ?", (c_hash,)
+        ).fetchone()[0]
+        conn.execute(
+            "INSERT OR REPLACE INTO chunk_locations "
+            "(id, text_id, path, source, start_line, end_line) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (chunk_id, rowid, path, source, start_line, end_line),
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO chunks_fts (rowid, text) VALUES (?, ?)",
+            (rowid, row[7]),
+        )
+        if has_sqlite_vec():
+            conn.execute(
+                "INSERT OR REPLACE INTO chunks_vec (rowid, embedding) VALUES (?, ?)",
+                (rowid, serialize_f32(vec)),
+            )
+
+
+def _make_rows(n: int):
+    rng = random.Random(0)
+    words = ["memory", "index", "vector", "search", "chunk", "sqlite", "note"]
+    rows, vectors = [], []
+    for i in range(n):
+        text = " ".join(rng.choice(words) for _ in range(60))
+        rows.append((f"id-{i}", f"/notes/{i // 50}.md", "memory", i, i + 10,
+                     f"hash-{i}", "", text))
+        vectors.append([rng.random() for _ in range(EMBEDDING_DIM)])
+    return rows, vectors
+
+
+def _run(name: str, insert, rows, vectors) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = init_db(Path(tmp) / "bench.db")
+        statements = []
+        conn.set_trace_callback(statements.append)
+        start = time.perf_counter()
+        insert(conn, rows, vectors)
+        conn.commit()
+        elapsed = time.perf_counter() - start
+        conn.set_trace_callback(None)
+        conn.close()
+
+    # Statements run inside FTS5/vec0 are traced with a "--" prefix
+    top_level = [
+        s for s in statements
+        if not s.startswith("--") and s.strip() not in ("BEGIN", "COMMIT")
+    ]
+    print(f"{name:>7}: {len(rows) / elapsed:9.0f} chunks/s  "
+          f"{len(top_level) / len(rows):6.3f} statements/chunk  "
+          f"({elapsed:.3f}s)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=5000)
+    args = parser.parse_args()
+
+    rows, vectors = _make_rows(args.chunks)
+    print(f"{args.chunks} chunks, {EMBEDDING_DIM}-dim vectors, "
+          f"sqlite {sqlite3.sqlite_version}, sqlite-vec={has_sqlite_vec()}")
+    _run("legacy", _legacy_insert, rows, vectors)
+    _run("bulk", insert_chunks, rows, vectors)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# ABOUTME: Benchmark for vector handling — Python float lists vs float32 ndarrays.
+# ABOUTME: Times the model-output → SQLite-blob path and the cache read-back path.
+
+"""Usage: python benchmarks/bench_vectors.py [--vectors N]
+
+Uses random float32 rows in place of model output, so no model is loaded.
+"list" mirrors the old path (tolist() then struct.pack per vector); "array"
+is the current path (memoryview over the float32 rows, frombuffer on read).
+"""
+
+import argparse
+import struct
+import time
+
+import numpy as np
+
+from agent_memory.config import EMBEDDING_DIM
+from agent_memory.embedder import deserialize_f32_array, serialize_f32
+
+
+def _list_path(matrix: np.ndarray) -> list[bytes]:
+    vectors = [row.tolist() for row in matrix]
+    return [struct.pack(f"{len(v)}f", *v) for v in vectors]
+
+
+def _array_path(matrix: np.ndarray) -> list:
+    return [serialize_f32(row) for row in matrix]
+
+
+def _list_read(blobs: list[bytes]) -> list[list[float]]:
+    return [list(struct.unpack(f"{len(b) // 4}f", b)) for b in blobs]
+
+
+def _array_read(blobs: list[bytes]) -> list[np.ndarray]:
+    return [deserialize_f32_array(b) for b in blobs]
+
+
+def _time(fn, arg, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    matrix = rng.random((args.vectors, EMBEDDING_DIM), dtype=np.float32)
+    blobs = _list_path(matrix)
+
+    print(f"{args.vectors} x {EMBEDDING_DIM} float32 vectors")
+    for name, fn, arg in [
+        ("write/list", _list_path, matrix),
+        ("write/array", _array_path, matrix),
+        ("read/list", _list_read, blobs),
+        ("read/array", _array_read, blobs),
+    ]:
+        elapsed = _time(fn, arg)
+        print(f"{name:>12}: {elapsed * 1000:8.1f} ms  "
+              f"({args.vectors / elapsed:,.0f} vectors/s)")
+
+
+if __name__ == "__main__":
+    main()
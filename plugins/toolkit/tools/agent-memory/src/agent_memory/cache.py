@@ -0,0 +1,194 @@
+# ABOUTME: Embedding caches in SQLite: chunk vectors by content hash and model, queries by text.
+# ABOUTME: Vectors are stored as float32 or float16 (meta embedding_dtype) and read back as float32.
+
+import sqlite3
+import time
+
+import numpy as np
+
+from .config import EMBED_STORAGES, get_query_cache_size
+from .db import meta_get
+from .embedder import content_hash, embed_texts_array
+from .vectors import get_index_dim, get_index_model
+
+# Keep IN (...) lists well below SQLite's host parameter limit
+_LOOKUP_BATCH = 500
+
+_DTYPES = {"float32": np.float32, "float16": np.float16}
+
+
+def get_storage(conn: sqlite3.Connection) -> str:
+    """Return the element type of cached vectors in this database."""
+    return meta_get(conn, "embedding_dtype", "float32")
+
+
+def _encode(vector: np.ndarray, storage: str) -> memoryview:
+    """Pack a vector as a blob of the storage element type."""
+    return memoryview(np.ascontiguousarray(vector, dtype=_DTYPES[storage]))
+
+
+def _decode(blob: bytes, storage: str) -> np.ndarray:
+    """Unpack a stored blob, up-casting float16 to float32 for scoring."""
+    vector = np.frombuffer(blob, dtype=_DTYPES[storage])
+    return vector if storage == "float32" else vector.astype(np.float32)
+
+
+def cache_lookup(
+    conn: sqlite3.Connection, hashes: list[str], model: str | None = None
+) -> dict[str, np.ndarray]:
+    """Return cached float32 vectors for the given content hashes (misses are omitted).
+
+    model defaults to the database's index model.
+    """
+    model = model or get_index_model(conn)
+    storage = get_storage(conn)
+    found: dict[str, np.ndarray] = {}
+    unique = list(dict.fromkeys(hashes))
+    for start in range(0, len(unique), _LOOKUP_BATCH):
+        batch = unique[start:start + _LOOKUP_BATCH]
+        placeholders = ",".join("?" for _ in batch)
+        cursor = conn.execute(
+            f"SELECT hash, embedding FROM embedding_cache "
+            f"WHERE model = ? AND hash IN ({placeholders})",
+            [model, *batch],
+        )
+        for h, blob in cursor.fetchall():
+            found[h] = _decode(blob, storage)
+    return found
+
+
+def cache_store(
+    conn: sqlite3.Connection, items: dict[str, np.ndarray], model: str | None = None
+) -> None:
+    """Write vectors into the cache, keyed by content hash and model. Caller commits."""
+    if not items:
+        return
+    model = model or get_index_model(conn)
+    storage = get_storage(conn)
+    conn.executemany(
+        "INSERT OR REPLACE INTO embedding_cache (hash, model, embedding) "
+        "VALUES (?, ?, ?)",
+        [(h, model, _encode(vec, storage)) for h, vec in items.items()],
+    )
+
+
+def embed_texts_cached(
+    conn: sqlite3.Connection, texts: list[str]
+) -> np.ndarray:
+    """Embed texts, reusing cached vectors for text seen before.
+
+    Embeds with the database's index model. Only cache misses go through
+    the model, in one batch; their vectors are written back to the cache.
+    Returns a (len(texts), dim) float32 array in input order.
+    """
+    if not texts:
+        return np.empty((0, get_index_dim(conn)), dtype=np.float32)
+    model = get_index_model(conn)
+    hashes = [content_hash(t) for t in texts]
+    vectors = cache_lookup(conn, hashes, model)
+
+    # Embed each distinct missing text once
+    missing: dict[str, str] = {}
+    for h, text in zip(hashes, texts):
+        if h not in vectors and h not in missing:
+            missing[h] = text
+    if missing:
+        fresh = dict(zip(missing.keys(), embed_texts_array(list(missing.values()), model)))
+        cache_store(conn, fresh, model)
+        vectors.update(fresh)
+
+    return np.vstack([vectors[h] for h in hashes])
+
+
+def _query_key(query: str) -> str:
+    """Normalize whitespace so trivially different spellings share an entry."""
+    return " ".join(query.split())
+
+
+def query_cache_get(conn: sqlite3.Connection, query: str) -> np.ndarray | None:
+    """Return the cached vector for a search query and mark it recently used."""
+    if get_query_cache_size() == 0:
+        return None
+    key = _query_key(query)
+    model = get_index_model(conn)
+    row = conn.execute(
+        "SELECT embedding FROM query_cache WHERE query = ? AND model = ?",
+        (key, model),
+    ).fetchone()
+    if row is None:
+        return None
+    try:
+        conn.execute(
+            "UPDATE query_cache SET last_used = ? WHERE query = ? AND model = ?",
+            (time.time(), key, model),
+        )
+        conn.commit()
+    except sqlite3.OperationalError:
+        pass  # read-only or busy DB: the hit still counts
+    return _decode(row[0], get_storage(conn))
+
+
+def query_cache_put(
+    conn: sqlite3.Connection, query: str, vector: np.ndarray
+) -> None:
+    """Cache a query vector, evicting least recently used entries over the cap.
+
+    Best effort: a read-only or busy database just skips caching.
+    """
+    cap = get_query_cache_size()
+    if cap == 0:
+        return
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO query_cache (query, model, embedding, last_used) "
+            "VALUES (?, ?, ?, ?)",
+            (_query_key(query), get_index_model(conn),
+             _encode(vector, get_storage(conn)), time.time()),
+        )
+        conn.execute(
+            "DELETE FROM query_cache WHERE rowid IN ("
+            "  SELECT rowid FROM query_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?"
+            ")",
+            (cap,),
+        )
+        conn.commit()
+    except sqlite3.OperationalError:
+        conn.rollback()
+
+
+def convert_storage(conn: sqlite3.Connection, storage: str) -> int:
+    """Rewrite every cached vector in another element type, in one transaction.
+
+    Records the new type in meta and commits. Returns the number of
+    vectors rewritten (0 if the database already uses that type).
+    """
+    if storage not in EMBED_STORAGES:
+        raise ValueError(f"Unknown embedding storage: {storage}")
+    previous = get_storage(conn)
+    if storage == previous:
+        return 0
+
+    converted = 0
+    for table in ("embedding_cache", "query_cache"):
+        last = 0
+        while True:
+            rows = conn.execute(
+                f"SELECT rowid, embedding FROM {table} WHERE rowid > ? "
+                f"ORDER BY rowid LIMIT ?",
+                (last, _LOOKUP_BATCH),
+            ).fetchall()
+            if not rows:
+                break
+            conn.executemany(
+                f"UPDATE {table} SET embedding = ? WHERE rowid = ?",
+                [(_encode(_decode(blob, previous), storage), rowid)
+                 for rowid, blob in rows],
+            )
+            converted += len(rows)
+            last = rows[-1][0]
+    conn.execute(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES ('embedding_dtype', ?)",
+        (storage,),
+    )
+    conn.commit()
+    return converted
@@ -1,13 +1,33 @@
 # ABOUTME: Markdown-aware text chunking for agent-memory indexing.
-# ABOUTME: Splits markdown files at heading boundaries with configurable size and overlap.
+# ABOUTME: Streams lines into heading-bounded chunks, sized by characters or model tokens.
 
 import re
+import zlib
+from collections import deque
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
+from itertools import islice
 
-from .config import CHUNK_MAX_CHARS, CHUNK_OVERLAP_CHARS
+from .config import (
+    CHUNK_MAX_CHARS,
+    CHUNK_OVERLAP_CHARS,
+    CHUNK_OVERLAP_TOKENS,
+    TOKEN_COUNT_CACHE_SIZE,
+)
 
 HEADING_RE = re.compile(r"^#{1,6}\s", re.MULTILINE)
 
+# Lines tokenized per TokenCounter call while streaming
+_COUNT_BLOCK = 1024
+
+# Content-defined splitting: a chunk holds at least max_chars // _CDC_MIN_DIV
+# and then ends after each line with probability len(line) / (max_chars //
+# _CDC_AVG_DIV); the rolling hash's low _CDC_WINDOW bits decide, so a cut
+# depends on at most the last _CDC_WINDOW lines of the current chunk
+_CDC_MIN_DIV = 4
+_CDC_AVG_DIV = 2
+_CDC_WINDOW = 16
+
 
 @dataclass
 class Chunk:
@@ -16,6 +36,33 @@ class Chunk:
     start_line: int
     end_line: int
     source_path: str
+    tokens: int = 0  # model tokens, when chunked by a TokenCounter
+
+
+class TokenCounter:
+    """Counts model tokens per line, caching counts by line text.
+
+    tokenizer is a `tokenizers.Tokenizer` (or anything with a compatible
+    encode_batch); budget is how many tokens a chunk may hold, i.e. the
+    model's input window less its special tokens. Counts exclude special
+    tokens, so a chunk's count is the sum of its lines' counts.
+    """
+
+    def __init__(self, tokenizer, budget: int, cache_size: int = TOKEN_COUNT_CACHE_SIZE):
+        self.tokenizer = tokenizer
+        self.budget = budget
+        self._cache: dict[str, int] = {}
+        self._cache_size = cache_size
+
+    def count_lines(self, lines: list[str]) -> list[int]:
+        """Return the token count of each line, tokenizing only unseen lines."""
+        unseen = [line for line in dict.fromkeys(lines) if line not in self._cache]
+        if unseen:
+            encodings = self.tokenizer.encode_batch(unseen, add_special_tokens=False)
+            if len(self._cache) + len(unseen) > self._cache_size:
+                self._cache.clear()
+            self._cache.update(zip(unseen, (len(e.ids) for e in encodings)))
+        return [self._cache[line] for line in lines]
 
 
 def chunk_markdown(
@@ -23,113 +70,379 @@ def chunk_markdown(
     source_path: str,
     max_chars: int = CHUNK_MAX_CHARS,
     overlap_chars: int = CHUNK_OVERLAP_CHARS,
+    counter: TokenCounter | None = None,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+    content_defined: bool = False,
 ) -> list[Chunk]:
     """Split markdown text into chunks respecting heading boundaries.
 
     Splits on headings first, then splits oversized sections by size.
+    With a counter, size is measured in model tokens instead of
+    characters: consecutive sections are packed into one chunk up to
+    counter.budget tokens, and oversized sections are split with
+    overlap_tokens of overlap. With content_defined, oversized sections
+    are instead cut where a rolling hash of their lines says, without
+    overlap, so the cuts move with the text (see _ContentSplitter).
     Returns empty list for blank/whitespace-only input.
     """
     if not text or not text.strip():
         return []
+    return list(iter_chunks(
+        [text], source_path, max_chars, overlap_chars, counter, overlap_tokens,
+        content_defined,
+    ))
 
-    lines = text.splitlines(keepends=True)
-    sections = _split_at_headings(lines)
-    chunks = []
 
-    for start_line, section_lines in sections:
-        section_text = "".join(section_lines).strip()
-        if not section_text:
-            continue
+def iter_chunks(
+    stream: Iterable[str],
+    source_path: str,
+    max_chars: int = CHUNK_MAX_CHARS,
+    overlap_chars: int = CHUNK_OVERLAP_CHARS,
+    counter: TokenCounter | None = None,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+    content_defined: bool = False,
+    in_split_section: bool = False,
+) -> Iterator[Chunk]:
+    """Yield the chunks chunk_markdown would return, reading text lazily.
 
-        if len(section_text) <= max_chars:
-            end_line = start_line + len(section_lines) - 1
-            chunks.append(Chunk(
-                text=section_text,
-                start_line=start_line,
-                end_line=end_line,
-                source_path=source_path,
-            ))
-        else:
-            sub_chunks = _split_by_size(
-                section_lines, start_line, max_chars, overlap_chars, source_path
-            )
-            chunks.extend(sub_chunks)
+    stream is any iterable of text pieces, such as a text file object;
+    pieces need not end at line breaks. Only the open section (with a
+    counter, the open pack of sections) is held, and a section that
+    outgrows the limit is split as it streams, so memory is bounded by
+    the chunk size rather than the input size.
 
-    return chunks
+    in_split_section says the stream starts at a content-defined cut
+    inside a section, as a tail re-read does, so splitting carries on
+    from its first line as it would have in the whole file.
+    """
+    lines = _iter_lines(stream)
+    if counter is None:
+        return _stream_by_chars(
+            lines, source_path, max_chars, overlap_chars, content_defined,
+            in_split_section,
+        )
+    return _stream_by_tokens(lines, source_path, counter, overlap_tokens)
 
 
-def _split_at_headings(lines: list[str]) -> list[tuple[int, list[str]]]:
-    """Split lines into sections at heading boundaries.
+def _iter_lines(stream: Iterable[str]) -> Iterator[str]:
+    """Re-split pieces of text into lines exactly as str.splitlines would."""
+    pending = ""
+    for piece in stream:
+        lines = (pending + piece).splitlines(keepends=True)
+        pending = ""
+        if lines:
+            last = lines[-1]
+            # Hold back an unterminated line, or a "\r" that a "\n" may follow
+            if last.endswith("\r") or len(last.splitlines()[0]) == len(last):
+                pending = lines.pop()
+        yield from lines
+    if pending:
+        yield from pending.splitlines(keepends=True)
 
-    Returns list of (start_line_1indexed, lines) tuples.
+
+class _Splitter:
+    """Streams one section's lines into size-limited chunks with overlap.
+
+    Sizes are characters or, with count_tokens, token counts (which then
+    become each chunk's tokens). The open chunk's lines sit in a deque
+    with a running total, so moving past a chunk only drops lines from
+    the left; nothing is re-summed or re-inserted.
     """
-    sections: list[tuple[int, list[str]]] = []
-    current_start = 1
-    current_lines: list[str] = []
-
-    for i, line in enumerate(lines):
-        if HEADING_RE.match(line) and current_lines:
-            sections.append((current_start, current_lines))
-            current_start = i + 1
-            current_lines = [line]
-        else:
-            current_lines.append(line)
 
-    if current_lines:
-        sections.append((current_start, current_lines))
+    def __init__(
+        self, start_line: int, max_size: int, overlap: int,
+        source_path: str, count_tokens: bool,
+    ) -> None:
+        self.max_size = max_size
+        self.overlap = overlap
+        self.source_path = source_path
+        self.count_tokens = count_tokens
+        self.lines: deque[str] = deque()
+        self.sizes: deque[int] = deque()
+        self.total = 0
+        self.start = start_line
+
+    def feed(self, line: str, size: int) -> Chunk | None:
+        """Add a line; return the chunk it closed, if any."""
+        if self.total + size > self.max_size and self.lines:
+            return self._roll(line, size)
+        self.lines.append(line)
+        self.sizes.append(size)
+        self.total += size
+        return None
+
+    def _roll(self, line: str, size: int) -> Chunk | None:
+        """Close the open chunk and start the next with overlap plus line."""
+        chunk = self._chunk()
+        # Carry over the longest run of trailing lines within the overlap
+        kept = keep = 0
+        for back in reversed(self.sizes):
+            if kept + back > self.overlap:
+                break
+            kept += back
+            keep += 1
+        line_no = self.start + len(self.lines)
+        for _ in range(len(self.lines) - keep):
+            self.lines.popleft()
+            self.sizes.popleft()
+        self.start = line_no - keep
+        self.lines.append(line)
+        self.sizes.append(size)
+        self.total = kept + size
+        return chunk
+
+    def finish(self) -> Chunk | None:
+        """Return the last open chunk, if it has any text."""
+        return self._chunk() if self.lines else None
+
+    def _chunk(self) -> Chunk | None:
+        text = "".join(self.lines).strip()
+        if not text:
+            return None
+        return Chunk(
+            text=text,
+            start_line=self.start,
+            end_line=self.start + len(self.lines) - 1,
+            source_path=self.source_path,
+            tokens=self.total if self.count_tokens else 0,
+        )
+
+
+class _ContentSplitter:
+    """Streams one section's lines into chunks cut where the content says.
+
+    After each line a gear-style rolling hash is updated: shifted left a
+    bit, plus the line's CRC-32, so the low _CDC_WINDOW bits depend on
+    the last _CDC_WINDOW lines alone. Once a chunk holds min_chars, it
+    ends after a line when those bits fall below a threshold scaled by
+    the line's length. A chunk that would pass max_chars is cut first.
+    The hash restarts with each chunk, so a splitter started at a chunk
+    boundary (as tail indexing does) cuts where one that read the whole
+    file would. Because a cut is decided by nearby text rather than by
+    the distance from the section start, inserting or deleting lines
+    only moves the boundaries near the edit; once a cut lands where it
+    did before, the chunks after it come out as before.
+    """
+
+    def __init__(self, start_line: int, max_chars: int, source_path: str) -> None:
+        self.max_chars = max_chars
+        self.min_chars = max_chars // _CDC_MIN_DIV
+        self.avg_chars = max(max_chars // _CDC_AVG_DIV, 1)
+        self.source_path = source_path
+        self.lines: list[str] = []
+        self.total = 0
+        self.start = start_line
+        self._hash = 0
+        self._cut = False
+
+    def feed(self, line: str, size: int) -> Chunk | None:
+        """Add a line; return the chunk that ended before it, if any."""
+        chunk = None
+        if self._cut or (self.lines and self.total + size > self.max_chars):
+            chunk = self._take()
+        self.lines.append(line)
+        self.total += size
+        self._hash = ((self._hash << 1) + zlib.crc32(line.encode("utf-8"))) & 0xFFFFFFFF
+        low = self._hash & ((1 << _CDC_WINDOW) - 1)
+        self._cut = self.total >= self.min_chars and (
+            low * self.avg_chars < size << _CDC_WINDOW
+        )
+        return chunk
+
+    def finish(self) -> Chunk | None:
+        """Return the last chunk of the section, if any."""
+        return self._take() if self.lines else None
 
-    return sections
+    def _take(self) -> Chunk | None:
+        chunk = _whole(self.lines, self.start, self.source_path)
+        self.start += len(self.lines)
+        self.lines = []
+        self.total = 0
+        self._hash = 0
+        self._cut = False
+        return chunk
 
 
-def _split_by_size(
-    lines: list[str],
-    start_line: int,
+def _whole(lines: list[str], start_line: int, source_path: str, tokens: int = 0):
+    """Return lines as one chunk, or None if they are only whitespace."""
+    text = "".join(lines).strip()
+    if not text:
+        return None
+    return Chunk(
+        text=text,
+        start_line=start_line,
+        end_line=start_line + len(lines) - 1,
+        source_path=source_path,
+        tokens=tokens,
+    )
+
+
+def _stream_by_chars(
+    lines: Iterator[str],
+    source_path: str,
     max_chars: int,
     overlap_chars: int,
-    source_path: str,
-) -> list[Chunk]:
-    """Split a section's lines into size-limited chunks with overlap."""
-    chunks = []
-    current_chars = 0
-    current_lines: list[str] = []
-    chunk_start = start_line
-
-    for i, line in enumerate(lines):
-        line_len = len(line)
-        if current_chars + line_len > max_chars and current_lines:
-            chunk_text = "".join(current_lines).strip()
-            if chunk_text:
-                chunks.append(Chunk(
-                    text=chunk_text,
-                    start_line=chunk_start,
-                    end_line=chunk_start + len(current_lines) - 1,
-                    source_path=source_path,
-                ))
-
-            # Find overlap: walk backwards from end of current_lines
-            overlap_text = ""
-            overlap_lines: list[str] = []
-            for back_line in reversed(current_lines):
-                if len(overlap_text) + len(back_line) > overlap_chars:
-                    break
-                overlap_lines.insert(0, back_line)
-                overlap_text = back_line + overlap_text
-
-            current_lines = overlap_lines + [line]
-            chunk_start = start_line + i - len(overlap_lines)
-            current_chars = sum(len(ln) for ln in current_lines)
+    content_defined: bool = False,
+    in_split_section: bool = False,
+) -> Iterator[Chunk]:
+    """Chunk by characters: one chunk per section, split if over max_chars.
+
+    A section is buffered until its stripped length passes max_chars (the
+    stripped length only grows as lines arrive); from then on its lines go
+    straight to a _Splitter, or a _ContentSplitter if content_defined.
+    Whitespace is only measured once a section's raw length passes
+    max_chars, so typical sections cost one add per line.
+    """
+    section: list[str] = []
+    start = 1
+    line_no = 0
+    splitter: _Splitter | _ContentSplitter | None = None
+    if content_defined and in_split_section:
+        splitter = _ContentSplitter(start, max_chars, source_path)
+    length = 0
+    # Leading/trailing whitespace of the section, once measured (exact=True)
+    exact = False
+    leading = trailing = 0
+    has_text = False
+
+    for line in lines:
+        line_no += 1
+        if line[:1] == "#" and HEADING_RE.match(line) and (section or splitter):
+            chunk = splitter.finish() if splitter else _whole(section, start, source_path)
+            if chunk:
+                yield chunk
+            section, start, splitter = [], line_no, None
+            length = 0
+            exact = False
+
+        if splitter:
+            chunk = splitter.feed(line, len(line))
+            if chunk:
+                yield chunk
+            continue
+
+        section.append(line)
+        length += len(line)
+        if length <= max_chars:
+            continue
+        if exact:
+            has_text, leading, trailing = _measure_whitespace(
+                line, has_text, leading, trailing
+            )
         else:
-            current_lines.append(line)
-            current_chars += line_len
-
-    if current_lines:
-        chunk_text = "".join(current_lines).strip()
-        if chunk_text:
-            chunks.append(Chunk(
-                text=chunk_text,
-                start_line=chunk_start,
-                end_line=chunk_start + len(current_lines) - 1,
-                source_path=source_path,
-            ))
-
-    return chunks
+            exact = True
+            has_text, leading, trailing = False, 0, 0
+            for held in section:
+                has_text, leading, trailing = _measure_whitespace(
+                    held, has_text, leading, trailing
+                )
+
+        if has_text and length - leading - trailing > max_chars:
+            if content_defined:
+                splitter = _ContentSplitter(start, max_chars, source_path)
+            else:
+                splitter = _Splitter(start, max_chars, overlap_chars, source_path, False)
+            for held in section:
+                chunk = splitter.feed(held, len(held))
+                if chunk:
+                    yield chunk
+            section = []
+
+    chunk = splitter.finish() if splitter else _whole(section, start, source_path)
+    if chunk:
+        yield chunk
+
+
+def _measure_whitespace(
+    line: str, has_text: bool, leading: int, trailing: int
+) -> tuple[bool, int, int]:
+    """Extend a section's (has_text, leading, trailing) whitespace by one line."""
+    stripped = line.rstrip()
+    if stripped:
+        if not has_text:
+            leading += len(line) - len(line.lstrip())
+        return True, leading, len(line) - len(stripped)
+    if has_text:
+        return True, leading, trailing + len(line)
+    return False, leading + len(line), trailing
+
+
+def _counted_lines(
+    lines: Iterator[str], counter: TokenCounter
+) -> Iterator[tuple[str, int]]:
+    """Pair lines with token counts, tokenizing a block of lines at a time."""
+    while block := list(islice(lines, _COUNT_BLOCK)):
+        yield from zip(block, counter.count_lines(block))
+
+
+def _stream_by_tokens(
+    lines: Iterator[str], source_path: str, counter: TokenCounter, overlap_tokens: int
+) -> Iterator[Chunk]:
+    """Chunk by tokens: pack sections up to counter.budget, split larger ones.
+
+    Sections that fit are packed together in order; a section over budget
+    closes the pack and is split by lines on its own. A single line over
+    budget still becomes one chunk, which the model will truncate; its
+    tokens field shows it.
+    """
+    budget = counter.budget
+    pack: list[str] = []
+    pack_start = pack_tokens = 0
+    section: list[str] = []
+    section_counts: list[int] = []
+    section_tokens = 0
+    start = 1
+    line_no = 0
+    splitter: _Splitter | None = None
+
+    def close_section() -> Iterator[Chunk]:
+        nonlocal pack, pack_start, pack_tokens
+        if splitter:
+            chunk = splitter.finish()
+            if chunk:
+                yield chunk
+            return
+        if pack and pack_tokens + section_tokens > budget:
+            chunk = _whole(pack, pack_start, source_path, pack_tokens)
+            if chunk:
+                yield chunk
+            pack = []
+        if not pack:
+            pack_start, pack_tokens = start, 0
+        pack.extend(section)
+        pack_tokens += section_tokens
+
+    for line, count in _counted_lines(lines, counter):
+        line_no += 1
+        if line[:1] == "#" and HEADING_RE.match(line) and (section or splitter):
+            yield from close_section()
+            section, section_counts, start, splitter = [], [], line_no, None
+            section_tokens = 0
+
+        if splitter:
+            chunk = splitter.feed(line, count)
+            if chunk:
+                yield chunk
+            continue
+
+        section.append(line)
+        section_counts.append(count)
+        section_tokens += count
+        if section_tokens > budget:
+            if pack:
+                chunk = _whole(pack, pack_start, source_path, pack_tokens)
+                if chunk:
+                    yield chunk
+                pack, pack_tokens = [], 0
+            splitter = _Splitter(start, budget, overlap_tokens, source_path, True)
+            for held, held_count in zip(section, section_counts):
+                chunk = splitter.feed(held, held_count)
+                if chunk:
+                    yield chunk
+            section, section_counts, section_tokens = [], [], 0
+
+    yield from close_section()
+    if pack:
+        chunk = _whole(pack, pack_start, source_path, pack_tokens)
+        if chunk:
+            yield chunk
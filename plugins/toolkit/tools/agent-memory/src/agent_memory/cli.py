@@ -20,16 +20,41 @@ def _build_parser() -> argparse.ArgumentParser:
     p_search.add_argument("--vector", action="store_true", help="Vector-only search")
     p_search.add_argument("--keyword", action="store_true", help="BM25-only search")
     p_search.add_argument("--limit", type=int, default=5, help="Max results")
+    p_search.add_argument(
+        "--collapse", action="store_true",
+        help="Show text stored in several places once, not at every location",
+    )
     p_search.add_argument("--json", action="store_true", dest="as_json", help="JSON output")
 
     # index
     p_index = sub.add_parser("index", help="Index memory files")
     p_index.add_argument("--path", help="Specific path to index (glob: *.md)")
+    p_index.add_argument(
+        "--batch-size", type=int, default=None,
+        help="Chunks per cross-file embedding batch",
+    )
+    p_index.add_argument(
+        "--workers", type=int, default=None,
+        help="FastEmbed data-parallel worker processes (0 = one per core)",
+    )
+    p_index.add_argument(
+        "--verify", action="store_true",
+        help="Hash every file instead of trusting unchanged mtime/size",
+    )
+    p_index.add_argument(
+        "--reembed", action="store_true",
+        help="Re-embed chunks made by another model with AGENT_MEMORY_MODEL "
+             "(resumable; switches the index when done)",
+    )
     p_index.add_argument("--json", action="store_true", dest="as_json", help="JSON output")
 
     # status
     p_status = sub.add_parser("status", help="Show database status")
     p_status.add_argument("--json", action="store_true", dest="as_json", help="JSON output")
+    p_status.add_argument(
+        "--load-time", action="store_true",
+        help="Load the embedding model in-process and report how long it took",
+    )
 
     # add
     p_add = sub.add_parser("add", help="Add a memory")
@@ -58,11 +83,46 @@ def _build_parser() -> argparse.ArgumentParser:
 
     # install
     p_install = sub.add_parser("install", help="Download embedding model")
+    p_install.add_argument(
+        "--model-dir",
+        help="Pin model files to this directory; later loads never use the network "
+             "(default: models/ in the memory dir)",
+    )
     p_install.add_argument("--json", action="store_true", dest="as_json", help="JSON output")
 
+    # serve
+    p_serve = sub.add_parser(
+        "serve", help="Run the embedding daemon (keeps the model loaded)"
+    )
+    p_serve.add_argument("--socket", help="Unix socket path (default: in memory dir)")
+
+    # convert
+    p_conv = sub.add_parser(
+        "convert", help="Change how vectors are stored, in place, and compact the DB"
+    )
+    p_conv.add_argument(
+        "--quantization", choices=["float", "int8", "bit"],
+        help="Vector index: float32 (exact), int8 (4x smaller) or bit "
+             "(32x smaller), with float re-ranking for the quantized types",
+    )
+    p_conv.add_argument(
+        "--storage", choices=["float32", "float16"],
+        help="Cached embeddings: float32 or float16 (half the size)",
+    )
+    p_conv.add_argument(
+        "--pca-dims", type=int, default=None,
+        help="Fit PCA to the stored vectors and search a reduced index of "
+             "this many dims, re-ranking with full vectors (0 removes it)",
+    )
+    p_conv.add_argument("--json", action="store_true", dest="as_json", help="JSON output")
+
     # code-index
     p_ci = sub.add_parser("code-index", help="Index a codebase for tree navigation")
     p_ci.add_argument("path", help="Root path of the codebase to index")
+    p_ci.add_argument(
+        "--verify", action="store_true",
+        help="Hash every file instead of trusting unchanged mtime/size",
+    )
     p_ci.add_argument("--json", action="store_true", dest="as_json", help="JSON output")
 
     # code-nav
@@ -89,49 +149,100 @@ def _build_parser() -> argparse.ArgumentParser:
 
 def cmd_status(args) -> None:
     """Show database status — fast path, no embedder needed."""
-    from .config import get_db_path
-    from .db import init_db, meta_get
+    from pathlib import Path
+
+    from .config import get_db_path, get_model_dir
+    from .db import meta_get, open_db
 
     db_path = get_db_path()
-    conn = init_db(db_path)
+    conn = open_db(db_path, read_only=True)
 
-    chunk_count = conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+    chunk_count = conn.execute("SELECT COUNT(*) FROM chunk_locations").fetchone()[0]
+    text_count = conn.execute("SELECT COUNT(*) FROM chunk_texts").fetchone()[0]
     file_count = conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
     last_indexed = meta_get(conn, "last_indexed", "never")
+    quantization = meta_get(conn, "vec_quantization", "float")
+    storage = meta_get(conn, "embedding_dtype", "float32")
+    model = meta_get(conn, "embedding_model", "")
+    pca_dims = int(meta_get(conn, "pca_dims", "0"))
     db_size = db_path.stat().st_size if db_path.exists() else 0
+    # pinned_model_dir(), without importing the embedder
+    pinned = meta_get(conn, "model_dir")
+    model_dir = get_model_dir() or (Path(pinned) if pinned else None)
 
     conn.close()
 
+    load_seconds = None
+    if getattr(args, "load_time", False):
+        from .embedder import measure_load, set_model_dir
+
+        if pinned:  # read-only opens don't pin it
+            set_model_dir(Path(pinned))
+        try:
+            load_seconds = round(measure_load(model), 3)
+        except (ImportError, FileNotFoundError) as exc:
+            print(str(exc), file=sys.stderr)
+            sys.exit(1)
+
     info = {
         "chunks": chunk_count,
+        "chunk_texts": text_count,
         "files": file_count,
         "last_indexed": last_indexed,
         "db_path": str(db_path),
         "db_size_bytes": db_size,
+        "vec_quantization": quantization,
+        "embedding_storage": storage,
+        "embedding_model": model,
+        "pca_dims": pca_dims,
+        "model_dir": str(model_dir) if model_dir else None,
+        "model_load_seconds": load_seconds,
     }
 
     if getattr(args, "as_json", False):
         print(json.dumps(info, indent=2))
     else:
-        print(f"Chunks: {chunk_count}")
+        shared = f" ({text_count} distinct texts)" if text_count != chunk_count else ""
+        print(f"Chunks: {chunk_count}{shared}")
         print(f"Files:  {file_count}")
         print(f"Last indexed: {last_indexed}")
         print(f"DB: {db_path} ({db_size:,} bytes)")
+        pca = f", PCA {pca_dims} dims" if pca_dims else ""
+        print(f"Vectors: {quantization} index{pca}, {storage} cache")
+        print(f"Model:  {model}")
+        if model_dir:
+            print(f"Model dir: {model_dir}")
+        if load_seconds is not None:
+            print(f"Model load: {load_seconds:.3f}s")
 
 
 def cmd_index(args) -> None:
     """Index memory files."""
-    from .config import get_db_path, get_scan_patterns
+    from .config import (
+        INDEX_BATCH_SIZE,
+        get_db_path,
+        get_embed_batch_size,
+        get_embedding_model,
+        get_scan_patterns,
+    )
     from .db import init_db, meta_set
     from .indexer import index_all
+    from .vectors import get_index_model
 
     import datetime
+    import os
+
+    workers = getattr(args, "workers", None)
+    if workers is not None and workers < 0:
+        print("--workers must be 0 or more", file=sys.stderr)
+        sys.exit(1)
 
     conn = init_db(get_db_path())
 
     if args.path:
         from pathlib import Path
-        p = Path(args.path)
+        # Absolute, so pruning compares it with paths recorded by other runs
+        p = Path(args.path).expanduser().absolute()
         if p.is_dir():
             patterns = [str(p / "*.md")]
         else:
@@ -139,8 +250,28 @@ def cmd_index(args) -> None:
     else:
         patterns = get_scan_patterns()
 
+    batch_size = args.batch_size or INDEX_BATCH_SIZE
+    if workers is not None:
+        from . import embedder
+
+        # Parallel workers are local processes, so skip the daemon for this run
+        embedder.set_workers(workers)
+        embedder.disable_daemon()
+        if not args.batch_size and workers != 1:
+            # FastEmbed starts a worker pool per call; give each pool several
+            # inference batches per worker so startup is amortized
+            n_workers = workers or os.cpu_count() or 1
+            batch_size = max(batch_size, n_workers * get_embed_batch_size() * 4)
+
+    if getattr(args, "reembed", False):
+        _reembed(conn, batch_size, getattr(args, "as_json", False))
+        return
+
     try:
-        stats = index_all(conn, patterns)
+        stats = index_all(
+            conn, patterns, batch_size=batch_size,
+            verify=getattr(args, "verify", False),
+        )
     except ImportError as exc:
         print(str(exc), file=sys.stderr)
         print(
@@ -149,40 +280,117 @@ def cmd_index(args) -> None:
         )
         conn.close()
         sys.exit(1)
+    except FileNotFoundError as exc:
+        print(str(exc), file=sys.stderr)
+        conn.close()
+        sys.exit(1)
     meta_set(conn, "last_indexed", datetime.datetime.now().isoformat())
+    index_model = get_index_model(conn)
     conn.close()
+    if index_model != get_embedding_model():
+        print(
+            f"Note: index uses {index_model}; run `agent-memory index --reembed` "
+            f"to switch to {get_embedding_model()}",
+            file=sys.stderr,
+        )
 
     if getattr(args, "as_json", False):
         data = {
             "files_indexed": stats.files_indexed,
             "files_skipped": stats.files_skipped,
             "chunks_created": stats.chunks_created,
+            "chunks_unchanged": stats.chunks_unchanged,
+            "chunks_deleted": stats.chunks_deleted,
+            "chunks_truncated": stats.chunks_truncated,
+            "embed_batches": stats.embed_batches,
+            "files_pruned": stats.files_pruned,
+            "chunks_pruned": stats.chunks_pruned,
+            "stage_times": stats.stage_times,
         }
         print(json.dumps(data, indent=2))
     else:
         print(f"Indexed {stats.files_indexed} files, {stats.chunks_created} chunks")
         if stats.files_skipped:
             print(f"Skipped {stats.files_skipped} unchanged files")
+        if stats.chunks_truncated:
+            print(
+                f"{stats.chunks_truncated} chunks exceed the model's input window "
+                f"and will be truncated (a single line is too long)"
+            )
+        if stats.files_pruned:
+            print(
+                f"Pruned {stats.files_pruned} missing files, "
+                f"{stats.chunks_pruned} chunks"
+            )
+
+
+def _reembed(conn, batch_size: int, as_json: bool) -> None:
+    """Run `index --reembed` on an open connection, then close it."""
+    from .indexer import reembed_all
+
+    try:
+        stats = reembed_all(conn, batch_size=batch_size)
+    except (ImportError, ValueError, FileNotFoundError) as exc:
+        print(str(exc), file=sys.stderr)
+        if isinstance(exc, ImportError):
+            print("Install fastembed dependency: pip install fastembed", file=sys.stderr)
+        conn.close()
+        sys.exit(1)
+    conn.close()
+
+    if as_json:
+        print(json.dumps({
+            "model": stats.model,
+            "previous_model": stats.previous_model,
+            "chunks_embedded": stats.chunks_embedded,
+            "chunks_cached": stats.chunks_cached,
+            "batches": stats.batches,
+            "index_rebuilt": stats.index_rebuilt,
+        }, indent=2))
+    else:
+        print(
+            f"Re-embedded {stats.chunks_embedded} chunks with {stats.model} "
+            f"({stats.chunks_cached} from cache)"
+        )
+        if stats.index_rebuilt:
+            print(f"Vector index switched from {stats.previous_model}")
 
 
 def cmd_search(args) -> None:
-    """Search memories."""
+    """Search memories — through the daemon when one is running."""
     from .config import get_db_path
-    from .db import init_db
+    from .daemon import search_remote
 
-    conn = init_db(get_db_path())
+    db_path = get_db_path()
+    mode = "keyword" if args.keyword else "vector" if args.vector else "hybrid"
+    collapse = getattr(args, "collapse", False)
+    results = search_remote(db_path, args.query, mode, args.limit, collapse)
 
-    if args.keyword:
-        from .search import search_keyword
-        results = search_keyword(conn, args.query, limit=args.limit)
-    elif args.vector:
-        from .search import search_vector
-        results = search_vector(conn, args.query, limit=args.limit)
-    else:
-        from .search import search_hybrid
-        results = search_hybrid(conn, args.query, limit=args.limit)
+    if results is None:
+        from .db import open_db
 
-    conn.close()
+        conn = open_db(db_path)
+        try:
+            if args.keyword:
+                from .search import search_keyword
+                results = search_keyword(
+                    conn, args.query, limit=args.limit, collapse=collapse
+                )
+            elif args.vector:
+                from .search import search_vector
+                results = search_vector(
+                    conn, args.query, limit=args.limit, collapse=collapse
+                )
+            else:
+                from .search import search_hybrid
+                results = search_hybrid(
+                    conn, args.query, limit=args.limit, collapse=collapse
+                )
+        except FileNotFoundError as exc:
+            print(str(exc), file=sys.stderr)
+            sys.exit(1)
+        finally:
+            conn.close()
 
     if args.as_json:
         data = [
@@ -194,6 +402,8 @@ def cmd_search(args) -> None:
                 "score": round(r.score, 4),
                 "start_line": r.start_line,
                 "end_line": r.end_line,
+                "query_cache_hit": r.query_cached,
+                "locations": r.locations,
             }
             for r in results
         ]
@@ -202,7 +412,8 @@ def cmd_search(args) -> None:
         if not results:
             print("No results found.")
         for r in results:
-            print(f"[{r.score:.3f}] {r.source}:{r.path}")
+            also = f" (+{r.locations - 1} more)" if collapse and r.locations > 1 else ""
+            print(f"[{r.score:.3f}] {r.source}:{r.path}{also}")
             print(f"  {r.text[:120]}...")
             print()
 
@@ -212,10 +423,18 @@ def cmd_add(args) -> None:
     from .config import get_db_path
     from .crud import add_memory
     from .db import init_db
+    from .embedder import warm_up
+    from .vectors import get_index_model
 
-    conn = init_db(get_db_path())
-    chunk_id = add_memory(conn, args.content, source=args.source, tags=args.tags)
-    conn.close()
+    conn = init_db(get_db_path())  # pins the installed model dir, so open it first
+    warm_up(get_index_model(conn))  # overlaps with the embedding-cache lookup
+    try:
+        chunk_id = add_memory(conn, args.content, source=args.source, tags=args.tags)
+    except FileNotFoundError as exc:
+        print(str(exc), file=sys.stderr)
+        sys.exit(1)
+    finally:
+        conn.close()
 
     if getattr(args, "as_json", False):
         print(json.dumps({"id": chunk_id}, indent=2))
@@ -227,9 +446,9 @@ def cmd_get(args) -> None:
     """Get a memory by ID."""
     from .config import get_db_path
     from .crud import get_memory
-    from .db import init_db
+    from .db import open_db
 
-    conn = init_db(get_db_path())
+    conn = open_db(get_db_path(), read_only=True)
     result = get_memory(conn, args.id)
     conn.close()
 
@@ -249,9 +468,9 @@ def cmd_list(args) -> None:
     """List memories."""
     from .config import get_db_path
     from .crud import list_memories
-    from .db import init_db
+    from .db import open_db
 
-    conn = init_db(get_db_path())
+    conn = open_db(get_db_path(), read_only=True)
     results = list_memories(conn, source=args.source, limit=args.limit)
     conn.close()
 
@@ -301,23 +520,156 @@ def cmd_summarize(args) -> None:
 
 
 def cmd_install(args) -> None:
-    """Download the embedding model."""
+    """Download the embedding model into a pinned directory and record it."""
+    from pathlib import Path
+
+    from .config import get_db_path, get_embedding_model, get_memory_dir, get_model_dir
+    from .db import init_db, meta_get, meta_set
+    from .embedder import install_model, measure_load, set_model_dir
+    from .vectors import get_index_model
+
+    conn = init_db(get_db_path())
+    model_dir = Path(
+        getattr(args, "model_dir", None) or get_model_dir()
+        or meta_get(conn, "model_dir") or get_memory_dir() / "models"
+    ).expanduser().resolve()
+    # The index model keeps search working until `index --reembed` switches
+    models = list(dict.fromkeys([get_index_model(conn), get_embedding_model()]))
+
     if not getattr(args, "as_json", False):
-        print("Downloading embedding model...")
-    from .embedder import _get_model
+        print(f"Downloading embedding model to {model_dir}...")
     try:
-        _get_model()
+        for name in models:
+            install_model(model_dir, name)
+        set_model_dir(model_dir)
+        load_seconds = measure_load(models[0])
     except ImportError as exc:
         print(str(exc), file=sys.stderr)
         print(
             "Install fastembed dependency: pip install fastembed",
             file=sys.stderr,
         )
+        conn.close()
         sys.exit(1)
+    except (OSError, ValueError) as exc:
+        print(str(exc), file=sys.stderr)
+        conn.close()
+        sys.exit(1)
+    meta_set(conn, "model_dir", str(model_dir))
+    conn.close()
+
     if getattr(args, "as_json", False):
-        print(json.dumps({"status": "ready"}, indent=2))
+        print(json.dumps({
+            "status": "ready",
+            "model_dir": str(model_dir),
+            "models": models,
+            "load_seconds": round(load_seconds, 3),
+        }, indent=2))
     else:
-        print("Model ready.")
+        print(f"Model ready ({load_seconds:.2f}s offline load).")
+
+
+def cmd_serve(args) -> None:
+    """Run the embedding daemon in the foreground."""
+    from .daemon import serve
+
+    from pathlib import Path
+
+    socket_path = Path(args.socket) if getattr(args, "socket", None) else None
+    try:
+        serve(socket_path)
+    except ImportError as exc:
+        print(str(exc), file=sys.stderr)
+        print(
+            "Install fastembed dependency: pip install fastembed",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    except (RuntimeError, OSError) as exc:
+        print(str(exc), file=sys.stderr)
+        sys.exit(1)
+
+
+def cmd_convert(args) -> None:
+    """Convert vector storage in place: index quantization, cache precision, PCA index."""
+    from .cache import convert_storage, get_storage
+    from .config import get_db_path
+    from .db import has_sqlite_vec, init_db, meta_get
+    from .vectors import (
+        build_projection,
+        drop_projection,
+        get_quantization,
+        rebuild_vec_table,
+    )
+
+    quantization = getattr(args, "quantization", None)
+    storage = getattr(args, "storage", None)
+    pca_dims = getattr(args, "pca_dims", None)
+    if quantization is None and storage is None and pca_dims is None:
+        print(
+            "Nothing to convert: pass --quantization, --storage and/or --pca-dims",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    if pca_dims is not None and pca_dims < 0:
+        print("--pca-dims must be 0 or more", file=sys.stderr)
+        sys.exit(1)
+    if (quantization is not None or pca_dims) and not has_sqlite_vec():
+        print("Install sqlite-vec dependency: pip install sqlite-vec", file=sys.stderr)
+        sys.exit(1)
+
+    db_path = get_db_path()
+    conn = init_db(db_path)
+    size_before = db_path.stat().st_size
+    previous = get_quantization(conn)
+    previous_storage = get_storage(conn)
+    previous_pca = int(meta_get(conn, "pca_dims", "0"))
+
+    vectors = convert_storage(conn, storage) if storage is not None else 0
+    chunks = 0
+    try:
+        if quantization is not None:
+            chunks = rebuild_vec_table(conn, quantization)
+        if pca_dims == 0:
+            drop_projection(conn)
+            conn.commit()
+        elif pca_dims is not None:
+            chunks = build_projection(conn, pca_dims)
+    except (ImportError, ValueError) as exc:
+        print(str(exc), file=sys.stderr)
+        if isinstance(exc, ImportError):
+            print("Install fastembed dependency: pip install fastembed", file=sys.stderr)
+        conn.close()
+        sys.exit(1)
+    # Reclaim the freed pages and fold the WAL back into the file
+    conn.execute("VACUUM")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    size_after = db_path.stat().st_size
+
+    if getattr(args, "as_json", False):
+        data = {
+            "quantization": quantization or previous,
+            "previous": previous,
+            "chunks": chunks,
+            "storage": storage or previous_storage,
+            "previous_storage": previous_storage,
+            "vectors_converted": vectors,
+            "pca_dims": pca_dims if pca_dims is not None else previous_pca,
+            "db_size_before": size_before,
+            "db_size_after": size_after,
+        }
+        print(json.dumps(data, indent=2))
+    else:
+        if quantization is not None:
+            print(f"Converted {chunks} chunk vectors: {previous} -> {quantization}")
+        if storage is not None:
+            print(f"Converted {vectors} cached vectors: {previous_storage} -> {storage}")
+        if pca_dims == 0:
+            print("Removed the PCA index")
+        elif pca_dims is not None:
+            print(f"Indexed {chunks} chunks reduced to {pca_dims} dims with PCA")
+        print(f"DB: {size_before:,} -> {size_after:,} bytes")
 
 
 def cmd_code_index(args) -> None:
@@ -339,7 +691,9 @@ def cmd_code_index(args) -> None:
     conn = init_db(get_db_path())
     try:
         try:
-            stats = index_codebase(conn, args.path)
+            stats = index_codebase(
+                conn, args.path, verify=getattr(args, "verify", False)
+            )
         except (ValueError, OSError) as exc:
             print(str(exc), file=sys.stderr)
             sys.exit(1)
@@ -351,12 +705,19 @@ def cmd_code_index(args) -> None:
             "files_indexed": stats.files_indexed,
             "files_skipped": stats.files_skipped,
             "nodes_created": stats.nodes_created,
+            "files_pruned": stats.files_pruned,
+            "nodes_pruned": stats.nodes_pruned,
         }
         print(json.dumps(data, indent=2))
     else:
         print(f"Indexed {stats.files_indexed} files, {stats.nodes_created} nodes")
         if stats.files_skipped:
             print(f"Skipped {stats.files_skipped} unchanged files")
+        if stats.files_pruned:
+            print(
+                f"Pruned {stats.files_pruned} missing files, "
+                f"{stats.nodes_pruned} nodes"
+            )
     if stats.files_indexed > 0 and stats.nodes_created == 0:
         print(
             "Warning: No code nodes were extracted. "
@@ -369,10 +730,10 @@ def cmd_code_index(args) -> None:
 def cmd_code_nav(args) -> None:
     """Navigate code tree to find relevant code."""
     from .config import get_db_path
-    from .db import init_db
+    from .db import open_db
     from .navigator import format_navigation_result, navigate
 
-    conn = init_db(get_db_path())
+    conn = open_db(get_db_path(), read_only=True)
     result = navigate(conn, args.query)
     conn.close()
 
@@ -396,10 +757,10 @@ def cmd_code_nav(args) -> None:
 def cmd_code_tree(args) -> None:
     """Display code tree structure."""
     from .config import get_db_path
-    from .db import init_db
+    from .db import open_db
     from .tree import get_children, get_roots
 
-    conn = init_db(get_db_path())
+    conn = open_db(get_db_path(), read_only=True)
     if args.path:
         roots = get_roots(conn, repo_path=args.path)
         if not roots:
@@ -444,7 +805,7 @@ def cmd_code_tree(args) -> None:
 def cmd_code_refs(args) -> None:
     """Show cross-references for a code node."""
     from .config import get_db_path
-    from .db import init_db
+    from .db import open_db
     from .tree import get_node, resolve_refs
 
     try:
@@ -456,7 +817,7 @@ def cmd_code_refs(args) -> None:
         )
         sys.exit(1)
 
-    conn = init_db(get_db_path())
+    conn = open_db(get_db_path())
 
     node = get_node(conn, node_id)
     if node is None:
@@ -528,6 +889,8 @@ def main() -> None:
         "ask": cmd_ask,
         "summarize": cmd_summarize,
         "install": cmd_install,
+        "serve": cmd_serve,
+        "convert": cmd_convert,
         "code-index": cmd_code_index,
         "code-nav": cmd_code_nav,
         "code-tree": cmd_code_tree,
@@ -537,6 +900,11 @@ def main() -> None:
 
     handler = commands.get(args.command)
     if handler:
-        handler(args)
+        try:
+            handler(args)
+        except ValueError as exc:
+            # Bad AGENT_MEMORY_* settings surface from init_db/open_db
+            print(str(exc), file=sys.stderr)
+            sys.exit(1)
     else:
         parser.print_help()
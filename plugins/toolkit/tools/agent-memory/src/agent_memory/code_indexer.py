@@ -1,13 +1,14 @@
 # ABOUTME: Code indexing pipeline — discover, parse, and store code structure in SQLite.
-# ABOUTME: Supports change detection via file hash to skip unchanged files.
+# ABOUTME: Supports change detection via mtime/size, then file hash, to skip unchanged files.
 
 import hashlib
+import os
 import sqlite3
 from dataclasses import dataclass
 from pathlib import Path
 
 from .parser import CodeNode, detect_language, parse_file
-from .tree import store_nodes
+from .tree import delete_file_nodes, store_nodes
 
 # Directories to always skip during discovery
 _SKIP_DIRS = {
@@ -31,6 +32,8 @@ class CodeIndexStats:
     files_indexed: int = 0
     files_skipped: int = 0
     nodes_created: int = 0
+    files_pruned: int = 0
+    nodes_pruned: int = 0
 
 
 def discover_code_files(root_path: str) -> list[Path]:
@@ -63,25 +66,53 @@ def discover_code_files(root_path: str) -> list[Path]:
     return files
 
 
-def _file_hash(path: Path) -> str:
-    """Return SHA-256 hex digest of file contents."""
-    return hashlib.sha256(path.read_bytes()).hexdigest()
+def _load_file_records(
+    conn: sqlite3.Connection, repo: str
+) -> dict[str, tuple[str, float, int]]:
+    """Return (hash, mtime, size) for every recorded file of a repo."""
+    cursor = conn.execute(
+        "SELECT path, hash, mtime, size FROM code_files WHERE repo = ?", (repo,)
+    )
+    return {row[0]: (row[1], row[2], row[3]) for row in cursor.fetchall()}
+
 
+def _prune_missing(
+    conn: sqlite3.Connection,
+    recorded: list[str],
+    discovered: set[str],
+    repo: str,
+    stats: CodeIndexStats,
+) -> None:
+    """Drop nodes, refs, and file records for files no longer in the repo.
 
-def _file_changed(conn: sqlite3.Connection, path: Path, current_hash: str) -> bool:
-    """Check if file has changed since last index."""
-    cursor = conn.execute("SELECT hash FROM code_files WHERE path = ?", (str(path),))
-    row = cursor.fetchone()
-    if row is None:
-        return True
-    return row[0] != current_hash
+    Runs as a single transaction.
+    """
+    stale = [p for p in recorded if p not in discovered]
+    if not stale:
+        return
+    stats.nodes_pruned += delete_file_nodes(conn, stale, repo)
+    conn.executemany(
+        "DELETE FROM code_files WHERE path = ? AND repo = ?",
+        [(p, repo) for p in stale],
+    )
+    conn.commit()
+    stats.files_pruned += len(stale)
 
 
 def _update_file_record(
-    conn: sqlite3.Connection, path: Path, file_hash: str, repo: str
+    conn: sqlite3.Connection,
+    path: Path,
+    file_hash: str,
+    repo: str,
+    stat: os.stat_result | None = None,
 ) -> None:
-    """Insert or update file record for change detection."""
-    stat = path.stat()
+    """Insert or update file record for change detection.
+
+    Pass the stat taken before the file was read, so a write that lands
+    after the read still looks changed on the next run.
+    """
+    if stat is None:
+        stat = path.stat()
     conn.execute(
         "INSERT OR REPLACE INTO code_files (path, repo, hash, mtime, size) "
         "VALUES (?, ?, ?, ?, ?)",
@@ -101,18 +132,35 @@ def _count_nodes(nodes: list[CodeNode]) -> int:
 def index_codebase(
     conn: sqlite3.Connection,
     root_path: str,
+    verify: bool = False,
 ) -> CodeIndexStats:
     """Full code indexing pipeline: discover → parse → store.
 
-    Skips files that haven't changed since last index.
+    Skips files that haven't changed since last index. A file whose mtime
+    and size match its record is skipped without being read; only files
+    whose stat changed are hashed. verify=True hashes every file.
+    Files recorded for this repo that no longer exist (deleted or renamed)
+    are pruned along with their nodes and refs.
     """
     stats = CodeIndexStats()
     repo_path = str(Path(root_path).resolve())
     files = discover_code_files(root_path)
+    records = _load_file_records(conn, repo_path)
+    _prune_missing(conn, list(records), {str(p) for p in files}, repo_path, stats)
 
     for path in files:
-        fhash = _file_hash(path)
-        if not _file_changed(conn, path, fhash):
+        try:
+            stat = path.stat()
+        except OSError:
+            stats.files_skipped += 1
+            continue
+        record = records.get(str(path))
+        stat_same = (
+            record is not None
+            and record[1] == stat.st_mtime
+            and record[2] == stat.st_size
+        )
+        if stat_same and not verify:
             stats.files_skipped += 1
             continue
 
@@ -122,6 +170,15 @@ def index_codebase(
             stats.files_skipped += 1
             continue
 
+        fhash = hashlib.sha256(source).hexdigest()
+        if record is not None and record[0] == fhash:
+            if not stat_same:
+                # Touched but identical: refresh stat for the fast path
+                _update_file_record(conn, path, fhash, repo_path, stat)
+                conn.commit()
+            stats.files_skipped += 1
+            continue
+
         language = detect_language(str(path))
         if language is None:
             stats.files_skipped += 1
@@ -130,13 +187,13 @@ def index_codebase(
         nodes = parse_file(source, str(path), language)
         if not nodes:
             # File parsed but had no extractable nodes — still record it
-            _update_file_record(conn, path, fhash, repo_path)
+            _update_file_record(conn, path, fhash, repo_path, stat)
             stats.files_indexed += 1
             continue
 
         # Store the tree
         store_nodes(conn, nodes, repo_path=repo_path)
-        _update_file_record(conn, path, fhash, repo_path)
+        _update_file_record(conn, path, fhash, repo_path, stat)
         conn.commit()
 
         node_count = _count_nodes(nodes)
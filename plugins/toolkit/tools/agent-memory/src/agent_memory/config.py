@@ -4,14 +4,83 @@
 import os
 from pathlib import Path
 
-# Embedding model configuration
+# Embedding model configuration: the default model for new databases
+# (AGENT_MEMORY_MODEL picks another; `index --reembed` switches existing ones)
 EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
 EMBEDDING_DIM = 384
 
+# Output dimensions of FastEmbed models known to work here; others need
+# AGENT_MEMORY_EMBED_DIM. The -Q variants are int8-quantized ONNX exports.
+MODEL_DIMS = {
+    "BAAI/bge-small-en-v1.5": 384,
+    "BAAI/bge-base-en-v1.5": 768,
+    "BAAI/bge-large-en-v1.5": 1024,
+    "sentence-transformers/all-MiniLM-L6-v2": 384,
+    "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2": 384,
+    "snowflake/snowflake-arctic-embed-xs": 384,
+    "snowflake/snowflake-arctic-embed-s": 384,
+    "snowflake/snowflake-arctic-embed-m": 768,
+    "jinaai/jina-embeddings-v2-small-en": 512,
+    "nomic-ai/nomic-embed-text-v1.5": 768,
+    "nomic-ai/nomic-embed-text-v1.5-Q": 768,
+}
+
 # Chunk sizing (chars, not tokens — approx 4 chars/token)
 CHUNK_MAX_CHARS = 1600
 CHUNK_OVERLAP_CHARS = 320
 
+# Chunk sizing: "chars" uses the limits above; "tokens" counts with the
+# model's tokenizer and packs sections up to its input window; "content"
+# splits oversized sections where their text says (see chunker), so an
+# edit doesn't move every later boundary
+CHUNK_MODES = ("chars", "tokens", "content")
+DEFAULT_CHUNK_MODE = "chars"
+CHUNK_OVERLAP_TOKENS = 64
+# Per-line token counts remembered by a TokenCounter
+TOKEN_COUNT_CACHE_SIZE = 100_000
+
+# Indexing: chunks from many files are embedded together in batches of this size
+INDEX_BATCH_SIZE = 256
+
+# Texts per ONNX inference call inside FastEmbed (its own default)
+EMBED_BATCH_SIZE = 256
+
+# Query embeddings kept in the on-disk LRU cache (AGENT_MEMORY_QUERY_CACHE_SIZE)
+QUERY_CACHE_SIZE = 1000
+
+# chunks_vec storage: float32, int8, or 1-bit sign quantization. New databases
+# use AGENT_MEMORY_VEC_QUANTIZATION; `agent-memory convert` changes existing ones.
+VEC_QUANTIZATIONS = ("float", "int8", "bit")
+DEFAULT_VEC_QUANTIZATION = "float"
+
+# Element type of the float vectors kept in embedding_cache and query_cache.
+# New databases use AGENT_MEMORY_EMBED_STORAGE; `convert --storage` migrates.
+EMBED_STORAGES = ("float32", "float16")
+DEFAULT_EMBED_STORAGE = "float32"
+
+# Pragmas applied to every connection, by profile (AGENT_MEMORY_SQLITE_PROFILE).
+# "baseline" keeps SQLite's defaults. "fast" memory-maps reads (FTS and vec0
+# pages are served from the OS page cache instead of being copied in), keeps
+# a 64 MB page cache and temp tables in memory, and syncs only at WAL
+# checkpoints: a power cut can drop the last commits but can't corrupt the
+# file. AGENT_MEMORY_SQLITE_MMAP_SIZE overrides mmap_size (bytes; 0 disables).
+SQLITE_PROFILES = {
+    "baseline": {},
+    "fast": {
+        "mmap_size": 1 << 30,
+        "cache_size": -64 * 1024,  # negative means KiB
+        "synchronous": "NORMAL",
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+}
+DEFAULT_SQLITE_PROFILE = "fast"
+
+# Approximate KNN (quantized or PCA-reduced index) shortlists this many times
+# the candidates for full-precision re-ranking; sign bits lose more ordering
+# than int8, so they need a longer shortlist
+RERANK_MULTIPLIER = {"int8": 4, "bit": 16, "pca": 4}
+
 # Search weights and thresholds
 VECTOR_WEIGHT = 0.7
 BM25_WEIGHT = 0.3
@@ -20,6 +89,42 @@ MIN_SCORE = 0.35
 DEFAULT_LIMIT = 5
 
 
+def _env_int(name: str) -> int | None:
+    """Read a non-negative integer env var; None when unset or empty."""
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got {value!r}") from None
+    if number < 0:
+        raise ValueError(f"{name} must not be negative, got {number}")
+    return number
+
+
+def get_embedding_model() -> str:
+    """Return the configured embedding model (AGENT_MEMORY_MODEL)."""
+    return os.environ.get("AGENT_MEMORY_MODEL", "").strip() or EMBEDDING_MODEL
+
+
+def get_embedding_dim(model: str | None = None) -> int:
+    """Return the vector dimension of a model (default: the configured one).
+
+    Models missing from MODEL_DIMS take it from AGENT_MEMORY_EMBED_DIM.
+    """
+    model = model or get_embedding_model()
+    if model in MODEL_DIMS:
+        return MODEL_DIMS[model]
+    dim = _env_int("AGENT_MEMORY_EMBED_DIM")
+    if not dim:
+        raise ValueError(
+            f"Unknown dimension for embedding model {model!r}; "
+            f"set AGENT_MEMORY_EMBED_DIM"
+        )
+    return dim
+
+
 def get_memory_dir() -> Path:
     """Return the root memory directory, respecting AGENT_MEMORY_DIR env var."""
     env = os.environ.get("AGENT_MEMORY_DIR")
@@ -36,6 +141,112 @@ def get_db_path() -> Path:
     return get_memory_dir() / "memory.db"
 
 
+def get_socket_path() -> Path:
+    """Return the embedding daemon's Unix socket path, respecting AGENT_MEMORY_SOCKET."""
+    env = os.environ.get("AGENT_MEMORY_SOCKET")
+    if env:
+        return Path(env)
+    return get_memory_dir() / "agent-memory.sock"
+
+
+def get_model_dir() -> Path | None:
+    """Return the pinned model directory from AGENT_MEMORY_MODEL_DIR, if set.
+
+    Overrides the directory `install --model-dir` recorded in the database.
+    """
+    env = os.environ.get("AGENT_MEMORY_MODEL_DIR")
+    return Path(env).expanduser() if env else None
+
+
+def get_embed_batch_size() -> int:
+    """Return texts per inference call, respecting AGENT_MEMORY_EMBED_BATCH_SIZE."""
+    return _env_int("AGENT_MEMORY_EMBED_BATCH_SIZE") or EMBED_BATCH_SIZE
+
+
+def get_embed_threads() -> int | None:
+    """Return ONNX intra-op threads from AGENT_MEMORY_EMBED_THREADS.
+
+    None lets onnxruntime pick (all physical cores).
+    """
+    return _env_int("AGENT_MEMORY_EMBED_THREADS") or None
+
+
+def get_embed_workers() -> int | None:
+    """Return FastEmbed data-parallel workers from AGENT_MEMORY_EMBED_WORKERS.
+
+    None (unset or 1) embeds in-process; 0 means one worker per CPU core.
+    """
+    workers = _env_int("AGENT_MEMORY_EMBED_WORKERS")
+    return None if workers == 1 else workers
+
+
+def get_query_cache_size() -> int:
+    """Return the query cache cap, respecting AGENT_MEMORY_QUERY_CACHE_SIZE (0 disables)."""
+    size = _env_int("AGENT_MEMORY_QUERY_CACHE_SIZE")
+    return QUERY_CACHE_SIZE if size is None else size
+
+
+def get_vec_quantization() -> str:
+    """Return the vector storage type for new databases (AGENT_MEMORY_VEC_QUANTIZATION)."""
+    value = os.environ.get("AGENT_MEMORY_VEC_QUANTIZATION", "").strip().lower()
+    if not value:
+        return DEFAULT_VEC_QUANTIZATION
+    if value not in VEC_QUANTIZATIONS:
+        raise ValueError(
+            f"AGENT_MEMORY_VEC_QUANTIZATION must be one of "
+            f"{', '.join(VEC_QUANTIZATIONS)}, got {value!r}"
+        )
+    return value
+
+
+def get_embed_storage() -> str:
+    """Return the cached-vector element type for new databases (AGENT_MEMORY_EMBED_STORAGE)."""
+    value = os.environ.get("AGENT_MEMORY_EMBED_STORAGE", "").strip().lower()
+    if not value:
+        return DEFAULT_EMBED_STORAGE
+    if value not in EMBED_STORAGES:
+        raise ValueError(
+            f"AGENT_MEMORY_EMBED_STORAGE must be one of "
+            f"{', '.join(EMBED_STORAGES)}, got {value!r}"
+        )
+    return value
+
+
+def get_chunk_mode() -> str:
+    """Return how chunks are split (AGENT_MEMORY_CHUNK_MODE): chars, tokens, or content."""
+    value = os.environ.get("AGENT_MEMORY_CHUNK_MODE", "").strip().lower()
+    if not value:
+        return DEFAULT_CHUNK_MODE
+    if value not in CHUNK_MODES:
+        raise ValueError(
+            f"AGENT_MEMORY_CHUNK_MODE must be one of "
+            f"{', '.join(CHUNK_MODES)}, got {value!r}"
+        )
+    return value
+
+
+def get_sqlite_profile() -> str:
+    """Return the connection profile name (AGENT_MEMORY_SQLITE_PROFILE)."""
+    value = os.environ.get("AGENT_MEMORY_SQLITE_PROFILE", "").strip().lower()
+    if not value:
+        return DEFAULT_SQLITE_PROFILE
+    if value not in SQLITE_PROFILES:
+        raise ValueError(
+            f"AGENT_MEMORY_SQLITE_PROFILE must be one of "
+            f"{', '.join(SQLITE_PROFILES)}, got {value!r}"
+        )
+    return value
+
+
+def get_sqlite_pragmas() -> dict[str, int | str]:
+    """Return the pragmas to set on each connection for the configured profile."""
+    pragmas = dict(SQLITE_PROFILES[get_sqlite_profile()])
+    mmap_size = _env_int("AGENT_MEMORY_SQLITE_MMAP_SIZE")
+    if mmap_size is not None:
+        pragmas["mmap_size"] = mmap_size
+    return pragmas
+
+
 def get_scan_patterns() -> list[str]:
     """Return glob patterns for all memory file locations."""
     memory_dir = get_memory_dir()
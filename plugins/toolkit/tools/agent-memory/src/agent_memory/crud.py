@@ -3,8 +3,11 @@
 
 import sqlite3
 
+from .cache import embed_texts_cached
 from .db import has_sqlite_vec
-from .embedder import content_hash, embed_texts, serialize_f32
+from .embedder import content_hash
+from .store import insert_chunks
+from .vectors import get_index_model
 
 
 def add_memory(
@@ -20,34 +23,11 @@ def add_memory(
     """
     c_hash = content_hash(text)
     chunk_id = content_hash(f"manual:{c_hash}:{tags}")
+    row = (chunk_id, f"manual:{tags}" if tags else "manual", source,
+           0, 0, c_hash, get_index_model(conn), text)
 
-    conn.execute(
-        "INSERT OR REPLACE INTO chunks "
-        "(id, path, source, start_line, end_line, hash, model, text) "
-        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-        (chunk_id, f"manual:{tags}" if tags else "manual", source,
-         0, 0, c_hash, "", text),
-    )
-
-    # Get rowid
-    cursor = conn.execute("SELECT rowid FROM chunks WHERE id = ?", (chunk_id,))
-    rowid = cursor.fetchone()[0]
-
-    # FTS
-    conn.execute(
-        "INSERT OR REPLACE INTO chunks_fts (rowid, text) VALUES (?, ?)",
-        (rowid, text),
-    )
-
-    # Vec
-    if has_sqlite_vec():
-        vectors = embed_texts([text])
-        if vectors:
-            blob = serialize_f32(vectors[0])
-            conn.execute(
-                "INSERT OR REPLACE INTO chunks_vec (rowid, embedding) VALUES (?, ?)",
-                (rowid, blob),
-            )
+    vectors = embed_texts_cached(conn, [text]) if has_sqlite_vec() else None
+    insert_chunks(conn, [row], vectors)
 
     conn.commit()
     return chunk_id
@@ -0,0 +1,253 @@
+# ABOUTME: Persistent embedding daemon that keeps the model and DB connections warm.
+# ABOUTME: JSON-lines over a Unix socket; clients return None so callers fall back in-process.
+
+import base64
+import json
+import os
+import signal
+import socket
+import socketserver
+import sqlite3
+import sys
+from dataclasses import asdict
+from pathlib import Path
+
+from typing import TYPE_CHECKING
+
+from . import embedder
+from .config import get_db_path, get_embedding_model, get_socket_path
+from .embedder import deserialize_f32_array, serialize_f32
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Connecting must be quick so a wedged daemon never costs more than a local load
+_CONNECT_TIMEOUT = 0.5
+# Pings, queries and searches wait behind any batch the daemon is serving, so
+# give up quickly and let the caller do the work in-process
+_REQUEST_TIMEOUT = 3.0
+# Large index batches can take a while to embed on CPU
+_EMBED_TIMEOUT = 300.0
+# Drop clients that connect and go quiet, since requests are served one at a time
+_IDLE_TIMEOUT = 30.0
+
+
+def _encode(vectors: "np.ndarray") -> str:
+    """Encode a float32 vector or matrix as base64 for the wire."""
+    return base64.b64encode(serialize_f32(vectors)).decode("ascii")
+
+
+def _decode(data: str) -> "np.ndarray":
+    """Decode base64 produced by _encode into a flat float32 array."""
+    return deserialize_f32_array(base64.b64decode(data))
+
+
+# --- client ---
+
+
+def request(
+    payload: dict, socket_path: Path | None = None, timeout: float | None = None
+) -> dict | None:
+    """Send one request to the daemon and return its reply.
+
+    timeout defaults to _REQUEST_TIMEOUT. Returns None when no daemon is
+    listening, the connection fails, the reply takes longer than timeout
+    seconds, or the daemon reports an error — callers then do the work
+    in-process.
+    """
+    path = socket_path or get_socket_path()
+    if not path.exists():
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(_CONNECT_TIMEOUT)
+            sock.connect(str(path))
+            sock.settimeout(timeout or _REQUEST_TIMEOUT)
+            sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+            with sock.makefile("rb") as reader:
+                line = reader.readline()
+    except OSError:
+        return None
+    if not line:
+        return None
+    try:
+        reply = json.loads(line)
+    except ValueError:
+        return None
+    if "error" in reply:
+        return None
+    return reply
+
+
+def ping(socket_path: Path | None = None) -> dict | None:
+    """Return daemon info (pid, model) if one is running, else None."""
+    return request({"op": "ping"}, socket_path)
+
+
+def embed_texts_remote(texts: list[str], model: str) -> "np.ndarray | None":
+    """Embed texts with the named model via the daemon; None if unavailable."""
+    reply = request(
+        {"op": "embed", "texts": texts, "model": model}, timeout=_EMBED_TIMEOUT
+    )
+    if reply is None or reply.get("model") != model:
+        return None
+    return _decode(reply["vectors"]).reshape(len(texts), -1)
+
+
+def embed_query_remote(text: str, model: str) -> "np.ndarray | None":
+    """Embed a search query with the named model via the daemon; None if unavailable."""
+    reply = request({"op": "query", "text": text, "model": model})
+    if reply is None or reply.get("model") != model:
+        return None
+    return _decode(reply["vector"])
+
+
+def search_remote(
+    db_path: Path, query: str, mode: str, limit: int, collapse: bool = False
+) -> list | None:
+    """Run a search inside the daemon against db_path.
+
+    mode is "hybrid", "vector" or "keyword"; collapse is passed to the
+    search function. The daemon embeds the query
+    with the model db_path was indexed with. Returns SearchResult objects,
+    or None if no daemon is available.
+    """
+    from .search import SearchResult
+
+    reply = request({
+        "op": "search",
+        "db": str(Path(db_path).resolve()),
+        "query": query,
+        "mode": mode,
+        "limit": limit,
+        "collapse": collapse,
+    })
+    if reply is None:
+        return None
+    return [SearchResult(**r) for r in reply["results"]]
+
+
+# --- server ---
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Answer newline-delimited JSON requests until the client disconnects."""
+
+    timeout = _IDLE_TIMEOUT
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                reply = self.server.dispatch(json.loads(line))
+            except Exception as exc:
+                reply = {"error": f"{type(exc).__name__}: {exc}"}
+            self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class EmbeddingDaemon(socketserver.UnixStreamServer):
+    """Unix socket server holding the embedding model and open DB connections.
+
+    Embed requests name their model; asking for a different model than the
+    loaded one swaps it in.
+
+    Requests are handled one at a time on the serving thread, so the model
+    and the SQLite connections are never shared across threads.
+    """
+
+    def __init__(self, socket_path: Path):
+        self.socket_path = Path(socket_path)
+        self._conns: dict[str, sqlite3.Connection] = {}
+        # Embedding inside the daemon must never route back to the daemon
+        embedder.disable_daemon()
+        self._claim_socket()
+        super().__init__(str(self.socket_path), _Handler)
+        os.chmod(self.socket_path, 0o600)
+
+    def _claim_socket(self) -> None:
+        """Remove a stale socket file, refusing if a live daemon owns it."""
+        if not self.socket_path.exists():
+            self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+            return
+        if ping(self.socket_path) is not None:
+            raise RuntimeError(f"Daemon already running on {self.socket_path}")
+        self.socket_path.unlink()
+
+    def _connection(self, db_path: str) -> sqlite3.Connection:
+        """Return a cached connection for db_path, opening it on first use."""
+        from .db import init_db
+
+        conn = self._conns.get(db_path)
+        if conn is None:
+            conn = init_db(Path(db_path))
+            self._conns[db_path] = conn
+        return conn
+
+    def dispatch(self, req: dict) -> dict:
+        """Handle one decoded request and return the reply object."""
+        op = req.get("op")
+        model = req.get("model") or get_embedding_model()
+        if op == "ping":
+            loaded = embedder._model_name or get_embedding_model()
+            return {"ok": True, "pid": os.getpid(), "model": loaded}
+        if op == "embed":
+            vectors = embedder.embed_texts_array(req["texts"], model)
+            return {"model": model, "vectors": _encode(vectors)}
+        if op == "query":
+            vector = embedder.embed_query_array(req["text"], model)
+            return {"model": model, "vector": _encode(vector)}
+        if op == "search":
+            from .search import search_hybrid, search_keyword, search_vector
+
+            search = {
+                "hybrid": search_hybrid,
+                "vector": search_vector,
+                "keyword": search_keyword,
+            }[req.get("mode", "hybrid")]
+            from .vectors import get_index_model
+
+            conn = self._connection(req["db"])
+            results = search(
+                conn, req["query"], limit=req["limit"], collapse=req.get("collapse", False)
+            )
+            return {"model": get_index_model(conn), "results": [asdict(r) for r in results]}
+        raise ValueError(f"Unknown op: {op}")
+
+    def serve_forever(self, poll_interval: float = 0.5) -> None:
+        """Serve until shutdown, then close DB connections on this thread."""
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            for conn in self._conns.values():
+                conn.close()
+            self._conns.clear()
+
+    def server_close(self) -> None:
+        """Close the listening socket and remove the socket file."""
+        super().server_close()
+        try:
+            self.socket_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def serve(socket_path: Path | None = None) -> None:
+    """Load the model and serve requests until interrupted or terminated."""
+    path = socket_path or get_socket_path()
+    if get_db_path().exists():
+        from .db import init_db
+
+        # Opening the database pins the model directory `install` recorded
+        init_db(get_db_path()).close()
+    embedder._get_model()
+    daemon = EmbeddingDaemon(path)
+
+    # Turn SIGTERM into a normal exit so the socket file is cleaned up
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"Serving on {path} (pid {os.getpid()})", flush=True)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.server_close()
@@ -1,11 +1,31 @@
 # ABOUTME: SQLite database schema and connection management for agent-memory.
-# ABOUTME: Creates tables for chunks, FTS5, sqlite-vec, files, embedding cache, and meta.
+# ABOUTME: Creates chunk text/location tables, FTS5, sqlite-vec, files, embedding/query caches, and meta.
 
 import sqlite3
 from pathlib import Path
 
 _vec_available = None
 
+# Chunk text is stored once per content hash in chunk_texts (which FTS and
+# the vec0 tables are keyed by); chunk_locations says where each copy is.
+# The chunks view joins them back into one row per location.
+_CHUNKS_VIEW_SQL = """
+    CREATE VIEW IF NOT EXISTS chunks AS
+        SELECT l.rowid AS rowid, l.id, l.path, l.source, l.start_line,
+               l.end_line, t.hash, t.model, t.text, l.created_at,
+               l.updated_at, l.text_id
+        FROM chunk_locations l JOIN chunk_texts t ON t.id = l.text_id
+"""
+
+_CHUNKS_FTS_SQL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+        text,
+        content='chunk_texts',
+        content_rowid='id',
+        tokenize='porter unicode61'
+    )
+"""
+
 
 def has_sqlite_vec() -> bool:
     """Check if sqlite-vec extension is available."""
@@ -28,55 +48,271 @@ def _load_vec(conn: sqlite3.Connection) -> None:
         conn.enable_load_extension(False)
 
 
-def init_db(db_path: Path) -> sqlite3.Connection:
-    """Initialize the database: create tables and load extensions.
+def load_vec(conn: sqlite3.Connection) -> bool:
+    """Load sqlite-vec into conn unless it already is; return whether it's available.
 
-    Returns an open connection with WAL mode and foreign keys enabled.
+    open_db leaves the extension unloaded, so code that reads the vec0
+    tables calls this first.
     """
-    db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(db_path))
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA foreign_keys=ON")
-
+    try:
+        conn.execute("SELECT vec_version()")
+        return True
+    except sqlite3.OperationalError:
+        pass
+    if not has_sqlite_vec():
+        return False
     _load_vec(conn)
+    return True
 
-    conn.executescript("""
-        CREATE TABLE IF NOT EXISTS chunks (
-            id        TEXT PRIMARY KEY,
-            path      TEXT NOT NULL,
-            source    TEXT NOT NULL,
-            start_line INTEGER NOT NULL,
-            end_line  INTEGER NOT NULL,
+
+def _apply_pragmas(conn: sqlite3.Connection) -> None:
+    """Set the connection pragmas of the configured SQLite profile."""
+    from agent_memory.config import get_sqlite_pragmas
+
+    for name, value in get_sqlite_pragmas().items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+
+def _add_missing_columns(
+    conn: sqlite3.Connection, table: str, columns: dict[str, str]
+) -> None:
+    """ALTER TABLE ADD COLUMN for each column the table doesn't have yet."""
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for name, decl in columns.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+
+def _has_table(conn: sqlite3.Connection, name: str) -> bool:
+    """Return whether a table (or virtual table) exists."""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (name,)
+    ).fetchone() is not None
+
+
+def _init_index_model(conn: sqlite3.Connection, vec_existed: bool) -> str:
+    """Record which model the chunk vectors come from, on first open.
+
+    New databases use the configured model. Databases indexed before the
+    model was recorded used the original default, EMBEDDING_MODEL.
+    """
+    from agent_memory.config import (
+        EMBEDDING_MODEL,
+        get_embedding_dim,
+        get_embedding_model,
+    )
+
+    model = meta_get(conn, "embedding_model")
+    if model is None:
+        indexed = vec_existed or conn.execute(
+            "SELECT EXISTS (SELECT 1 FROM chunks)"
+        ).fetchone()[0]
+        model = EMBEDDING_MODEL if indexed else get_embedding_model()
+        conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [("embedding_model", model),
+             ("embedding_dim", str(get_embedding_dim(model)))],
+        )
+    return model
+
+
+def _migrate_embedding_cache(conn: sqlite3.Connection, index_model: str) -> None:
+    """Key embedding_cache by (hash, model) and fill in missing chunk models.
+
+    Older databases cached vectors by hash alone and left chunks.model
+    empty; all of those came from the index model.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(embedding_cache)")}
+    if "model" in columns:
+        return
+    conn.execute("""
+        CREATE TABLE embedding_cache_new (
             hash      TEXT NOT NULL,
+            model     TEXT NOT NULL,
+            embedding BLOB NOT NULL,
+            PRIMARY KEY (hash, model)
+        )
+    """)
+    conn.execute(
+        "INSERT INTO embedding_cache_new (hash, model, embedding) "
+        "SELECT hash, ?, embedding FROM embedding_cache",
+        (index_model,),
+    )
+    conn.execute("DROP TABLE embedding_cache")
+    conn.execute("ALTER TABLE embedding_cache_new RENAME TO embedding_cache")
+    conn.execute("UPDATE chunk_texts SET model = ? WHERE model = ''", (index_model,))
+
+
+def _migrate_chunks_table(conn: sqlite3.Connection) -> None:
+    """Split a chunks table from before deduplication into texts and locations.
+
+    Each distinct hash keeps the first copy's text and model; every row
+    becomes a location. FTS is rebuilt over chunk_texts, and vectors are
+    moved from the old chunk rowids to the text ids when sqlite-vec is
+    loaded (without it, `convert` rebuilds the vector index later).
+    Does not commit.
+    """
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = 'chunks'").fetchone()
+    if row is None or row[0] != "table":
+        return
+    conn.execute("""
+        INSERT INTO chunk_texts (hash, model, text)
+        SELECT hash, model, text FROM chunks
+        WHERE rowid IN (SELECT MIN(rowid) FROM chunks GROUP BY hash)
+        ORDER BY rowid
+    """)
+    conn.execute("""
+        INSERT INTO chunk_locations
+            (id, text_id, path, source, start_line, end_line, created_at, updated_at)
+        SELECT c.id, t.id, c.path, c.source, c.start_line, c.end_line,
+               c.created_at, c.updated_at
+        FROM chunks c JOIN chunk_texts t ON t.hash = c.hash
+    """)
+    conn.execute("""
+        CREATE TEMP TABLE chunk_renumber AS
+        SELECT c.rowid AS old, t.id AS new
+        FROM chunks c JOIN chunk_texts t ON t.hash = c.hash
+        WHERE c.rowid IN (SELECT MIN(rowid) FROM chunks GROUP BY hash)
+    """)
+    conn.execute("DROP TABLE IF EXISTS chunks_fts")
+    conn.execute("DROP TABLE chunks")
+    conn.execute(_CHUNKS_VIEW_SQL)
+    conn.execute(_CHUNKS_FTS_SQL)
+    conn.execute("INSERT INTO chunks_fts (chunks_fts) VALUES ('rebuild')")
+    if has_sqlite_vec() and _has_table(conn, "chunks_vec"):
+        from agent_memory.vectors import renumber_vectors
+
+        renumber_vectors(conn, "temp.chunk_renumber")
+    conn.execute("DROP TABLE temp.chunk_renumber")
+
+
+def _upgrade_legacy_layout(conn: sqlite3.Connection) -> None:
+    """Version 1: upgrade layouts written before the schema was versioned."""
+    # Columns added after the first release; CREATE TABLE IF NOT EXISTS
+    # leaves older databases without them.
+    _add_missing_columns(conn, "files", {
+        "tail_offset": "INTEGER NOT NULL DEFAULT 0",
+        "tail_line": "INTEGER NOT NULL DEFAULT 0",
+    })
+    _migrate_chunks_table(conn)
+    _migrate_embedding_cache(conn, meta_get(conn, "embedding_model"))
+
+
+# Indexes for the lookups that otherwise scan a whole table: incremental
+# sync and deletes (chunk_locations by path), `list` (by creation time),
+# code tree walks (code_nodes by parent and file), ref resolution (by name)
+# and ref cleanup on re-index (code_refs by either end).
+_SECONDARY_INDEXES = {
+    "idx_chunk_locations_path": "chunk_locations(path, start_line)",
+    "idx_chunk_locations_source": "chunk_locations(source, created_at)",
+    "idx_chunk_locations_created": "chunk_locations(created_at)",
+    "idx_code_nodes_parent": "code_nodes(parent_id, start_line)",
+    "idx_code_nodes_file": "code_nodes(file_path, repo_path)",
+    "idx_code_nodes_name": "code_nodes(name)",
+    "idx_code_nodes_qualified_name": "code_nodes(qualified_name)",
+    "idx_code_refs_source": "code_refs(source_id)",
+    "idx_code_refs_target": "code_refs(target_id)",
+}
+
+
+def _add_secondary_indexes(conn: sqlite3.Connection) -> None:
+    """Version 2: index the hot lookup columns."""
+    for name, target in _SECONDARY_INDEXES.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+
+
+# _MIGRATIONS[n] upgrades a database at PRAGMA user_version n to n + 1.
+# Each step must be safe to re-run: DDL commits on its own, so a crash can
+# leave a step applied without its version bump. init_db skips the DDL for
+# databases already at SCHEMA_VERSION, so a schema change needs a step here
+# as well as its CREATE in _create_schema.
+_MIGRATIONS = (_upgrade_legacy_layout, _add_secondary_indexes)
+SCHEMA_VERSION = len(_MIGRATIONS)
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """Run the migrations between the database's user_version and SCHEMA_VERSION."""
+    version = _schema_version(conn)
+    for step in range(version, SCHEMA_VERSION):
+        _MIGRATIONS[step](conn)
+        conn.execute(f"PRAGMA user_version = {step + 1}")
+
+
+def _schema_version(conn: sqlite3.Connection) -> int:
+    """Return the database's PRAGMA user_version."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _check_not_newer(conn: sqlite3.Connection) -> None:
+    """Raise before touching a database written by a newer release."""
+    version = _schema_version(conn)
+    if version > SCHEMA_VERSION:
+        conn.close()
+        raise RuntimeError(
+            f"Database schema version {version} is newer than this agent-memory "
+            f"supports ({SCHEMA_VERSION}); upgrade agent-memory"
+        )
+
+
+def _create_schema(conn: sqlite3.Connection) -> None:
+    """Create missing tables and run pending migrations. Does not commit."""
+    conn.executescript(f"""
+        CREATE TABLE IF NOT EXISTS chunk_texts (
+            id        INTEGER PRIMARY KEY,
+            hash      TEXT NOT NULL UNIQUE,
             model     TEXT NOT NULL DEFAULT '',
-            text      TEXT NOT NULL,
+            text      TEXT NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS chunk_locations (
+            id         TEXT PRIMARY KEY,
+            text_id    INTEGER NOT NULL REFERENCES chunk_texts(id),
+            path       TEXT NOT NULL,
+            source     TEXT NOT NULL,
+            start_line INTEGER NOT NULL,
+            end_line   INTEGER NOT NULL,
             created_at TEXT NOT NULL DEFAULT (datetime('now')),
             updated_at TEXT NOT NULL DEFAULT (datetime('now'))
         );
 
+        CREATE INDEX IF NOT EXISTS idx_chunk_locations_text_id
+            ON chunk_locations(text_id);
+
+        {_CHUNKS_VIEW_SQL};
+
         CREATE TABLE IF NOT EXISTS files (
-            path  TEXT PRIMARY KEY,
-            hash  TEXT NOT NULL,
-            mtime REAL NOT NULL,
-            size  INTEGER NOT NULL
+            path        TEXT PRIMARY KEY,
+            hash        TEXT NOT NULL,
+            mtime       REAL NOT NULL,
+            size        INTEGER NOT NULL,
+            tail_offset INTEGER NOT NULL DEFAULT 0,
+            tail_line   INTEGER NOT NULL DEFAULT 0
         );
 
         CREATE TABLE IF NOT EXISTS embedding_cache (
-            hash      TEXT PRIMARY KEY,
-            embedding BLOB NOT NULL
+            hash      TEXT NOT NULL,
+            model     TEXT NOT NULL,
+            embedding BLOB NOT NULL,
+            PRIMARY KEY (hash, model)
+        );
+
+        CREATE TABLE IF NOT EXISTS query_cache (
+            query     TEXT NOT NULL,
+            model     TEXT NOT NULL,
+            embedding BLOB NOT NULL,
+            last_used REAL NOT NULL,
+            PRIMARY KEY (query, model)
         );
 
+        CREATE INDEX IF NOT EXISTS idx_query_cache_last_used
+            ON query_cache(last_used);
+
         CREATE TABLE IF NOT EXISTS meta (
             key   TEXT PRIMARY KEY,
             value TEXT NOT NULL
         );
 
-        CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
-            text,
-            content='chunks',
-            content_rowid='rowid',
-            tokenize='porter unicode61'
-        );
+        {_CHUNKS_FTS_SQL};
 
         CREATE TABLE IF NOT EXISTS code_nodes (
             id             INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -124,24 +360,95 @@ def init_db(db_path: Path) -> sqlite3.Connection:
         );
     """)
 
+    # Cached vectors written before embedding_dtype existed are float32
+    if meta_get(conn, "embedding_dtype") is None:
+        from agent_memory.config import get_embed_storage
+
+        has_vectors = conn.execute(
+            "SELECT EXISTS (SELECT 1 FROM embedding_cache) "
+            "OR EXISTS (SELECT 1 FROM query_cache)"
+        ).fetchone()[0]
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('embedding_dtype', ?)",
+            ("float32" if has_vectors else get_embed_storage(),),
+        )
+
+    _init_index_model(conn, vec_existed=_has_table(conn, "chunks_vec"))
+    _migrate(conn)
+
+
+def init_db(db_path: Path) -> sqlite3.Connection:
+    """Initialize the database: create tables and load extensions.
+
+    Returns an open connection with WAL mode, foreign keys and the
+    configured SQLite profile's pragmas (see SQLITE_PROFILES).
+    The DDL and migrations are skipped when the schema is already current.
+    """
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path))
+    _check_not_newer(conn)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    _apply_pragmas(conn)
+
+    _load_vec(conn)
+
+    if _schema_version(conn) != SCHEMA_VERSION:
+        _create_schema(conn)
+
     # Create vec0 table if sqlite-vec is available
     if has_sqlite_vec():
         # vec0 tables don't support IF NOT EXISTS, so check first
-        cursor = conn.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name='chunks_vec'"
-        )
-        if cursor.fetchone() is None:
-            from agent_memory.config import EMBEDDING_DIM
+        if not _has_table(conn, "chunks_vec"):
+            from agent_memory.config import get_vec_quantization
+            from agent_memory.vectors import create_vec_table
+
+            quantization = meta_get(conn, "vec_quantization") or get_vec_quantization()
+            create_vec_table(conn, quantization)
             conn.execute(
-                f"CREATE VIRTUAL TABLE chunks_vec USING vec0("
-                f"  embedding float[{EMBEDDING_DIM}] distance_metric=cosine"
-                f")"
+                "INSERT OR REPLACE INTO meta (key, value) "
+                "VALUES ('vec_quantization', ?)",
+                (quantization,),
             )
 
     conn.commit()
+    _pin_model_dir(conn)
     return conn
 
 
+def open_db(db_path: Path, read_only: bool = False) -> sqlite3.Connection:
+    """Open a database for commands that don't change its layout.
+
+    When the schema is current this skips init_db's DDL and doesn't load
+    sqlite-vec (see load_vec), so status, get and list open in a few
+    milliseconds. read_only opens through a mode=ro URI, so the
+    connection can't write, and leaves the pinned model dir unset since
+    nothing on it embeds. A missing or out-of-date database goes through
+    init_db instead, which creates or migrates it and returns a writable
+    connection.
+    """
+    if db_path.exists():
+        mode = "ro" if read_only else "rw"
+        conn = sqlite3.connect(f"{db_path.resolve().as_uri()}?mode={mode}", uri=True)
+        if _schema_version(conn) == SCHEMA_VERSION:
+            _apply_pragmas(conn)
+            if not read_only:
+                conn.execute("PRAGMA foreign_keys=ON")
+                _pin_model_dir(conn)
+            return conn
+        conn.close()
+    return init_db(db_path)
+
+
+def _pin_model_dir(conn: sqlite3.Connection) -> None:
+    """Load the model from the directory `install --model-dir` pinned, if any."""
+    model_dir = meta_get(conn, "model_dir")
+    if model_dir:
+        from agent_memory.embedder import set_model_dir
+
+        set_model_dir(Path(model_dir))
+
+
 def meta_set(conn: sqlite3.Connection, key: str, value: str) -> None:
     """Set a key-value pair in the meta table."""
     conn.execute(
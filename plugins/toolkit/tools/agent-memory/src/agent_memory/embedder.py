@@ -1,45 +1,260 @@
-# ABOUTME: FastEmbed wrapper for local text embedding with lazy loading.
-# ABOUTME: Provides embed_texts, embed_query, serialization, and content hashing.
+# ABOUTME: FastEmbed wrapper for local text embedding with lazy loading (or via the daemon).
+# ABOUTME: Embeddings stay float32 ndarrays end to end; list-returning wrappers remain for callers.
 
 import hashlib
 import struct
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
 
-from .config import EMBEDDING_MODEL
+from .config import (
+    get_embed_batch_size,
+    get_embed_threads,
+    get_embed_workers,
+    get_embedding_dim,
+    get_embedding_model,
+    get_model_dir,
+)
 
-# Lazy-loaded singleton
+if TYPE_CHECKING:
+    import numpy as np
+
+# Lazy-loaded model (one at a time, named by _model_name); the lock makes a
+# warm-up and a real call share one load
 _model = None
+_model_name: str | None = None
+_model_lock = threading.Lock()
+_warmup_thread: threading.Thread | None = None
+# Seconds the last model load took
+_load_seconds: float | None = None
 
+# Tokenizers loaded for token-budget chunking: model name -> (tokenizer, budget)
+_tokenizers: dict[str, tuple] = {}
 
-def _get_model():
-    """Load the FastEmbed model on first use."""
-    global _model
-    if _model is None:
-        from fastembed import TextEmbedding
-        _model = TextEmbedding(model_name=EMBEDDING_MODEL)
+# Directory `install --model-dir` pinned (set from the DB's meta by init_db);
+# models load from it with no hub lookup
+_model_dir: Path | None = None
+
+# Route embedding through a running daemon when one is listening
+_use_daemon = True
+
+# Data-parallel worker count set for this process (overrides the env var)
+_workers: int | None = None
+
+
+def set_model_dir(model_dir: Path | None) -> None:
+    """Load models only from model_dir (AGENT_MEMORY_MODEL_DIR still wins)."""
+    global _model_dir
+    _model_dir = model_dir
+
+
+def pinned_model_dir() -> Path | None:
+    """Return the directory models load from, or None for FastEmbed's own cache."""
+    return get_model_dir() or _model_dir
+
+
+def _load(name: str, model_dir: Path | None, **kwargs):
+    """Construct the FastEmbed model, from model_dir's files alone when pinned."""
+    from fastembed import TextEmbedding
+
+    if model_dir is None:
+        return TextEmbedding(model_name=name, threads=get_embed_threads(), **kwargs)
+    missing = FileNotFoundError(
+        f"Embedding model {name} is not installed in {model_dir}; "
+        f"run: agent-memory install --model-dir {model_dir}"
+    )
+    if not model_dir.is_dir():
+        raise missing
+    try:
+        return TextEmbedding(
+            model_name=name, cache_dir=str(model_dir),
+            threads=get_embed_threads(), local_files_only=True, **kwargs,
+        )
+    except (OSError, ValueError) as exc:
+        raise missing from exc
+
+
+def _get_model(model_name: str | None = None):
+    """Load a FastEmbed model on first use (default: the configured model).
+
+    Asking for a different model than the loaded one replaces it. With a
+    pinned model directory the files must already be there: a missing
+    model raises FileNotFoundError instead of downloading.
+    """
+    global _model, _model_name, _load_seconds
+    name = model_name or get_embedding_model()
+    if _model is None or _model_name != name:
+        with _model_lock:
+            if _model is None or _model_name != name:
+                start = time.perf_counter()
+                _model = _load(name, pinned_model_dir())
+                _load_seconds = time.perf_counter() - start
+                _model_name = name
     return _model
 
 
+def load_tokenizer(model_name: str | None = None):
+    """Return (tokenizer, budget) for a model without starting an ONNX session.
+
+    The tokenizer is FastEmbed's own for the model, with truncation and
+    padding turned off so it reports true lengths; budget is the model's
+    input window less the special tokens each input gets.
+    """
+    from fastembed.common.preprocessor_utils import load_tokenizer as _load_tokenizer
+
+    name = model_name or get_embedding_model()
+    if name not in _tokenizers:
+        files = _load(name, pinned_model_dir(), lazy_load=True)
+        tokenizer, _ = _load_tokenizer(files.model._model_dir)
+        window = tokenizer.truncation["max_length"]
+        tokenizer.no_truncation()
+        tokenizer.no_padding()
+        _tokenizers[name] = (tokenizer, window - tokenizer.num_special_tokens_to_add(False))
+    return _tokenizers[name]
+
+
+def install_model(model_dir: Path, model_name: str | None = None) -> None:
+    """Download a model into model_dir unless its files are already there."""
+    from fastembed import TextEmbedding
+
+    model_dir.mkdir(parents=True, exist_ok=True)
+    TextEmbedding(
+        model_name=model_name or get_embedding_model(),
+        cache_dir=str(model_dir), threads=get_embed_threads(),
+    )
+
+
+def measure_load(model_name: str | None = None) -> float:
+    """Load a model from scratch in this process and return the seconds taken."""
+    global _model
+    with _model_lock:
+        _model = None
+    _get_model(model_name)
+    return _load_seconds
+
+
+def _warm(model_name: str | None) -> None:
+    """Thread target: load the model, leaving any error to the next real call."""
+    try:
+        _get_model(model_name)
+    except Exception:
+        pass
+
+
+def warm_up(model_name: str | None = None) -> None:
+    """Start loading the model on a background thread and return immediately.
+
+    Call this as soon as a command knows it will embed, so discovery,
+    chunking or the BM25 query overlap with ONNX session start-up. The
+    next embed call waits for the same load instead of starting another.
+    Does nothing if the model is loaded, a warm-up is running, or a
+    daemon will do the embedding.
+    """
+    global _warmup_thread
+    name = model_name or get_embedding_model()
+    if (_model is not None and _model_name == name) or (
+        _warmup_thread is not None and _warmup_thread.is_alive()
+    ):
+        return
+    if _use_daemon:
+        from .daemon import ping
+        if ping() is not None:
+            return
+    _warmup_thread = threading.Thread(
+        target=_warm, args=(name,), name="model-warm-up", daemon=True
+    )
+    _warmup_thread.start()
+
+
+def disable_daemon() -> None:
+    """Always embed in-process (used by the daemon and by `index --workers`)."""
+    global _use_daemon
+    _use_daemon = False
+
+
+def set_workers(workers: int | None) -> None:
+    """Use FastEmbed data-parallel workers for bulk embedding in this process.
+
+    0 means one worker per CPU core; None or 1 embeds in-process.
+    """
+    global _workers
+    _workers = workers
+
+
+def _parallel() -> int | None:
+    """Return the `parallel` argument for TextEmbedding.embed."""
+    if _workers is not None:
+        return None if _workers == 1 else _workers
+    return get_embed_workers()
+
+
 def content_hash(text: str) -> str:
     """Return SHA-256 hex digest of text for cache keying."""
     return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
 
-def serialize_f32(vector: list[float]) -> bytes:
-    """Pack a float vector into compact binary for sqlite-vec storage."""
-    return struct.pack(f"{len(vector)}f", *vector)
+def serialize_f32(vector) -> bytes | memoryview:
+    """Pack a float vector into compact binary for sqlite-vec storage.
+
+    A contiguous float32 ndarray is returned as a memoryview over its own
+    buffer (no copy); lists are packed with struct.
+    """
+    if isinstance(vector, list):
+        return struct.pack(f"{len(vector)}f", *vector)
+    import numpy as np
+    return memoryview(np.ascontiguousarray(vector, dtype=np.float32))
+
+
+def deserialize_f32(blob: bytes) -> list[float]:
+    """Unpack a binary float vector produced by serialize_f32."""
+    return list(struct.unpack(f"{len(blob) // 4}f", blob))
+
+
+def deserialize_f32_array(blob: bytes) -> "np.ndarray":
+    """View a serialized float vector as a read-only float32 ndarray (no copy)."""
+    import numpy as np
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+def embed_texts_array(texts: list[str], model_name: str | None = None) -> "np.ndarray":
+    """Batch embed texts into a contiguous (len(texts), dim) float32 array.
+
+    model_name defaults to the configured model.
+    """
+    import numpy as np
+    name = model_name or get_embedding_model()
+    if not texts:
+        return np.empty((0, get_embedding_dim(name)), dtype=np.float32)
+    if _use_daemon:
+        from .daemon import embed_texts_remote
+        vectors = embed_texts_remote(texts, name)
+        if vectors is not None:
+            return vectors
+    model = _get_model(name)
+    rows = model.embed(texts, batch_size=get_embed_batch_size(), parallel=_parallel())
+    return np.ascontiguousarray(np.vstack(list(rows)), dtype=np.float32)
+
+
+def embed_query_array(text: str, model_name: str | None = None) -> "np.ndarray":
+    """Embed a single query text into a float32 vector."""
+    import numpy as np
+    name = model_name or get_embedding_model()
+    if _use_daemon:
+        from .daemon import embed_query_remote
+        vector = embed_query_remote(text, name)
+        if vector is not None:
+            return vector
+    model = _get_model(name)
+    embeddings = list(model.query_embed(text))
+    return np.asarray(embeddings[0], dtype=np.float32)
 
 
 def embed_texts(texts: list[str]) -> list[list[float]]:
     """Batch embed texts, returning list of float vectors."""
-    if not texts:
-        return []
-    model = _get_model()
-    embeddings = list(model.embed(texts))
-    return [emb.tolist() for emb in embeddings]
+    return embed_texts_array(texts).tolist()
 
 
 def embed_query(text: str) -> list[float]:
     """Embed a single query text, returning a float vector."""
-    model = _get_model()
-    embeddings = list(model.query_embed(text))
-    return embeddings[0].tolist()
+    return embed_query_array(text).tolist()
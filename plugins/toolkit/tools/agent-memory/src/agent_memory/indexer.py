@@ -1,23 +1,123 @@
 # ABOUTME: Indexing pipeline — scan markdown files, chunk, embed, and store in SQLite.
-# ABOUTME: Supports change detection via file hash to skip unchanged files.
+# ABOUTME: Runs read/chunk, embed, and write as overlapping stages; skips unchanged files.
 
+import fnmatch
 import glob
 import hashlib
+import os
+import queue
 import sqlite3
-from dataclasses import dataclass
-from pathlib import Path
-
-from .chunker import Chunk, chunk_markdown
-from .db import has_sqlite_vec
-from .embedder import content_hash, embed_texts, serialize_f32
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path, PurePath
+
+import numpy as np
+
+from .cache import cache_lookup, cache_store
+from .chunker import Chunk, TokenCounter, iter_chunks
+from .config import (
+    DEFAULT_CHUNK_MODE,
+    INDEX_BATCH_SIZE,
+    get_chunk_mode,
+    get_embedding_dim,
+    get_embedding_model,
+)
+from .db import has_sqlite_vec, meta_get, meta_set
+from .embedder import content_hash, embed_texts_array, load_tokenizer, warm_up
+from .store import delete_chunk_rows, insert_chunks
+from .vectors import get_index_model, get_quantization, rebuild_vec_table
+
+# Bounded queues between stages: files read ahead of the embedder, and
+# embedded batches waiting for the SQLite writer.
+_READ_QUEUE_SIZE = 64
+_WRITE_QUEUE_SIZE = 2
+
+# End-of-stream marker passed down the pipeline
+_DONE = object()
+
+# Keep IN (...) lists well below SQLite's host parameter limit
+_SQL_BATCH = 500
+
+# Sources that are (almost) only ever appended to — see config.get_scan_patterns
+_APPEND_ONLY_SOURCES = {"daily", "session"}
+
+# Read size when hashing a file prefix
+_HASH_BLOCK = 1 << 20
 
 
 @dataclass
 class IndexStats:
-    """Statistics from an indexing run."""
+    """Statistics from an indexing run.
+
+    stage_times maps each pipeline stage (read, embed, write) to the
+    seconds it spent busy and idle (waiting on its neighbours).
+    chunks_truncated counts chunks longer than the model's input window
+    (a single over-long line), known only when chunking by tokens.
+    """
     files_indexed: int = 0
     files_skipped: int = 0
+    files_appended: int = 0
     chunks_created: int = 0
+    chunks_unchanged: int = 0
+    chunks_deleted: int = 0
+    chunks_truncated: int = 0
+    embed_batches: int = 0
+    files_pruned: int = 0
+    chunks_pruned: int = 0
+    stage_times: dict[str, dict[str, float]] = field(default_factory=dict)
+
+
+@dataclass
+class ReembedStats:
+    """Statistics from a re-embedding run.
+
+    chunks_embedded went through the model; chunks_cached already had a
+    vector for the new model in the embedding cache.
+    """
+    model: str = ""
+    previous_model: str = ""
+    chunks_embedded: int = 0
+    chunks_cached: int = 0
+    batches: int = 0
+    index_rebuilt: bool = False
+
+
+@dataclass
+class _FileJob:
+    """A changed file whose chunks are waiting to be embedded and stored.
+
+    mtime comes from the stat taken before reading and size is the number
+    of bytes hashed, so a write racing the read shows up as a change next
+    run. For a tail-only job, chunks cover lines from from_line onward and
+    only stored chunks starting there are replaced. tail_offset/tail_line
+    locate the last chunk, where the next append-only read resumes.
+    """
+    path: Path
+    file_hash: str
+    mtime: float
+    size: int
+    source: str
+    chunks: list[Chunk]
+    hashes: list[str] = field(default_factory=list)
+    from_line: int = 0
+    tail_offset: int = 0
+    tail_line: int = 0
+
+    def __post_init__(self) -> None:
+        if not self.hashes:
+            self.hashes = [content_hash(c.text) for c in self.chunks]
+
+
+@dataclass
+class _FileRecord:
+    """What the files table remembers about an indexed file."""
+    hash: str
+    mtime: float
+    size: int
+    tail_offset: int = 0
+    tail_line: int = 0
 
 
 def classify_source(path: str) -> str:
@@ -32,136 +132,759 @@ def classify_source(path: str) -> str:
 
 
 def discover_files(patterns: list[str]) -> list[Path]:
-    """Expand glob patterns and return sorted list of matching files."""
+    """Expand glob patterns (** spans directories) into a sorted list of files."""
     files = []
     for pattern in patterns:
-        files.extend(Path(p) for p in glob.glob(pattern))
+        files.extend(Path(p) for p in glob.glob(pattern, recursive=True))
     return sorted(set(files))
 
 
-def _file_hash(path: Path) -> str:
-    """Return SHA-256 hex digest of file contents."""
-    return hashlib.sha256(path.read_bytes()).hexdigest()
+class _LineReader:
+    """Iterates a binary file's lines as newline-translated text for iter_chunks.
+
+    Hashes what it reads (except the first skip_hash bytes) and counts it
+    in size. Lines are numbered from 1 where reading started and split as
+    str.splitlines splits the raw text, so they match the chunker's line
+    numbers; the byte offset of each line not yet forgotten is kept so
+    the caller can locate the last chunk without holding the file.
+    """
+
+    def __init__(self, f, hasher, skip_hash: int = 0) -> None:
+        self._f = f
+        self._hasher = hasher
+        self._skip_hash = skip_hash
+        self._offsets: deque[tuple[int, int]] = deque()  # (line, byte offset)
+        self.size = 0
+
+    def __iter__(self):
+        line_no = 0
+        for piece in self._f:  # binary iteration splits after b"\n" only
+            start = self.size
+            self.size += len(piece)
+            if self.size > self._skip_hash:
+                self._hasher.update(piece[max(self._skip_hash - start, 0):])
+            offset = start
+            for line in piece.decode("utf-8").splitlines(keepends=True):
+                line_no += 1
+                self._offsets.append((line_no, offset))
+                offset += len(line.encode("utf-8"))
+                # Universal newlines, as Path.read_text applies them
+                yield line.replace("\r\n", "\n").replace("\r", "\n")
+
+    def forget_before(self, line: int) -> None:
+        """Drop offsets of lines before line (no later chunk starts there)."""
+        while self._offsets and self._offsets[0][0] < line:
+            self._offsets.popleft()
+
+    def offset_of(self, line: int) -> int:
+        """Byte offset where a remembered line starts."""
+        self.forget_before(line)
+        return self._offsets[0][1]
+
+
+def _chunk_lines(
+    reader: _LineReader,
+    path: Path,
+    counter: TokenCounter | None,
+    content_defined: bool = False,
+    in_split_section: bool = False,
+) -> list[Chunk]:
+    """Stream a reader's lines through the chunker, pruning remembered offsets."""
+    chunks = []
+    for chunk in iter_chunks(
+        reader, str(path), counter=counter, content_defined=content_defined,
+        in_split_section=in_split_section,
+    ):
+        reader.forget_before(chunk.start_line)
+        chunks.append(chunk)
+    return chunks
+
+
+def _load_file_records(conn: sqlite3.Connection) -> dict[str, _FileRecord]:
+    """Return the recorded hash, stat, and tail position of every indexed file."""
+    cursor = conn.execute(
+        "SELECT path, hash, mtime, size, tail_offset, tail_line FROM files"
+    )
+    return {row[0]: _FileRecord(*row[1:]) for row in cursor.fetchall()}
 
 
-def _file_changed(conn: sqlite3.Connection, path: Path, current_hash: str) -> bool:
-    """Check if file has changed since last index."""
-    cursor = conn.execute("SELECT hash FROM files WHERE path = ?", (str(path),))
-    row = cursor.fetchone()
-    if row is None:
-        return True
-    return row[0] != current_hash
+def _stat_unchanged(record: _FileRecord | None, stat: os.stat_result) -> bool:
+    """True when mtime and size match the record, so the file needn't be read."""
+    return (
+        record is not None
+        and record.mtime == stat.st_mtime
+        and record.size == stat.st_size
+    )
 
 
-def _update_file_record(conn: sqlite3.Connection, path: Path, file_hash: str) -> None:
-    """Insert or update file record for change detection."""
-    stat = path.stat()
+def _update_file_record(
+    conn: sqlite3.Connection,
+    path: Path,
+    file_hash: str,
+    mtime: float,
+    size: int,
+    tail_offset: int = 0,
+    tail_line: int = 0,
+) -> None:
+    """Insert or update file record for change detection and tail reads."""
     conn.execute(
-        "INSERT OR REPLACE INTO files (path, hash, mtime, size) VALUES (?, ?, ?, ?)",
-        (str(path), file_hash, stat.st_mtime, stat.st_size),
+        "INSERT OR REPLACE INTO files "
+        "(path, hash, mtime, size, tail_offset, tail_line) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (str(path), file_hash, mtime, size, tail_offset, tail_line),
     )
 
 
-def _delete_chunks_for_file(conn: sqlite3.Connection, path: str) -> None:
-    """Delete all chunks (and related FTS/vec entries) for a given file path."""
-    # Get rowids before deleting
-    cursor = conn.execute("SELECT rowid FROM chunks WHERE path = ?", (path,))
-    rowids = [row[0] for row in cursor.fetchall()]
+def _read_full(
+    path: Path,
+    stat: os.stat_result,
+    source: str,
+    counter: TokenCounter | None = None,
+    content_defined: bool = False,
+) -> _FileJob:
+    """Hash and chunk a whole file (by tokens when given a counter).
 
-    if rowids:
-        placeholders = ",".join("?" for _ in rowids)
-        # Delete from FTS
-        conn.execute(
-            f"DELETE FROM chunks_fts WHERE rowid IN ({placeholders})", rowids
-        )
-        # Delete from vec if available
-        if has_sqlite_vec():
-            conn.execute(
-                f"DELETE FROM chunks_vec WHERE rowid IN ({placeholders})", rowids
-            )
-        # Delete from chunks
-        conn.execute(f"DELETE FROM chunks WHERE path = ?", (path,))
+    The file is streamed line by line, so only its chunks are held.
+    """
+    hasher = hashlib.sha256()
+    with path.open("rb") as f:
+        reader = _LineReader(f, hasher)
+        chunks = _chunk_lines(reader, path, counter, content_defined)
+    job = _FileJob(
+        path, hasher.hexdigest(), stat.st_mtime, reader.size, source, chunks,
+    )
+    if source in _APPEND_ONLY_SOURCES and chunks:
+        job.tail_line = chunks[-1].start_line
+        job.tail_offset = reader.offset_of(job.tail_line)
+    return job
 
 
-def _store_chunks(
-    conn: sqlite3.Connection,
-    chunks: list[Chunk],
-    vectors: list[list[float]],
+def _read_appended(
+    path: Path,
+    record: _FileRecord,
+    stat: os.stat_result,
     source: str,
-    model: str,
-) -> int:
-    """Store chunks with their embeddings in all three tables."""
-    count = 0
-    for chunk, vector in zip(chunks, vectors):
-        c_hash = content_hash(chunk.text)
-        chunk_id = content_hash(f"{chunk.source_path}:{chunk.start_line}:{c_hash}")
-
-        conn.execute(
-            "INSERT OR REPLACE INTO chunks "
-            "(id, path, source, start_line, end_line, hash, model, text) "
-            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-            (chunk_id, chunk.source_path, source, chunk.start_line,
-             chunk.end_line, c_hash, model, chunk.text),
+    counter: TokenCounter | None = None,
+    content_defined: bool = False,
+) -> _FileJob | None:
+    """Chunk only the tail of a file that was appended to since last index.
+
+    Checks that the first record.size bytes still hash to record.hash, then
+    re-reads from the start of the last stored chunk (the one that may
+    still be open) and chunks just that tail. Returns None when the prefix
+    changed, so the caller falls back to a full read.
+    """
+    hasher = hashlib.sha256()
+    with path.open("rb") as f:
+        remaining = record.size
+        while remaining > 0:
+            block = f.read(min(_HASH_BLOCK, remaining))
+            if not block:
+                return None
+            hasher.update(block)
+            remaining -= len(block)
+        if hasher.hexdigest() != record.hash:
+            return None
+        f.seek(record.tail_offset)
+        reader = _LineReader(f, hasher, skip_hash=record.size - record.tail_offset)
+        # In content mode a last chunk that doesn't start the file starts at
+        # a heading or at a cut inside a split section; a heading closes the
+        # empty splitter straight away
+        chunks = _chunk_lines(
+            reader, path, counter, content_defined,
+            in_split_section=content_defined and record.tail_line > 1,
         )
 
-        # Get the rowid of the just-inserted chunk
+    shift = record.tail_line - 1
+    for chunk in chunks:
+        chunk.start_line += shift
+        chunk.end_line += shift
+
+    job = _FileJob(
+        path, hasher.hexdigest(), stat.st_mtime, record.tail_offset + reader.size,
+        source, chunks, from_line=record.tail_line,
+        tail_offset=record.tail_offset, tail_line=record.tail_line,
+    )
+    if chunks:
+        job.tail_line = chunks[-1].start_line
+        job.tail_offset = record.tail_offset + reader.offset_of(job.tail_line - shift)
+    return job
+
+
+def _delete_chunks_for_paths(conn: sqlite3.Connection, paths: list[str]) -> int:
+    """Delete all chunks (and related FTS/vec entries) for the given file paths.
+
+    Returns the number of chunks deleted. Does not commit.
+    """
+    rowids: list[int] = []
+    for start in range(0, len(paths), _SQL_BATCH):
+        batch = paths[start:start + _SQL_BATCH]
+        placeholders = ",".join("?" for _ in batch)
         cursor = conn.execute(
-            "SELECT rowid FROM chunks WHERE id = ?", (chunk_id,)
+            f"SELECT rowid FROM chunk_locations WHERE path IN ({placeholders})", batch
         )
-        rowid = cursor.fetchone()[0]
+        rowids.extend(row[0] for row in cursor.fetchall())
+    delete_chunk_rows(conn, rowids)
+    return len(rowids)
 
-        # Insert into FTS
-        conn.execute(
-            "INSERT OR REPLACE INTO chunks_fts (rowid, text) VALUES (?, ?)",
-            (rowid, chunk.text),
-        )
 
-        # Insert into vec if available
-        if has_sqlite_vec():
-            blob = serialize_f32(vector)
-            conn.execute(
-                "INSERT OR REPLACE INTO chunks_vec (rowid, embedding) VALUES (?, ?)",
-                (rowid, blob),
-            )
+def _matches_any(path: str, patterns: list[str]) -> bool:
+    """True if glob.glob(pattern, recursive=True) could have returned path.
 
-        count += 1
-    return count
+    Matching is anchored at the start, one path component at a time, and
+    an absolute path never matches a relative pattern or the other way
+    round: a relative pattern's meaning depends on the working directory
+    of the run that recorded the path.
+    """
+    parts = PurePath(path).parts
+    return any(
+        PurePath(pattern).is_absolute() == PurePath(path).is_absolute()
+        and _match_parts(parts, PurePath(pattern).parts)
+        for pattern in patterns
+    )
 
 
-def index_all(conn: sqlite3.Connection, patterns: list[str]) -> IndexStats:
-    """Full indexing pipeline: discover → chunk → embed → store.
+def _match_parts(parts: tuple[str, ...], pattern: tuple[str, ...]) -> bool:
+    """Match path components against glob components, as glob does."""
+    if not pattern:
+        return not parts
+    head, rest = pattern[0], pattern[1:]
+    if head == "**":
+        # Zero or more directories, skipping hidden ones like glob
+        for i in range(len(parts) + 1):
+            if _match_parts(parts[i:], rest):
+                return True
+            if i < len(parts) and parts[i].startswith("."):
+                return False
+        return False
+    if not parts:
+        return False
+    name = parts[0]
+    if name.startswith(".") and not head.startswith("."):
+        return False  # glob's * and ? don't match a leading dot
+    return fnmatch.fnmatchcase(name, head) and _match_parts(parts[1:], rest)
+
+
+def _prune_missing(
+    conn: sqlite3.Connection,
+    recorded: list[str],
+    discovered: set[str],
+    patterns: list[str],
+    stats: IndexStats,
+) -> None:
+    """Drop chunks and file records for files that no longer exist.
+
+    Only records covered by the scanned patterns are considered, so files
+    indexed through another --path are left alone. Runs as one transaction.
+    """
+    stale = [
+        p for p in recorded
+        if p not in discovered and _matches_any(p, patterns)
+    ]
+    if not stale:
+        return
+    stats.chunks_pruned += _delete_chunks_for_paths(conn, stale)
+    conn.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in stale])
+    conn.commit()
+    stats.files_pruned += len(stale)
+
+
+def _chunk_id(path: str, c_hash: str, occurrence: int) -> str:
+    """Stable chunk ID from file path, content hash, and which copy of that text it is.
+
+    Line numbers are left out, so a chunk keeps its ID when text above it
+    is inserted or removed.
+    """
+    return content_hash(f"{path}:{c_hash}:{occurrence}")
+
 
-    Skips files that haven't changed since last index.
+def _chunk_ids(conn: sqlite3.Connection, job: _FileJob) -> list[str]:
+    """IDs for a job's chunks, numbering repeated text in file order.
+
+    A tail-only job continues the numbering from the stored chunks before
+    job.from_line, so its IDs never collide with theirs.
     """
-    stats = IndexStats()
-    files = discover_files(patterns)
+    seen: dict[str, int] = {}
+    if job.from_line > 0:
+        seen.update(conn.execute(
+            "SELECT hash, COUNT(*) FROM chunks "
+            "WHERE path = ? AND start_line < ? GROUP BY hash",
+            (str(job.path), job.from_line),
+        ).fetchall())
+    ids = []
+    for h in job.hashes:
+        occurrence = seen.get(h, 0)
+        seen[h] = occurrence + 1
+        ids.append(_chunk_id(str(job.path), h, occurrence))
+    return ids
+
+
+def _sync_chunks(
+    conn: sqlite3.Connection,
+    job: _FileJob,
+    vectors: dict[str, np.ndarray],
+    model: str,
+) -> tuple[int, int, int]:
+    """Bring a file's stored chunks in line with its new chunking.
 
-    for path in files:
-        fhash = _file_hash(path)
-        if not _file_changed(conn, path, fhash):
-            stats.files_skipped += 1
+    Only stored chunks starting at or after job.from_line take part, so a
+    tail-only job leaves the rest of the file alone.
+
+    Existing rows are matched to new chunks by content hash: matched rows
+    keep their FTS and vec entries and only get new line numbers, new
+    chunks are inserted, and rows whose text vanished are deleted. Rows
+    already holding a new chunk's ID are matched first so IDs never collide.
+    Returns (created, unchanged, deleted).
+    """
+    cursor = conn.execute(
+        "SELECT rowid, id, hash, start_line, end_line FROM chunks "
+        "WHERE path = ? AND start_line >= ?",
+        (str(job.path), job.from_line),
+    )
+    existing = cursor.fetchall()
+    by_id = {row[1]: row[0] for row in existing}
+    positions = {row[0]: (row[1], row[3], row[4]) for row in existing}
+    by_hash: dict[str, list[int]] = {}
+    for rowid, _, h, _, _ in existing:
+        by_hash.setdefault(h, []).append(rowid)
+
+    new_ids = _chunk_ids(conn, job)
+    matched: dict[int, int] = {}  # chunk index → existing rowid
+    claimed: set[int] = set()
+    for i, chunk_id in enumerate(new_ids):
+        rowid = by_id.get(chunk_id)
+        if rowid is not None:
+            matched[i] = rowid
+            claimed.add(rowid)
+    for i, h in enumerate(job.hashes):
+        if i in matched:
             continue
+        for rowid in by_hash.get(h, []):
+            if rowid not in claimed:
+                matched[i] = rowid
+                claimed.add(rowid)
+                break
+
+    vanished = [row[0] for row in existing if row[0] not in claimed]
+    delete_chunk_rows(conn, vanished)
+
+    moved = [
+        (new_ids[i], job.chunks[i].start_line, job.chunks[i].end_line,
+         job.source, rowid)
+        for i, rowid in matched.items()
+        if positions[rowid]
+        != (new_ids[i], job.chunks[i].start_line, job.chunks[i].end_line)
+    ]
+    conn.executemany(
+        "UPDATE chunk_locations SET id = ?, start_line = ?, end_line = ?, source = ?, "
+        "updated_at = datetime('now') WHERE rowid = ?",
+        moved,
+    )
 
-        text = path.read_text(encoding="utf-8")
-        chunks = chunk_markdown(text, source_path=str(path))
+    new = [i for i in range(len(job.chunks)) if i not in matched]
+    created = _store_chunks(
+        conn,
+        [job.chunks[i] for i in new],
+        [new_ids[i] for i in new],
+        [vectors[job.hashes[i]] for i in new],
+        job.source,
+        model,
+    )
+    return created, len(matched), len(vanished)
 
-        if not chunks:
-            stats.files_skipped += 1
+
+def _store_chunks(
+    conn: sqlite3.Connection,
+    chunks: list[Chunk],
+    ids: list[str],
+    vectors: list[np.ndarray],
+    source: str,
+    model: str,
+) -> int:
+    """Store chunks under ids with their embeddings (made by model).
+
+    Text already stored for another location is reused, with its vector.
+    """
+    rows = []
+    for chunk, chunk_id in zip(chunks, ids):
+        c_hash = content_hash(chunk.text)
+        rows.append((
+            chunk_id, chunk.source_path, source,
+            chunk.start_line, chunk.end_line, c_hash, model, chunk.text,
+        ))
+    insert_chunks(conn, rows, vectors)
+    return len(rows)
+
+
+class _Stage:
+    """Busy/idle stopwatch for one pipeline stage."""
+
+    def __init__(self) -> None:
+        self.idle = 0.0
+        self._start = time.perf_counter()
+        self._end: float | None = None
+
+    def wait(self, fn, *args):
+        """Run a blocking queue operation, counting its duration as idle."""
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.idle += time.perf_counter() - t0
+
+    def finish(self) -> None:
+        self._end = time.perf_counter()
+
+    def times(self) -> dict[str, float]:
+        end = self._end if self._end is not None else time.perf_counter()
+        total = end - self._start
+        return {"busy": round(total - self.idle, 4), "idle": round(self.idle, 4)}
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> None:
+    """Put onto a bounded queue, giving up if the pipeline is stopping."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return
+        except queue.Full:
             continue
 
-        # Embed all chunks
-        texts = [c.text for c in chunks]
-        vectors = embed_texts(texts)
+
+def _get(q: queue.Queue, stop: threading.Event):
+    """Get from a queue; returns _DONE once the pipeline stops and drains."""
+    while True:
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            if stop.is_set():
+                return _DONE
+
+
+def _read_stage(
+    files: list[Path],
+    known_files: dict[str, _FileRecord],
+    known_hashes: set[str],
+    model: str,
+    counter: TokenCounter | None,
+    content_defined: bool,
+    verify: bool,
+    touched: list[_FileJob],
+    out_q: queue.Queue,
+    stop: threading.Event,
+    stage: _Stage,
+    stats: IndexStats,
+) -> None:
+    """Read and chunk changed files, handing them to the embedder.
+
+    Files whose mtime and size match their record are skipped without
+    being opened unless verify is set. Daily logs and session files that
+    only grew are read from their last chunk onward. Files whose stat
+    changed but whose content didn't are added to touched so their record
+    is refreshed. The first chunk with no cached embedding starts the
+    model loading in the background. With a counter, chunks are sized in
+    model tokens and over-long ones are counted in stats; content_defined
+    picks content-defined splits (see chunker.chunk_markdown).
+    """
+    warming = False
+    for path in files:
+        if stop.is_set():
+            return
+        record = known_files.get(str(path))
+        stat = path.stat()
+        if not verify and _stat_unchanged(record, stat):
+            stats.files_skipped += 1
+            continue
 
         source = classify_source(str(path))
+        job = None
+        if (
+            source in _APPEND_ONLY_SOURCES
+            and record is not None
+            and record.tail_line > 0
+            and stat.st_size > record.size
+        ):
+            job = _read_appended(path, record, stat, source, counter, content_defined)
+            if job is not None:
+                stats.files_appended += 1
+        if job is None:
+            job = _read_full(path, stat, source, counter, content_defined)
+            if record is not None and record.hash == job.file_hash:
+                touched.append(job)
+                stats.files_skipped += 1
+                continue
+
+        if not job.chunks and job.from_line == 0:
+            stats.files_skipped += 1
+            continue
+        if counter is not None:
+            stats.chunks_truncated += sum(c.tokens > counter.budget for c in job.chunks)
+        if not warming and any(h not in known_hashes for h in job.hashes):
+            warm_up(model)
+            warming = True
+        stage.wait(_put, out_q, job, stop)
+
+
+def _embed_stage(
+    in_q: queue.Queue,
+    out_q: queue.Queue,
+    batch_size: int,
+    known_hashes: set[str],
+    model: str,
+    stop: threading.Event,
+    stage: _Stage,
+    stats: IndexStats,
+) -> None:
+    """Collect chunks across files into batches and embed unseen text.
+
+    Text whose hash is already in the embedding cache is left for the
+    writer to fetch; only new text goes through the model.
+    """
+    pending: list[_FileJob] = []
+    pending_chunks = 0
+
+    def flush() -> None:
+        missing: dict[str, str] = {}
+        for job in pending:
+            for h, chunk in zip(job.hashes, job.chunks):
+                if h not in known_hashes and h not in missing:
+                    missing[h] = chunk.text
+        fresh = {}
+        if missing:
+            fresh = dict(zip(missing, embed_texts_array(list(missing.values()), model)))
+        known_hashes.update(fresh)
+        stats.embed_batches += 1
+        stage.wait(_put, out_q, (list(pending), fresh), stop)
+
+    while True:
+        job = stage.wait(_get, in_q, stop)
+        if job is _DONE:
+            break
+        pending.append(job)
+        pending_chunks += len(job.chunks)
+        if pending_chunks >= batch_size:
+            flush()
+            pending.clear()
+            pending_chunks = 0
+
+    if pending and not stop.is_set():
+        flush()
+
+
+def _write_batch(
+    conn: sqlite3.Connection,
+    jobs: list[_FileJob],
+    fresh: dict[str, np.ndarray],
+    model: str,
+    stats: IndexStats,
+) -> None:
+    """Store one embedded batch; all files in it commit as one transaction.
 
-        # Atomic: delete old, insert new
-        _delete_chunks_for_file(conn, str(path))
-        created = _store_chunks(conn, chunks, vectors, source, "")
-        _update_file_record(conn, path, fhash)
-        conn.commit()
+    Vectors for text the embedder skipped come from the cache; anything
+    missing there (e.g. removed by another process) is embedded here.
+    """
+    needed = [h for job in jobs for h in job.hashes if h not in fresh]
+    vectors = cache_lookup(conn, needed, model)
+    missing = {}
+    for job in jobs:
+        for h, chunk in zip(job.hashes, job.chunks):
+            if h not in fresh and h not in vectors:
+                missing[h] = chunk.text
+    if missing:
+        fresh = {
+            **fresh,
+            **dict(zip(missing, embed_texts_array(list(missing.values()), model))),
+        }
+    cache_store(conn, fresh, model)
+    vectors.update(fresh)
+
+    for job in jobs:
+        created, unchanged, deleted = _sync_chunks(conn, job, vectors, model)
+        _update_file_record(
+            conn, job.path, job.file_hash, job.mtime, job.size,
+            job.tail_offset, job.tail_line,
+        )
 
         stats.files_indexed += 1
         stats.chunks_created += created
+        stats.chunks_unchanged += unchanged
+        stats.chunks_deleted += deleted
+    conn.commit()
+
+
+def _run_stage(target, errors: list, stop: threading.Event, out_q, stage, *args):
+    """Thread body: run a stage, record failures, always signal end-of-stream."""
+    try:
+        target(*args)
+    except BaseException as exc:  # re-raised on the calling thread
+        errors.append(exc)
+        stop.set()
+    finally:
+        stage.finish()
+        stage.wait(_put, out_q, _DONE, stop)
+
 
+def index_all(
+    conn: sqlite3.Connection,
+    patterns: list[str],
+    batch_size: int = INDEX_BATCH_SIZE,
+    verify: bool = False,
+) -> IndexStats:
+    """Full indexing pipeline: discover → chunk → embed → store.
+
+    Skips files that haven't changed since last index: a file whose mtime
+    and size match its record is not read at all, and only files whose
+    stat changed are hashed. verify=True hashes every file regardless.
+    Daily logs and session files whose old content is an unchanged prefix
+    are only chunked from their last (still open) chunk onward.
+    Recorded files matched by the patterns but no longer on disk (deleted
+    or renamed) are pruned along with their chunks before indexing.
+    Three stages run concurrently, connected by bounded queues: a reader
+    thread hashes, reads, and chunks files; an embedding thread batches
+    chunks across files (about batch_size texts per model call); and the
+    calling thread writes batches to SQLite, so only one thread touches
+    the connection.
+    New text is embedded with the database's index model; see
+    reembed_all for switching models. AGENT_MEMORY_CHUNK_MODE=tokens
+    sizes chunks with that model's tokenizer, and =content splits long
+    sections at content-defined boundaries; when the mode differs from
+    the one recorded in meta, every matched file is re-chunked (chunks
+    whose text survives keep their vectors).
+    """
+    stats = IndexStats()
+    files = discover_files(patterns)
+    known_files = _load_file_records(conn)
+    _prune_missing(
+        conn, list(known_files), {str(p) for p in files}, patterns, stats
+    )
+    touched: list[_FileJob] = []
+    model = get_index_model(conn)
+    known_hashes = {row[0] for row in conn.execute(
+        "SELECT hash FROM embedding_cache WHERE model = ?", (model,)
+    )}
+    chunk_mode = get_chunk_mode()
+    counter = TokenCounter(*load_tokenizer(model)) if chunk_mode == "tokens" else None
+    # Files chunked under another mode are read as if new
+    rechunk = meta_get(conn, "chunk_mode", DEFAULT_CHUNK_MODE) != chunk_mode
+    read_records = {} if rechunk else known_files
+
+    read_q: queue.Queue = queue.Queue(maxsize=_READ_QUEUE_SIZE)
+    write_q: queue.Queue = queue.Queue(maxsize=_WRITE_QUEUE_SIZE)
+    stop = threading.Event()
+    errors: list[BaseException] = []
+    stages = {"read": _Stage(), "embed": _Stage(), "write": _Stage()}
+
+    threads = [
+        threading.Thread(
+            target=_run_stage, name="agent-memory-read", daemon=True,
+            args=(_read_stage, errors, stop, read_q, stages["read"],
+                  files, read_records, known_hashes, model, counter,
+                  chunk_mode == "content", verify, touched,
+                  read_q,
+                  stop, stages["read"], stats),
+        ),
+        threading.Thread(
+            target=_run_stage, name="agent-memory-embed", daemon=True,
+            args=(_embed_stage, errors, stop, write_q, stages["embed"],
+                  read_q, write_q, batch_size, known_hashes, model, stop,
+                  stages["embed"], stats),
+        ),
+    ]
+    for t in threads:
+        t.start()
+
+    try:
+        while True:
+            item = stages["write"].wait(_get, write_q, stop)
+            if item is _DONE:
+                break
+            jobs, fresh = item
+            _write_batch(conn, jobs, fresh, model, stats)
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        for t in threads:
+            t.join()
+        stages["write"].finish()
+        stats.stage_times = {name: st.times() for name, st in stages.items()}
+
+    if errors:
+        raise errors[0]
+
+    # Content unchanged but stat moved (touch, copy): refresh the record so
+    # the next run takes the stat fast path again.
+    if touched:
+        for job in touched:
+            _update_file_record(
+                conn, job.path, job.file_hash, job.mtime, job.size,
+                job.tail_offset, job.tail_line,
+            )
+        conn.commit()
+    if rechunk:
+        meta_set(conn, "chunk_mode", chunk_mode)
+    return stats
+
+
+def reembed_all(
+    conn: sqlite3.Connection,
+    model: str | None = None,
+    batch_size: int = INDEX_BATCH_SIZE,
+) -> ReembedStats:
+    """Switch the database to another embedding model (default: the configured one).
+
+    Only chunk texts whose model differs are embedded, batch_size at a
+    time in id order; text shared by several locations is embedded once.
+    Each batch caches the new vectors and marks its texts
+    with the new model in one transaction, so an interrupted run resumes
+    where it stopped. Until every chunk is done, search keeps using the
+    old model and its vector index. Then chunks_vec is rebuilt from the
+    cache (at the new dimension if it changed) and the new model becomes
+    the index model.
+    """
+    target = model or get_embedding_model()
+    get_embedding_dim(target)  # unknown models fail before any work
+    stats = ReembedStats(model=target, previous_model=get_index_model(conn))
+
+    last_rowid = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, hash, text FROM chunk_texts "
+            "WHERE id > ? AND model != ? ORDER BY id LIMIT ?",
+            (last_rowid, target, batch_size),
+        ).fetchall()
+        if not rows:
+            break
+        if stats.batches == 0:
+            warm_up(target)
+        vectors = cache_lookup(conn, [h for _, h, _ in rows], target)
+        missing = {h: text for _, h, text in rows if h not in vectors}
+        if missing:
+            fresh = embed_texts_array(list(missing.values()), target)
+            cache_store(conn, dict(zip(missing, fresh)), target)
+        embedded = sum(1 for _, h, _ in rows if h in missing)
+        stats.chunks_embedded += embedded
+        stats.chunks_cached += len(rows) - embedded
+
+        rowids = [rowid for rowid, _, _ in rows]
+        placeholders = ",".join("?" for _ in rowids)
+        conn.execute(
+            f"UPDATE chunk_texts SET model = ? WHERE id IN ({placeholders})",
+            [target, *rowids],
+        )
+        conn.commit()
+        stats.batches += 1
+        last_rowid = rowids[-1]
+
+    if stats.previous_model != target:
+        if has_sqlite_vec():
+            rebuild_vec_table(conn, get_quantization(conn), target)
+            stats.index_rebuilt = True
+        else:
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [("embedding_model", target),
+                 ("embedding_dim", str(get_embedding_dim(target)))],
+            )
+            conn.commit()
     return stats
@@ -1,8 +1,10 @@
 # ABOUTME: Hybrid search engine combining vector similarity and BM25 keyword search.
 # ABOUTME: Supports vector-only, keyword-only, and hybrid (0.7/0.3) search modes.
+# ABOUTME: Hits are per distinct text, reported at every location or collapsed to one.
 
 import sqlite3
 from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
 from .config import (
     BM25_WEIGHT,
@@ -11,8 +13,13 @@ from .config import (
     MIN_SCORE,
     VECTOR_WEIGHT,
 )
+from .cache import query_cache_get, query_cache_put
 from .db import has_sqlite_vec
-from .embedder import embed_query, serialize_f32
+from .embedder import embed_query_array, warm_up
+from .vectors import get_index_model, knn
+
+if TYPE_CHECKING:
+    import numpy as np
 
 
 @dataclass
@@ -25,9 +32,11 @@ class SearchResult:
     score: float
     start_line: int
     end_line: int
+    query_cached: bool = False  # query vector came from the query cache
+    locations: int = 1  # places this exact text is stored, this one included
 
 
-def _row_to_result(row: tuple, score: float) -> SearchResult:
+def _row_to_result(row: tuple, score: float, locations: int = 1) -> SearchResult:
     """Convert a DB row + score to a SearchResult."""
     return SearchResult(
         chunk_id=row[0],
@@ -37,6 +46,7 @@ def _row_to_result(row: tuple, score: float) -> SearchResult:
         score=score,
         start_line=row[4],
         end_line=row[5],
+        locations=locations,
     )
 
 
@@ -55,24 +65,67 @@ def _sanitize_fts_query(query: str) -> str:
     return " ".join(f'"{t}"' for t in tokens)
 
 
-def _fetch_chunk_by_rowid(conn: sqlite3.Connection, rowid: int) -> tuple | None:
-    """Fetch chunk data by rowid."""
+def _query_vector(
+    conn: sqlite3.Connection, query: str, cached: "np.ndarray | None" = None
+) -> tuple["np.ndarray", bool]:
+    """Return (query vector, cache hit), embedding and caching on a miss.
+
+    Queries are embedded with the model the database was indexed with.
+    """
+    if cached is None:
+        cached = query_cache_get(conn, query)
+    if cached is not None:
+        return cached, True
+    vector = embed_query_array(query, get_index_model(conn))
+    query_cache_put(conn, query, vector)
+    return vector, False
+
+
+def _fetch_locations(conn: sqlite3.Connection, text_id: int) -> list[tuple]:
+    """Fetch every location of a chunk text, most recently indexed first."""
     cursor = conn.execute(
         "SELECT id, text, path, source, start_line, end_line "
-        "FROM chunks WHERE rowid = ?",
-        (rowid,),
+        "FROM chunks WHERE text_id = ? ORDER BY updated_at DESC, path, start_line",
+        (text_id,),
     )
-    return cursor.fetchone()
+    return cursor.fetchall()
+
+
+def _expand(
+    conn: sqlite3.Connection,
+    scored: list[tuple[int, float]],
+    limit: int,
+    collapse: bool,
+    query_cached: bool = False,
+) -> list[SearchResult]:
+    """Turn (text id, score) hits, best first, into up to limit results.
+
+    Every location of a text becomes a result with its score, unless
+    collapse, which keeps only the most recently indexed one; either way
+    each result's locations field counts them all.
+    """
+    results: list[SearchResult] = []
+    for text_id, score in scored:
+        rows = _fetch_locations(conn, text_id)
+        for row in rows[:1] if collapse else rows:
+            result = _row_to_result(row, score, len(rows))
+            result.query_cached = query_cached
+            results.append(result)
+        if len(results) >= limit:
+            break
+    return results[:limit]
 
 
 def search_keyword(
     conn: sqlite3.Connection,
     query: str,
     limit: int = DEFAULT_LIMIT,
+    collapse: bool = False,
 ) -> list[SearchResult]:
     """BM25 keyword search using FTS5.
 
-    Returns results sorted by relevance score (descending).
+    Returns results sorted by relevance score (descending); collapse
+    reports text stored in several places once.
     """
     safe_query = _sanitize_fts_query(query)
     n_candidates = limit * CANDIDATE_MULTIPLIER
@@ -81,51 +134,30 @@ def search_keyword(
         "ORDER BY rank LIMIT ?",
         (safe_query, n_candidates),
     )
-    rows = cursor.fetchall()
-
-    results = []
-    for rowid, rank in rows:
-        score = 1.0 / (1.0 + abs(rank))
-        chunk = _fetch_chunk_by_rowid(conn, rowid)
-        if chunk:
-            results.append(_row_to_result(chunk, score))
-
-    results.sort(key=lambda r: r.score, reverse=True)
-    return results[:limit]
+    scored = [(rowid, 1.0 / (1.0 + abs(rank))) for rowid, rank in cursor.fetchall()]
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return _expand(conn, scored, limit, collapse)
 
 
 def search_vector(
     conn: sqlite3.Connection,
     query: str,
     limit: int = DEFAULT_LIMIT,
+    collapse: bool = False,
 ) -> list[SearchResult]:
     """Vector similarity search using sqlite-vec.
 
-    Returns results sorted by cosine similarity (descending).
+    Returns results sorted by cosine similarity (descending); collapse
+    reports text stored in several places once.
     """
     if not has_sqlite_vec():
         return []
 
-    query_vec = embed_query(query)
-    query_blob = serialize_f32(query_vec)
+    query_vec, hit = _query_vector(conn, query)
     n_candidates = limit * CANDIDATE_MULTIPLIER
 
-    cursor = conn.execute(
-        "SELECT rowid, distance FROM chunks_vec "
-        "WHERE embedding MATCH ? ORDER BY distance LIMIT ?",
-        (query_blob, n_candidates),
-    )
-    rows = cursor.fetchall()
-
-    results = []
-    for rowid, distance in rows:
-        score = 1.0 - distance  # cosine distance → similarity
-        chunk = _fetch_chunk_by_rowid(conn, rowid)
-        if chunk:
-            results.append(_row_to_result(chunk, score))
-
-    results.sort(key=lambda r: r.score, reverse=True)
-    return results[:limit]
+    scored = sorted(knn(conn, query_vec, n_candidates), key=lambda item: item[1], reverse=True)
+    return _expand(conn, scored, limit, collapse, hit)
 
 
 def search_hybrid(
@@ -135,12 +167,18 @@ def search_hybrid(
     vector_weight: float = VECTOR_WEIGHT,
     bm25_weight: float = BM25_WEIGHT,
     min_score: float = MIN_SCORE,
+    collapse: bool = False,
 ) -> list[SearchResult]:
     """Hybrid search combining vector and BM25 scores.
 
     Score = vector_weight * vector_score + bm25_weight * bm25_score
-    Filters results below min_score threshold.
+    Filters results below min_score threshold; collapse reports text
+    stored in several places once.
     """
+    # On a query cache miss, load the model while the BM25 query runs
+    cached = query_cache_get(conn, query) if has_sqlite_vec() else None
+    if has_sqlite_vec() and cached is None:
+        warm_up(get_index_model(conn))
     n_candidates = limit * CANDIDATE_MULTIPLIER
 
     # Gather BM25 scores
@@ -159,16 +197,10 @@ def search_hybrid(
 
     # Gather vector scores
     vec_scores: dict[int, float] = {}
+    hit = False
     if has_sqlite_vec():
-        query_vec = embed_query(query)
-        query_blob = serialize_f32(query_vec)
-        cursor = conn.execute(
-            "SELECT rowid, distance FROM chunks_vec "
-            "WHERE embedding MATCH ? ORDER BY distance LIMIT ?",
-            (query_blob, n_candidates),
-        )
-        for rowid, distance in cursor.fetchall():
-            vec_scores[rowid] = 1.0 - distance
+        query_vec, hit = _query_vector(conn, query, cached)
+        vec_scores = dict(knn(conn, query_vec, n_candidates))
 
     # Fuse scores
     all_rowids = set(bm25_scores.keys()) | set(vec_scores.keys())
@@ -181,11 +213,4 @@ def search_hybrid(
             fused.append((rowid, combined))
 
     fused.sort(key=lambda x: x[1], reverse=True)
-
-    results = []
-    for rowid, score in fused[:limit]:
-        chunk = _fetch_chunk_by_rowid(conn, rowid)
-        if chunk:
-            results.append(_row_to_result(chunk, score))
-
-    return results
+    return _expand(conn, fused, limit, collapse, hit)
@@ -0,0 +1,182 @@
+# ABOUTME: Bulk writes of memory chunks: text once per hash with FTS5/sqlite-vec rows, plus locations.
+# ABOUTME: Multi-row INSERT ... RETURNING keeps statements per chunk far below one.
+
+import sqlite3
+
+import numpy as np
+
+from .db import has_sqlite_vec
+from .vectors import delete_vectors, insert_vectors
+
+# Host parameters per multi-row statement: under the 999 limit of older
+# SQLite builds
+_MAX_PARAMS = 999
+
+# Keep IN (...) lists well below SQLite's host parameter limit
+_SQL_BATCH = 500
+
+# INSERT ... RETURNING needs SQLite 3.35+
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# (id, path, source, start_line, end_line, hash, model, text)
+ChunkRow = tuple[str, str, str, int, int, str, str, str]
+
+
+def _values_clause(n_rows: int, n_cols: int) -> str:
+    """Return '(?, ?), (?, ?)' style placeholders for a multi-row VALUES."""
+    row = "(" + ", ".join("?" for _ in range(n_cols)) + ")"
+    return ", ".join(row for _ in range(n_rows))
+
+
+def _insert_many(
+    conn: sqlite3.Connection, table: str, columns: str, rows: list[tuple],
+    returning: str | None = None,
+) -> list[tuple]:
+    """Multi-row INSERT of rows, as few statements as the parameter limit allows.
+
+    With returning (e.g. "hash, id"), returns those columns of the new rows.
+    """
+    n_cols = len(rows[0]) if rows else 0
+    per_statement = max(_MAX_PARAMS // max(n_cols, 1), 1)
+    returned: list[tuple] = []
+    for start in range(0, len(rows), per_statement):
+        batch = rows[start:start + per_statement]
+        sql = f"INSERT INTO {table} ({columns}) VALUES {_values_clause(len(batch), n_cols)}"
+        params = [value for row in batch for value in row]
+        if returning:
+            sql += f" RETURNING {returning}"
+        returned.extend(conn.execute(sql, params).fetchall())
+    return returned
+
+
+def _store_texts(
+    conn: sqlite3.Connection,
+    rows: list[ChunkRow],
+    vectors: np.ndarray | list[np.ndarray] | None,
+) -> dict[str, int]:
+    """Return hash → chunk_texts id for rows, storing text not seen before.
+
+    Only new text gets an FTS row and (with vectors) a vector, taken from
+    the first row carrying it.
+    """
+    hashes = list(dict.fromkeys(row[5] for row in rows))
+    ids: dict[str, int] = {}
+    for start in range(0, len(hashes), _SQL_BATCH):
+        batch = hashes[start:start + _SQL_BATCH]
+        placeholders = ",".join("?" for _ in batch)
+        ids.update(conn.execute(
+            f"SELECT hash, id FROM chunk_texts WHERE hash IN ({placeholders})", batch
+        ).fetchall())
+
+    first: dict[str, int] = {}  # new hash → index of its first row
+    for i, row in enumerate(rows):
+        if row[5] not in ids and row[5] not in first:
+            first[row[5]] = i
+    if not first:
+        return ids
+    new = list(first.values())
+    text_rows = [(rows[i][5], rows[i][6], rows[i][7]) for i in new]
+    if _HAS_RETURNING:
+        # RETURNING order is unspecified, so map by hash
+        ids.update(_insert_many(conn, "chunk_texts", "hash, model, text", text_rows,
+                                returning="hash, id"))
+    else:
+        _insert_many(conn, "chunk_texts", "hash, model, text", text_rows)
+        batch = list(first)
+        for start in range(0, len(batch), _SQL_BATCH):
+            part = batch[start:start + _SQL_BATCH]
+            placeholders = ",".join("?" for _ in part)
+            ids.update(conn.execute(
+                f"SELECT hash, id FROM chunk_texts WHERE hash IN ({placeholders})", part
+            ).fetchall())
+
+    new_ids = [ids[rows[i][5]] for i in new]
+    _insert_many(conn, "chunks_fts", "rowid, text",
+                 [(text_id, rows[i][7]) for text_id, i in zip(new_ids, new)])
+    if vectors is not None and has_sqlite_vec():
+        insert_vectors(conn, new_ids, [vectors[i] for i in new])
+    return ids
+
+
+def _delete_locations(conn: sqlite3.Connection, column: str, values: list) -> set[int]:
+    """Delete chunk_locations rows whose column ("id" or "rowid") is in values.
+
+    Returns the text ids they pointed at. Does not drop orphaned text.
+    """
+    text_ids: set[int] = set()
+    for start in range(0, len(values), _SQL_BATCH):
+        batch = values[start:start + _SQL_BATCH]
+        placeholders = ",".join("?" for _ in batch)
+        where = f"WHERE {column} IN ({placeholders})"
+        if _HAS_RETURNING:
+            text_ids.update(row[0] for row in conn.execute(
+                f"DELETE FROM chunk_locations {where} RETURNING text_id", batch
+            ))
+            continue
+        text_ids.update(row[0] for row in conn.execute(
+            f"SELECT text_id FROM chunk_locations {where}", batch
+        ))
+        conn.execute(f"DELETE FROM chunk_locations {where}", batch)
+    return text_ids
+
+
+def _drop_orphan_texts(conn: sqlite3.Connection, text_ids: set[int]) -> None:
+    """Delete those texts no location uses any more, with their FTS and vec entries."""
+    candidates = list(text_ids)
+    orphans: list[int] = []
+    for start in range(0, len(candidates), _SQL_BATCH):
+        batch = candidates[start:start + _SQL_BATCH]
+        placeholders = ",".join("?" for _ in batch)
+        orphans.extend(row[0] for row in conn.execute(
+            f"SELECT id FROM chunk_texts WHERE id IN ({placeholders}) "
+            "AND NOT EXISTS (SELECT 1 FROM chunk_locations l WHERE l.text_id = chunk_texts.id)",
+            batch,
+        ))
+    for start in range(0, len(orphans), _SQL_BATCH):
+        batch = orphans[start:start + _SQL_BATCH]
+        placeholders = ",".join("?" for _ in batch)
+        # FTS first: the external-content delete reads the chunk text
+        conn.execute(
+            f"DELETE FROM chunks_fts WHERE rowid IN ({placeholders})", batch
+        )
+        if has_sqlite_vec():
+            delete_vectors(conn, batch)
+        conn.execute(f"DELETE FROM chunk_texts WHERE id IN ({placeholders})", batch)
+
+
+def insert_chunks(
+    conn: sqlite3.Connection,
+    rows: list[ChunkRow],
+    vectors: np.ndarray | list[np.ndarray] | None,
+) -> list[int]:
+    """Insert chunk rows with their FTS entries and (optionally) vectors.
+
+    Text is stored once per content hash: a row whose text is already
+    stored, here or in another file, only adds a location, and only new
+    text gets an FTS row and a vector. Each table gets one multi-row
+    INSERT per few hundred rows. vectors must be parallel to rows; pass
+    None to skip the vec table. A row with an existing chunk ID replaces
+    that location. Returns each row's text id (the rowid FTS, vector and
+    search results use), in row order. Does not commit.
+    """
+    if not rows:
+        return []
+    replaced = _delete_locations(conn, "id", [row[0] for row in rows])
+    ids = _store_texts(conn, rows, vectors)
+    located = {row[0]: row for row in rows}  # a repeated ID keeps its last row
+    _insert_many(
+        conn, "chunk_locations", "id, text_id, path, source, start_line, end_line",
+        [(row[0], ids[row[5]], row[1], row[2], row[3], row[4]) for row in located.values()],
+    )
+    if replaced or len(located) < len(rows):
+        _drop_orphan_texts(conn, replaced | {ids[row[5]] for row in rows})
+    return [ids[row[5]] for row in rows]
+
+
+def delete_chunk_rows(conn: sqlite3.Connection, rowids: list[int]) -> None:
+    """Delete chunk locations by rowid (the chunks view's rowid).
+
+    Text no other location uses is deleted along with its FTS and vec
+    (and PCA) entries. Does not commit.
+    """
+    _drop_orphan_texts(conn, _delete_locations(conn, "rowid", rowids))
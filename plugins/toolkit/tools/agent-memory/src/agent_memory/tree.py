@@ -65,6 +65,53 @@ def _insert_tree(
         _insert_tree(conn, child, repo_path, node_id, depth + 1)
 
 
+def delete_file_nodes(
+    conn: sqlite3.Connection,
+    file_paths: list[str],
+    repo_path: str,
+) -> int:
+    """Delete all nodes, FTS entries, and outgoing refs for the given files.
+
+    Refs from other files that pointed at a deleted node are reset to
+    unresolved so resolve_refs can re-target them. Does not commit.
+    Returns the number of nodes deleted.
+    """
+    deleted = 0
+    for fp in file_paths:
+        # Get nodes to delete — need full data for FTS content-sync delete
+        cursor = conn.execute(
+            "SELECT id, name, qualified_name, summary, signature, docstring "
+            "FROM code_nodes WHERE file_path = ? AND repo_path = ?",
+            (fp, repo_path),
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            continue
+        ids = [row[0] for row in rows]
+        # Remove from FTS using content-sync delete command
+        conn.executemany(
+            "INSERT INTO code_nodes_fts(code_nodes_fts, rowid, name, "
+            "qualified_name, summary, signature, docstring) "
+            "VALUES('delete', ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        placeholders = ",".join("?" for _ in ids)
+        conn.execute(
+            f"DELETE FROM code_refs WHERE source_id IN ({placeholders})",
+            ids,
+        )
+        conn.execute(
+            f"UPDATE code_refs SET target_id = NULL WHERE target_id IN ({placeholders})",
+            ids,
+        )
+        conn.execute(
+            "DELETE FROM code_nodes WHERE file_path = ? AND repo_path = ?",
+            (fp, repo_path),
+        )
+        deleted += len(ids)
+    return deleted
+
+
 def store_nodes(
     conn: sqlite3.Connection,
     nodes: list[CodeNode],
@@ -86,33 +133,7 @@ def store_nodes(
         _collect_paths(node)
 
     # Delete existing nodes (and FTS entries) for these files
-    for fp in file_paths:
-        # Get nodes to delete — need full data for FTS content-sync delete
-        cursor = conn.execute(
-            "SELECT id, name, qualified_name, summary, signature, docstring "
-            "FROM code_nodes WHERE file_path = ? AND repo_path = ?",
-            (fp, repo_path),
-        )
-        rows = cursor.fetchall()
-        if rows:
-            ids = [row[0] for row in rows]
-            # Remove from FTS using content-sync delete command
-            for row in rows:
-                conn.execute(
-                    "INSERT INTO code_nodes_fts(code_nodes_fts, rowid, name, "
-                    "qualified_name, summary, signature, docstring) "
-                    "VALUES('delete', ?, ?, ?, ?, ?, ?)",
-                    row,
-                )
-            placeholders = ",".join("?" for _ in ids)
-            conn.execute(
-                f"DELETE FROM code_refs WHERE source_id IN ({placeholders})",
-                ids,
-            )
-            conn.execute(
-                f"DELETE FROM code_nodes WHERE file_path = ? AND repo_path = ?",
-                (fp, repo_path),
-            )
+    delete_file_nodes(conn, sorted(file_paths), repo_path)
 
     # Insert new trees
     for node in nodes:
@@ -0,0 +1,415 @@
+# ABOUTME: Layout of the vec0 tables: chunks_vec (float32/int8/bit) and optional PCA-reduced chunks_vec_pca.
+# ABOUTME: Quantizes, projects and writes vectors, runs KNN, and re-ranks approximate hits with full vectors.
+
+import math
+import sqlite3
+from collections.abc import Iterator
+
+import numpy as np
+
+from .config import (
+    EMBEDDING_MODEL,
+    RERANK_MULTIPLIER,
+    VEC_QUANTIZATIONS,
+    get_embedding_dim,
+)
+from .db import load_vec, meta_get
+
+# Rows per multi-row INSERT (2 parameters each, under the 999 host-parameter
+# limit of older SQLite builds)
+_ROWS_PER_STATEMENT = 400
+
+# Keep IN (...) lists well below SQLite's host parameter limit
+_SQL_BATCH = 500
+
+# Bind expression for a vector parameter of each storage type
+_PARAM_SQL = {"float": "?", "int8": "vec_int8(?)", "bit": "vec_bit(?)"}
+
+# Secondary index of PCA-reduced vectors (see build_projection)
+_PCA_TABLE = "chunks_vec_pca"
+
+
+def get_quantization(conn: sqlite3.Connection) -> str:
+    """Return how chunks_vec stores vectors in this database."""
+    return meta_get(conn, "vec_quantization", "float")
+
+
+def get_index_model(conn: sqlite3.Connection) -> str:
+    """Return the embedding model the chunk vectors in this database come from."""
+    return meta_get(conn, "embedding_model", EMBEDDING_MODEL)
+
+
+def get_index_dim(conn: sqlite3.Connection) -> int:
+    """Return the dimension of the chunk vectors in this database."""
+    dim = meta_get(conn, "embedding_dim")
+    return int(dim) if dim else get_embedding_dim(get_index_model(conn))
+
+
+def create_vec_table(
+    conn: sqlite3.Connection, quantization: str, dim: int | None = None
+) -> None:
+    """Create chunks_vec for the given storage type (float, int8 or bit).
+
+    dim defaults to the database's index dimension.
+    """
+    dim = dim or get_index_dim(conn)
+    if quantization not in VEC_QUANTIZATIONS:
+        raise ValueError(f"Unknown vector quantization: {quantization}")
+    column = {
+        "float": f"embedding float[{dim}] distance_metric=cosine",
+        "int8": f"embedding int8[{dim}] distance_metric=cosine",
+        "bit": f"embedding bit[{dim}]",  # hamming distance
+    }[quantization]
+    conn.execute(f"CREATE VIRTUAL TABLE chunks_vec USING vec0({column})")
+
+
+def quantize(vectors: np.ndarray, quantization: str) -> np.ndarray:
+    """Convert a vector, or a (n, dim) matrix row by row, to the storage type.
+
+    int8 scales each vector by its own largest component, which cosine
+    distance ignores, so the full -127..127 range is used. bit keeps the
+    sign of each component, packed 8 per byte.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if quantization == "float":
+        return np.ascontiguousarray(vectors)
+    if quantization == "int8":
+        peak = np.abs(vectors).max(axis=-1, keepdims=True)
+        peak[peak == 0] = 1.0
+        return np.rint(vectors * (127.0 / peak)).astype(np.int8)
+    if quantization == "bit":
+        return np.packbits(vectors > 0, axis=-1)
+    raise ValueError(f"Unknown vector quantization: {quantization}")
+
+
+def insert_vectors(
+    conn: sqlite3.Connection,
+    rowids: list[int],
+    vectors: np.ndarray | list,
+    quantization: str | None = None,
+) -> None:
+    """Insert vectors for chunk text ids into chunks_vec (and the PCA index). Does not commit."""
+    if not rowids:
+        return
+    layout = dict(conn.execute(
+        "SELECT key, value FROM meta WHERE key IN ('vec_quantization', 'pca_dims')"
+    ))
+    quantization = quantization or layout.get("vec_quantization", "float")
+    _insert_rows(conn, "chunks_vec", _PARAM_SQL[quantization], rowids,
+                 quantize(vectors, quantization))
+    if layout.get("pca_dims"):
+        projection = get_projection(conn)
+        _insert_rows(conn, _PCA_TABLE, "?", rowids, project(vectors, projection))
+
+
+def _insert_rows(
+    conn: sqlite3.Connection, table: str, param: str,
+    rowids: list[int], stored: np.ndarray,
+) -> None:
+    """Multi-row INSERT of already-encoded vectors into a vec0 table."""
+    for start in range(0, len(rowids), _ROWS_PER_STATEMENT):
+        end = min(start + _ROWS_PER_STATEMENT, len(rowids))
+        values = ", ".join(f"(?, {param})" for _ in range(end - start))
+        conn.execute(
+            f"INSERT INTO {table} (rowid, embedding) VALUES {values}",
+            [value for i in range(start, end)
+             for value in (rowids[i], memoryview(stored[i]))],
+        )
+
+
+def delete_vectors(conn: sqlite3.Connection, rowids: list[int]) -> None:
+    """Delete chunk text ids from chunks_vec and the PCA index. Does not commit."""
+    tables = ["chunks_vec"] + ([_PCA_TABLE] if meta_get(conn, "pca_dims") else [])
+    for start in range(0, len(rowids), _SQL_BATCH):
+        batch = rowids[start:start + _SQL_BATCH]
+        placeholders = ",".join("?" for _ in batch)
+        for table in tables:
+            conn.execute(f"DELETE FROM {table} WHERE rowid IN ({placeholders})", batch)
+
+
+def _approx_similarity(distance: float, quantization: str, dim: int) -> float:
+    """Turn a quantized KNN distance into an approximate cosine similarity."""
+    if quantization == "bit":
+        # Sign-bit hashes: the angle is proportional to the Hamming distance
+        return math.cos(math.pi * distance / dim)
+    return 1.0 - distance
+
+
+def _exact_similarities(
+    conn: sqlite3.Connection, query: np.ndarray, rowids: list[int]
+) -> dict[int, float]:
+    """Cosine similarity from the full-precision embedding cache, by chunk text id."""
+    from .cache import cache_lookup
+
+    hashes: dict[int, str] = {}
+    for start in range(0, len(rowids), _SQL_BATCH):
+        batch = rowids[start:start + _SQL_BATCH]
+        placeholders = ",".join("?" for _ in batch)
+        hashes.update(conn.execute(
+            f"SELECT id, hash FROM chunk_texts WHERE id IN ({placeholders})", batch
+        ).fetchall())
+    vectors = cache_lookup(conn, list(hashes.values()))
+    found = [rowid for rowid in rowids if hashes.get(rowid) in vectors]
+    if not found:
+        return {}
+
+    matrix = np.vstack([vectors[hashes[rowid]] for rowid in found])
+    norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+    norms[norms == 0] = 1.0
+    scores = matrix @ query / norms
+    return dict(zip(found, scores.tolist()))
+
+
+def _scan(
+    conn: sqlite3.Connection, table: str, param: str, query: np.ndarray, k: int
+) -> list[tuple[int, float]]:
+    """Brute-force KNN over one vec0 table: (rowid, distance), nearest first."""
+    return conn.execute(
+        f"SELECT rowid, distance FROM {table} "
+        f"WHERE embedding MATCH {param} AND k = ? ORDER BY distance",
+        (memoryview(query), k),
+    ).fetchall()
+
+
+def knn(
+    conn: sqlite3.Connection, query_vec: np.ndarray, k: int
+) -> list[tuple[int, float]]:
+    """Return up to k (text id, cosine similarity) pairs, most similar first.
+
+    With a PCA projection, a k * RERANK_MULTIPLIER["pca"] shortlist comes
+    from the reduced index. Otherwise float tables are searched exactly,
+    and quantized tables take a k * RERANK_MULTIPLIER[type] shortlist from
+    the compact index. Shortlists are re-ranked with the vectors in the
+    embedding cache (float32 or float16).
+    """
+    load_vec(conn)  # connections from open_db don't have it yet
+    quantization = get_quantization(conn)
+    query = np.asarray(query_vec, dtype=np.float32).reshape(-1)
+    projection = get_projection(conn)
+    if projection is not None:
+        rows = _scan(conn, _PCA_TABLE, "?", project(query, projection),
+                     k * RERANK_MULTIPLIER["pca"])
+        coarse = {rowid: 1.0 - distance for rowid, distance in rows}
+    elif quantization == "float":
+        rows = _scan(conn, "chunks_vec", "?", query, k)
+        return [(rowid, 1.0 - distance) for rowid, distance in rows]
+    else:
+        rows = _scan(conn, "chunks_vec", _PARAM_SQL[quantization],
+                     quantize(query, quantization),
+                     k * RERANK_MULTIPLIER[quantization])
+        coarse = {
+            rowid: _approx_similarity(distance, quantization, len(query))
+            for rowid, distance in rows
+        }
+
+    exact = _exact_similarities(conn, query, list(coarse))
+    scored = [(rowid, exact.get(rowid, approx)) for rowid, approx in coarse.items()]
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return scored[:k]
+
+
+def _cache_index_vectors(conn: sqlite3.Connection, model: str) -> int:
+    """Copy float chunks_vec vectors the embedding cache lacks into it.
+
+    Databases indexed before every chunk's vector was cached hold some
+    vectors only in the index; caching them before a rebuild keeps it
+    from re-embedding them. Only a float index of the same model has
+    exact vectors to copy. Returns the number cached. Does not commit.
+    """
+    from .cache import cache_store
+
+    if model != get_index_model(conn) or get_quantization(conn) != "float":
+        return 0
+    if not conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'chunks_vec'"
+    ).fetchone():
+        return 0
+    missing = dict(conn.execute(
+        "SELECT id, hash FROM chunk_texts t WHERE NOT EXISTS ("
+        "  SELECT 1 FROM embedding_cache c WHERE c.hash = t.hash AND c.model = ?)",
+        (model,),
+    ).fetchall())
+    if not missing:
+        return 0
+    load_vec(conn)
+    cursor = conn.execute("SELECT rowid, embedding FROM chunks_vec")
+    count = 0
+    while rows := cursor.fetchmany(_SQL_BATCH):
+        found = {
+            missing[rowid]: np.frombuffer(blob, dtype=np.float32)
+            for rowid, blob in rows if rowid in missing
+        }
+        cache_store(conn, found, model)
+        count += len(found)
+    return count
+
+
+def _chunk_vector_batches(
+    conn: sqlite3.Connection, model: str
+) -> Iterator[tuple[list[int], np.ndarray]]:
+    """Yield (text ids, vectors) for all chunk texts, in batches, from the cache.
+
+    Texts missing from the cache are embedded with model and cached.
+    """
+    from .cache import cache_lookup, cache_store
+    from .embedder import embed_texts_array
+
+    rows = conn.execute("SELECT id, hash, text FROM chunk_texts").fetchall()
+    for start in range(0, len(rows), _SQL_BATCH):
+        batch = rows[start:start + _SQL_BATCH]
+        vectors = cache_lookup(conn, [h for _, h, _ in batch], model)
+        missing = {h: text for _, h, text in batch if h not in vectors}
+        if missing:
+            fresh = dict(zip(missing, embed_texts_array(list(missing.values()), model)))
+            cache_store(conn, fresh, model)
+            vectors.update(fresh)
+        yield ([rowid for rowid, _, _ in batch],
+               np.vstack([vectors[h] for _, h, _ in batch]))
+
+
+def get_projection(conn: sqlite3.Connection) -> tuple[np.ndarray, np.ndarray] | None:
+    """Return the stored PCA (mean, components), or None when not enabled."""
+    dims = meta_get(conn, "pca_dims")
+    if not dims:
+        return None
+    matrix = np.frombuffer(meta_get(conn, "pca_projection"), dtype=np.float32)
+    matrix = matrix.reshape(int(dims) + 1, -1)
+    return matrix[0], matrix[1:]
+
+
+def project(vectors: np.ndarray, projection: tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+    """Center and project a vector, or (n, dim) rows, onto the PCA components."""
+    mean, components = projection
+    centered = np.asarray(vectors, dtype=np.float32) - mean
+    return np.ascontiguousarray(centered @ components.T, dtype=np.float32)
+
+
+def fit_pca(
+    batches: "Iterator[np.ndarray]", dims: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Fit a PCA projection to rows arriving in batches.
+
+    Accumulates the sum and scatter matrix, so memory stays at one batch
+    plus a dim x dim matrix. Returns (mean, components), with the top
+    dims components as rows.
+    """
+    count, total, scatter = 0, None, None
+    for batch in batches:
+        rows = np.asarray(batch, dtype=np.float64)
+        total = rows.sum(axis=0) if total is None else total + rows.sum(axis=0)
+        scatter = rows.T @ rows if scatter is None else scatter + rows.T @ rows
+        count += len(rows)
+    if count == 0:
+        raise ValueError("No embeddings to fit a projection on")
+    if not 0 < dims < len(total):
+        raise ValueError(f"PCA dims must be between 1 and {len(total) - 1}, got {dims}")
+    mean = total / count
+    covariance = scatter / count - np.outer(mean, mean)
+    _, eigenvectors = np.linalg.eigh(covariance)  # ascending eigenvalues
+    components = eigenvectors[:, ::-1][:, :dims].T
+    return mean.astype(np.float32), np.ascontiguousarray(components, dtype=np.float32)
+
+
+def drop_projection(conn: sqlite3.Connection) -> None:
+    """Remove the PCA index and its projection. Does not commit."""
+    conn.execute(f"DROP TABLE IF EXISTS {_PCA_TABLE}")
+    conn.execute("DELETE FROM meta WHERE key IN ('pca_dims', 'pca_projection')")
+
+
+def build_projection(conn: sqlite3.Connection, dims: int) -> int:
+    """Fit PCA to the stored chunk vectors and index them reduced to dims.
+
+    The projection lives in meta; chunks added later are projected with
+    it, so refit after the corpus changes a lot. Commits. Returns the
+    number of chunks indexed.
+    """
+    model = get_index_model(conn)
+    mean, components = fit_pca(
+        (vectors for _, vectors in _chunk_vector_batches(conn, model)), dims
+    )
+    drop_projection(conn)
+    conn.execute(
+        f"CREATE VIRTUAL TABLE {_PCA_TABLE} USING vec0("
+        f"embedding float[{dims}] distance_metric=cosine)"
+    )
+    conn.executemany(
+        "INSERT INTO meta (key, value) VALUES (?, ?)",
+        [("pca_dims", str(dims)),
+         ("pca_projection", memoryview(np.vstack([mean, components])))],
+    )
+
+    projection = (mean, components)
+    count = 0
+    for rowids, vectors in _chunk_vector_batches(conn, model):
+        _insert_rows(conn, _PCA_TABLE, "?", rowids, project(vectors, projection))
+        count += len(rowids)
+    conn.commit()
+    return count
+
+
+def renumber_vectors(conn: sqlite3.Connection, mapping: str) -> None:
+    """Move vectors to new rowids, given a table of (old, new) rowid pairs.
+
+    Each vec0 table is copied out through a temporary table, recreated
+    from its own schema, and refilled under the new rowids; rows with no
+    mapping are dropped. Used when chunk storage was deduplicated. Does
+    not commit.
+    """
+    tables = {"chunks_vec": _PARAM_SQL[get_quantization(conn)]}
+    if meta_get(conn, "pca_dims"):
+        tables[_PCA_TABLE] = "?"
+    for table, param in tables.items():
+        schema = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = ?", (table,)
+        ).fetchone()
+        if schema is None:
+            continue
+        conn.execute(
+            "CREATE TEMP TABLE vec_renumber AS SELECT m.new AS id, v.embedding "
+            f"FROM {table} v JOIN {mapping} m ON m.old = v.rowid"
+        )
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(schema[0])
+        conn.execute(
+            f"INSERT INTO {table} (rowid, embedding) "
+            f"SELECT id, {param.replace('?', 'embedding')} FROM temp.vec_renumber"
+        )
+        conn.execute("DROP TABLE temp.vec_renumber")
+
+
+def rebuild_vec_table(
+    conn: sqlite3.Connection, quantization: str, model: str | None = None
+) -> int:
+    """Recreate chunks_vec with a new storage type and/or model and refill it.
+
+    Vectors come from the embedding cache under model (default: the
+    current index model), after copying in any the cache lacks from a
+    float index of that model; chunks still missing are embedded again
+    and cached. Records the model as the index model and commits. A PCA
+    index fitted to another model is dropped. Returns the number of
+    distinct chunk texts.
+    """
+    if quantization not in VEC_QUANTIZATIONS:
+        raise ValueError(f"Unknown vector quantization: {quantization}")
+    model = model or get_index_model(conn)
+    if model != get_index_model(conn):
+        drop_projection(conn)
+    dim = get_embedding_dim(model)
+    _cache_index_vectors(conn, model)
+    conn.execute("DROP TABLE IF EXISTS chunks_vec")
+    create_vec_table(conn, quantization, dim)
+    conn.executemany(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+        [("vec_quantization", quantization),
+         ("embedding_model", model),
+         ("embedding_dim", str(dim))],
+    )
+
+    count = 0
+    for rowids, vectors in _chunk_vector_batches(conn, model):
+        _insert_rows(conn, "chunks_vec", _PARAM_SQL[quantization], rowids,
+                     quantize(vectors, quantization))
+        count += len(rowids)
+    conn.execute("UPDATE chunk_texts SET model = ? WHERE model != ?", (model, model))
+    conn.commit()
+    return count
@@ -0,0 +1,241 @@
+# ABOUTME: Tests for cache module — content-hash keyed embedding cache.
+# ABOUTME: Verifies hits skip the model, misses are embedded once and written back.
+
+
+def _counting_embedder(monkeypatch):
+    """Replace the model call with a deterministic fake that records its inputs."""
+    import numpy as np
+
+    import agent_memory.cache as cache
+
+    calls: list[list[str]] = []
+
+    def fake_embed(texts, model_name=None):
+        calls.append(list(texts))
+        return np.array([[float(len(t)), 1.0, 0.5] for t in texts], dtype=np.float32)
+
+    monkeypatch.setattr(cache, "embed_texts_array", fake_embed)
+    return calls
+
+
+def test_cache_store_and_lookup(tmp_db):
+    """Stored vectors come back by content hash; misses are omitted."""
+    import numpy as np
+
+    from agent_memory.cache import cache_lookup, cache_store
+    from agent_memory.db import init_db
+
+    conn = init_db(tmp_db)
+    cache_store(conn, {
+        "h1": np.array([1.0, 2.0], dtype=np.float32),
+        "h2": np.array([3.0, 4.0], dtype=np.float32),
+    })
+    found = cache_lookup(conn, ["h1", "h2", "missing"])
+    conn.close()
+
+    assert set(found) == {"h1", "h2"}
+    assert found["h1"].dtype == np.float32
+    assert found["h1"].tolist() == [1.0, 2.0]
+
+
+def test_embed_texts_cached_writes_back(tmp_db, monkeypatch):
+    """First call embeds and populates the embedding_cache table."""
+    from agent_memory.cache import embed_texts_cached
+    from agent_memory.db import init_db
+
+    calls = _counting_embedder(monkeypatch)
+    conn = init_db(tmp_db)
+    vectors = embed_texts_cached(conn, ["alpha", "beta"])
+
+    count = conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+    conn.close()
+
+    assert calls == [["alpha", "beta"]]
+    assert vectors.shape == (2, 3)
+    assert count == 2
+
+
+def test_embed_texts_cached_only_embeds_misses(tmp_db, monkeypatch):
+    """Second call sends only unseen text through the model, in input order."""
+    from agent_memory.cache import embed_texts_cached
+    from agent_memory.db import init_db
+
+    calls = _counting_embedder(monkeypatch)
+    conn = init_db(tmp_db)
+    embed_texts_cached(conn, ["alpha", "beta"])
+    vectors = embed_texts_cached(conn, ["beta", "gamma!", "alpha"])
+    conn.close()
+
+    assert calls[1] == ["gamma!"]
+    assert vectors[:, 0].tolist() == [4.0, 6.0, 5.0]
+
+
+def test_embed_texts_cached_dedupes_batch(tmp_db, monkeypatch):
+    """Repeated text within one call is embedded once."""
+    from agent_memory.cache import embed_texts_cached
+    from agent_memory.db import init_db
+
+    calls = _counting_embedder(monkeypatch)
+    conn = init_db(tmp_db)
+    vectors = embed_texts_cached(conn, ["same", "same"])
+    conn.close()
+
+    assert calls == [["same"]]
+    assert len(vectors) == 2
+
+
+def test_embed_texts_cached_empty(tmp_db, monkeypatch):
+    """Empty input returns empty list without touching the model."""
+    from agent_memory.cache import embed_texts_cached
+    from agent_memory.db import init_db
+
+    calls = _counting_embedder(monkeypatch)
+    conn = init_db(tmp_db)
+    assert len(embed_texts_cached(conn, [])) == 0
+    conn.close()
+    assert calls == []
+
+
+def _vec(*values):
+    import numpy as np
+
+    return np.array(values, dtype=np.float32)
+
+
+def test_query_cache_round_trip(tmp_db):
+    """A cached query vector comes back for the same (whitespace-normalized) text."""
+    from agent_memory.cache import query_cache_get, query_cache_put
+    from agent_memory.db import init_db
+
+    conn = init_db(tmp_db)
+    assert query_cache_get(conn, "auth flow") is None
+    query_cache_put(conn, "auth flow", _vec(1.0, 2.0))
+    hit = query_cache_get(conn, "  auth   flow ")
+    conn.close()
+
+    assert hit.tolist() == [1.0, 2.0]
+
+
+def test_query_cache_evicts_least_recently_used(tmp_db, monkeypatch):
+    """Past the size cap, the entry used longest ago is dropped."""
+    import agent_memory.cache as cache
+    from agent_memory.cache import query_cache_get, query_cache_put
+    from agent_memory.db import init_db
+
+    monkeypatch.setenv("AGENT_MEMORY_QUERY_CACHE_SIZE", "2")
+    clock = iter(range(100))
+    monkeypatch.setattr(cache.time, "time", lambda: float(next(clock)))
+
+    conn = init_db(tmp_db)
+    query_cache_put(conn, "a", _vec(1.0))
+    query_cache_put(conn, "b", _vec(2.0))
+    query_cache_get(conn, "a")  # "b" is now least recently used
+    query_cache_put(conn, "c", _vec(3.0))
+
+    kept = {row[0] for row in conn.execute("SELECT query FROM query_cache")}
+    conn.close()
+    assert kept == {"a", "c"}
+
+
+def test_query_cache_disabled(tmp_db, monkeypatch):
+    """AGENT_MEMORY_QUERY_CACHE_SIZE=0 turns the cache off."""
+    from agent_memory.cache import query_cache_get, query_cache_put
+    from agent_memory.db import init_db
+
+    monkeypatch.setenv("AGENT_MEMORY_QUERY_CACHE_SIZE", "0")
+    conn = init_db(tmp_db)
+    query_cache_put(conn, "q", _vec(1.0))
+    count = conn.execute("SELECT COUNT(*) FROM query_cache").fetchone()[0]
+    assert query_cache_get(conn, "q") is None
+    conn.close()
+    assert count == 0
+
+
+def test_query_cache_is_per_model(tmp_db):
+    """Vectors cached under another model are not reused."""
+    from agent_memory.cache import query_cache_get, query_cache_put
+    from agent_memory.db import init_db, meta_get, meta_set
+
+    conn = init_db(tmp_db)
+    model = meta_get(conn, "embedding_model")
+    meta_set(conn, "embedding_model", "other/model")
+    query_cache_put(conn, "q", _vec(1.0))
+    meta_set(conn, "embedding_model", model)
+    assert query_cache_get(conn, "q") is None
+    conn.close()
+
+
+def test_float16_storage_halves_blobs(tmp_db, monkeypatch):
+    """float16 databases store 2-byte elements and read back float32."""
+    import numpy as np
+
+    from agent_memory.cache import (
+        cache_lookup,
+        cache_store,
+        get_storage,
+        query_cache_get,
+        query_cache_put,
+    )
+    from agent_memory.db import init_db
+
+    monkeypatch.setenv("AGENT_MEMORY_EMBED_STORAGE", "float16")
+    conn = init_db(tmp_db)
+    cache_store(conn, {"h1": _vec(0.25, -0.5, 1.0)})
+    query_cache_put(conn, "q", _vec(0.125, 2.0))
+    size = conn.execute("SELECT length(embedding) FROM embedding_cache").fetchone()[0]
+    found = cache_lookup(conn, ["h1"])["h1"]
+    hit = query_cache_get(conn, "q")
+    assert get_storage(conn) == "float16"
+    conn.close()
+
+    assert size == 3 * 2
+    assert found.dtype == np.float32 and found.tolist() == [0.25, -0.5, 1.0]
+    assert hit.dtype == np.float32 and hit.tolist() == [0.125, 2.0]
+
+
+def test_existing_cache_stays_float32(tmp_db, monkeypatch):
+    """A database with vectors but no recorded type is read as float32."""
+    from agent_memory.cache import cache_lookup, cache_store, get_storage
+    from agent_memory.db import init_db
+
+    conn = init_db(tmp_db)
+    cache_store(conn, {"h1": _vec(1.0, 2.0)})
+    conn.execute("DELETE FROM meta WHERE key = 'embedding_dtype'")
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setenv("AGENT_MEMORY_EMBED_STORAGE", "float16")
+    conn = init_db(tmp_db)
+    assert get_storage(conn) == "float32"
+    assert cache_lookup(conn, ["h1"])["h1"].tolist() == [1.0, 2.0]
+    conn.close()
+
+
+def test_convert_storage_in_place(tmp_db):
+    """convert_storage rewrites both caches and round-trips back to float32."""
+    from agent_memory.cache import (
+        cache_lookup,
+        cache_store,
+        convert_storage,
+        get_storage,
+        query_cache_get,
+        query_cache_put,
+    )
+    from agent_memory.db import init_db
+
+    conn = init_db(tmp_db)
+    cache_store(conn, {f"h{i}": _vec(float(i), 0.5) for i in range(3)})
+    query_cache_put(conn, "q", _vec(1.5, -1.0))
+    conn.commit()
+
+    assert convert_storage(conn, "float16") == 4
+    assert get_storage(conn) == "float16"
+    assert convert_storage(conn, "float16") == 0  # already converted
+    assert cache_lookup(conn, ["h2"])["h2"].tolist() == [2.0, 0.5]
+    assert query_cache_get(conn, "q").tolist() == [1.5, -1.0]
+    sizes = {row[0] for row in conn.execute("SELECT length(embedding) FROM embedding_cache")}
+    assert sizes == {4}
+
+    assert convert_storage(conn, "float32") == 4
+    assert cache_lookup(conn, ["h1"])["h1"].tolist() == [1.0, 0.5]
+    conn.close()
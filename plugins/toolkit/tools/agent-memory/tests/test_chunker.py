@@ -111,3 +111,173 @@ def test_chunk_subheadings():
     )
     chunks = chunk_markdown(text, source_path="/test.md")
     assert len(chunks) == 3
+
+
+class _WordTokenizer:
+    """Stand-in for a `tokenizers.Tokenizer`: one token per word, calls recorded."""
+
+    def __init__(self):
+        self.batches: list[list[str]] = []
+
+    def encode_batch(self, texts, add_special_tokens=True):
+        from types import SimpleNamespace
+
+        self.batches.append(list(texts))
+        return [SimpleNamespace(ids=text.split()) for text in texts]
+
+
+def test_token_counter_caches_line_counts():
+    """Each distinct line is tokenized once across calls."""
+    from agent_memory.chunker import TokenCounter
+
+    tokenizer = _WordTokenizer()
+    counter = TokenCounter(tokenizer, budget=10)
+    assert counter.count_lines(["a b\n", "c\n", "a b\n"]) == [2, 1, 2]
+    assert counter.count_lines(["c\n", "d e f\n"]) == [1, 3]
+    assert tokenizer.batches == [["a b\n", "c\n"], ["d e f\n"]]
+
+
+def test_chunk_by_tokens_packs_sections():
+    """Small sections are packed together up to the token budget."""
+    from agent_memory.chunker import TokenCounter, chunk_markdown
+
+    text = "".join(f"# S{i}\nw w w\n" for i in range(6))  # 5 tokens per section
+    counter = TokenCounter(_WordTokenizer(), budget=12)
+    chunks = chunk_markdown(text, source_path="/t.md", counter=counter)
+
+    assert [(c.start_line, c.end_line, c.tokens) for c in chunks] == [
+        (1, 4, 10), (5, 8, 10), (9, 12, 10),
+    ]
+    assert chunks[1].text.startswith("# S2")
+
+
+def test_chunk_by_tokens_splits_large_section():
+    """A section over budget is split by lines, with token overlap."""
+    from agent_memory.chunker import TokenCounter, chunk_markdown
+
+    text = "# Big\n" + "".join(f"line {i} x\n" for i in range(10))  # 2 + 10 * 3 tokens
+    counter = TokenCounter(_WordTokenizer(), budget=10)
+    chunks = chunk_markdown(text, source_path="/t.md", counter=counter, overlap_tokens=3)
+
+    assert all(c.tokens <= 10 for c in chunks)
+    assert chunks[0].start_line == 1 and chunks[-1].end_line == 11
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert nxt.start_line == prev.end_line  # one 3-token line of overlap
+
+
+def test_chunk_by_tokens_flags_overlong_line():
+    """A single line over budget becomes its own chunk with its true count."""
+    from agent_memory.chunker import TokenCounter, chunk_markdown
+
+    text = "# Title\nshort\n" + "word " * 30 + "\nend\n"
+    counter = TokenCounter(_WordTokenizer(), budget=10)
+    chunks = chunk_markdown(text, source_path="/t.md", counter=counter, overlap_tokens=0)
+
+    assert [c.tokens for c in chunks] == [3, 30, 1]
+    assert [c.tokens > counter.budget for c in chunks] == [False, True, False]
+
+
+
+def _log_lines(n):
+    """Lines of a long, heading-free log whose lines vary in length."""
+    import random
+
+    rng = random.Random(0)
+    words = ["index", "vector", "search", "session", "sqlite", "agent", "deploy"]
+    return [" ".join(rng.choices(words, k=rng.randint(3, 12))) + "\n" for _ in range(n)]
+
+
+def test_content_defined_keeps_small_sections():
+    """Sections that fit in one chunk come out exactly as in chars mode."""
+    from agent_memory.chunker import chunk_markdown
+
+    text = "# A\n\nshort\n\n## B\n\n" + "word " * 50 + "\n"
+    assert chunk_markdown(text, "/t.md", content_defined=True) == chunk_markdown(text, "/t.md")
+
+
+def test_content_defined_sizes_and_coverage():
+    """Content-defined chunks stay within max_chars and cover the section without overlap."""
+    from agent_memory.chunker import chunk_markdown
+
+    text = "# Log\n" + "".join(_log_lines(600))
+    chunks = chunk_markdown(text, "/t.md", max_chars=800, content_defined=True)
+
+    assert len(chunks) > 10
+    assert all(len(c.text) <= 800 for c in chunks)
+    assert chunks[0].start_line == 1 and chunks[-1].end_line == 601
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert nxt.start_line == prev.end_line + 1
+
+
+def test_content_defined_boundaries_survive_insertion():
+    """A line inserted near the top only changes the chunks around it."""
+    from agent_memory.chunker import chunk_markdown
+
+    # Equal-length lines: size-based cuts fall every so many lines
+    lines = ["# Log\n"] + [f"entry {i:05d} of the session log\n" for i in range(1500)]
+    edited = lines[:20] + ["entry 99999 inserted by an edit\n"] + lines[20:]
+
+    def texts(parts, content_defined):
+        chunks = chunk_markdown("".join(parts), "/t.md", content_defined=content_defined)
+        return [c.text for c in chunks]
+
+    before = set(texts(lines, True))
+    after = texts(edited, True)
+    assert sum(t not in before for t in after) <= 3
+
+    # Fixed-size splitting shifts every later boundary for the same edit
+    before = set(texts(lines, False))
+    after = texts(edited, False)
+    assert sum(t not in before for t in after) > len(after) // 2
+
+
+def _sample_markdown():
+    """Markdown mixing small sections, an oversized one, blank runs, and CR/VT breaks."""
+    parts = []
+    for i in range(12):
+        parts.append(f"## Part {i}\n\n" + f"note {i} " * (i * 15) + "\n\n")
+        parts.append("   \n" * (i % 3) + "- item\r\n\x0bsplit line\n")
+    parts.append("trailing line without newline")
+    return "".join(parts)
+
+
+def test_iter_chunks_matches_chunk_markdown():
+    """Streaming from a file object, in any piece sizes, gives chunk_markdown's output."""
+    import io
+
+    from agent_memory.chunker import TokenCounter, chunk_markdown, iter_chunks
+
+    text = _sample_markdown()
+    for max_chars, overlap in [(1600, 320), (300, 60), (120, 0)]:
+        expected = chunk_markdown(text, "/t.md", max_chars, overlap)
+        assert list(iter_chunks(io.StringIO(text), "/t.md", max_chars, overlap)) == expected
+        pieces = [text[i:i + 37] for i in range(0, len(text), 37)]
+        assert list(iter_chunks(pieces, "/t.md", max_chars, overlap)) == expected
+
+    expected = chunk_markdown(
+        text, "/t.md", counter=TokenCounter(_WordTokenizer(), 40), overlap_tokens=8
+    )
+    streamed = iter_chunks(
+        io.StringIO(text), "/t.md",
+        counter=TokenCounter(_WordTokenizer(), 40), overlap_tokens=8,
+    )
+    assert list(streamed) == expected
+
+
+def test_iter_chunks_reads_lazily():
+    """The first chunk is yielded after reading about one chunk's worth of lines."""
+    from agent_memory.chunker import iter_chunks
+
+    read = []
+
+    def lines():
+        for i in range(100_000):
+            read.append(i)
+            yield f"line {i} of a long transcript without headings\n"
+
+    chunks = iter_chunks(lines(), "/big.md", max_chars=500, overlap_chars=100)
+    first = next(chunks)
+    assert first.start_line == 1
+    assert len(read) < 20
+    second = next(chunks)
+    assert second.start_line <= first.end_line  # overlap carried over
@@ -7,7 +7,7 @@ import sys
 from pathlib import Path
 
 
-def _run_cli(*args, env_overrides=None):
+def _run_cli(*args, env_overrides=None, cwd=None):
     """Run agent-memory CLI as a subprocess, returning (stdout, stderr, returncode)."""
     import os
 
@@ -23,7 +23,7 @@ def _run_cli(*args, env_overrides=None):
         capture_output=True,
         text=True,
         env=env,
-        cwd=str(Path(__file__).parent.parent),
+        cwd=str(cwd or Path(__file__).parent.parent),
     )
     return result.stdout, result.stderr, result.returncode
 
@@ -73,6 +73,7 @@ def test_cli_status_json(tmp_path):
     assert code == 0
     data = json.loads(stdout)
     assert "chunks" in data
+    assert data["chunk_texts"] == 0
     assert "files" in data
 
 
@@ -493,6 +494,31 @@ def test_cli_search_json_result_fields(tmp_path, sample_memory_dir):
         assert "score" in item
         assert "start_line" in item
         assert "end_line" in item
+        assert "query_cache_hit" in item
+
+
+def test_cli_search_json_reports_query_cache_hit(tmp_path, sample_memory_dir):
+    """Repeating a search --json query reports a query cache hit."""
+    db_path = tmp_path / "test.db"
+    env = {
+        "AGENT_MEMORY_DB": str(db_path),
+        "AGENT_MEMORY_DIR": str(sample_memory_dir / "agent-memory"),
+    }
+    _run_cli(
+        "index", "--path", str(sample_memory_dir / "agent-memory" / "daily-logs"),
+        env_overrides=env,
+    )
+
+    runs = []
+    for _ in range(2):
+        stdout, _, code = _run_cli(
+            "search", "FastEmbed", "--vector", "--json", env_overrides=env,
+        )
+        assert code == 0
+        runs.append(json.loads(stdout))
+
+    assert runs[0] and not runs[0][0]["query_cache_hit"]
+    assert runs[1][0]["query_cache_hit"]
 
 
 def test_cli_search_special_chars(tmp_path):
@@ -613,6 +639,27 @@ def test_cli_index_reports_skipped(tmp_path, sample_memory_dir):
     assert "skipped" in stdout.lower()
 
 
+def test_cli_index_relative_path_keeps_other_files(tmp_path, sample_memory_dir):
+    """index --path . from another directory doesn't prune the default scan's files."""
+    env = {
+        "AGENT_MEMORY_DB": str(tmp_path / "test.db"),
+        "AGENT_MEMORY_DIR": str(sample_memory_dir / "agent-memory"),
+    }
+    _, _, code = _run_cli("index", env_overrides=env)
+    assert code == 0
+    other = tmp_path / "elsewhere"
+    other.mkdir()
+    (other / "note.md").write_text("# Note\n\nUnrelated.\n")
+
+    stdout, _, code = _run_cli(
+        "index", "--path", ".", "--json", env_overrides=env, cwd=other
+    )
+    assert code == 0
+    assert json.loads(stdout)["files_pruned"] == 0
+    stdout, _, _ = _run_cli("status", "--json", env_overrides=env)
+    assert json.loads(stdout)["files"] == 3
+
+
 def test_cli_index_single_file(tmp_path):
     """index --path pointing to a single file indexes just that file."""
     db_path = tmp_path / "test.db"
@@ -630,6 +677,143 @@ def test_cli_index_single_file(tmp_path):
     assert data["chunks"] >= 1
 
 
+def test_cli_index_workers(tmp_path):
+    """index --workers indexes in-process with data-parallel embedding."""
+    db_path = tmp_path / "test.db"
+    md_file = tmp_path / "note.md"
+    md_file.write_text("# Note\n\nParallel indexing content.\n")
+    env = {"AGENT_MEMORY_DB": str(db_path)}
+
+    stdout, _, code = _run_cli(
+        "index", "--path", str(md_file), "--workers", "2", "--json",
+        env_overrides=env,
+    )
+    assert code == 0
+    assert json.loads(stdout)["chunks_created"] >= 1
+
+
+def test_cli_index_negative_workers(tmp_path):
+    """index --workers rejects negative counts."""
+    env = {"AGENT_MEMORY_DB": str(tmp_path / "test.db")}
+    _, stderr, code = _run_cli("index", "--workers", "-1", env_overrides=env)
+    assert code != 0
+    assert "--workers" in stderr
+
+
+def test_cli_index_reembed_switches_model(tmp_path):
+    """index --reembed moves the index to AGENT_MEMORY_MODEL; status reports it."""
+    db_path = tmp_path / "test.db"
+    env = {"AGENT_MEMORY_DB": str(db_path)}
+    _run_cli("add", "model switch note", env_overrides=env)
+
+    new_env = {**env, "AGENT_MEMORY_MODEL": "sentence-transformers/all-MiniLM-L6-v2"}
+    _, stderr, _ = _run_cli(
+        "index", "--path", str(tmp_path / "none"), env_overrides=new_env,
+    )
+    assert "--reembed" in stderr  # configured model differs from the index
+
+    stdout, _, code = _run_cli("index", "--reembed", "--json", env_overrides=new_env)
+    assert code == 0
+    data = json.loads(stdout)
+    assert data["previous_model"] == "BAAI/bge-small-en-v1.5"
+    assert data["model"] == "sentence-transformers/all-MiniLM-L6-v2"
+    assert data["chunks_embedded"] == 1
+
+    stdout, _, _ = _run_cli("status", "--json", env_overrides=env)
+    assert json.loads(stdout)["embedding_model"] == "sentence-transformers/all-MiniLM-L6-v2"
+
+
+# --- convert subcommand ---
+
+
+def test_cli_convert_quantization(tmp_path):
+    """convert switches vector storage in place and status reports it."""
+    db_path = tmp_path / "test.db"
+    env = {"AGENT_MEMORY_DB": str(db_path)}
+    _run_cli("add", "quantize me", env_overrides=env)
+
+    stdout, _, code = _run_cli(
+        "convert", "--quantization", "int8", "--json", env_overrides=env,
+    )
+    assert code == 0
+    data = json.loads(stdout)
+    assert data["previous"] == "float"
+    assert data["quantization"] == "int8"
+    assert data["chunks"] == 1
+
+    stdout, _, _ = _run_cli("status", "--json", env_overrides=env)
+    assert json.loads(stdout)["vec_quantization"] == "int8"
+
+    stdout, _, code = _run_cli(
+        "search", "quantize", "--vector", "--json", env_overrides=env,
+    )
+    assert code == 0
+    assert json.loads(stdout)[0]["text"] == "quantize me"
+
+
+def test_cli_convert_storage_float16(tmp_path):
+    """convert --storage halves cached vectors and search still works."""
+    db_path = tmp_path / "test.db"
+    env = {"AGENT_MEMORY_DB": str(db_path)}
+    _run_cli("add", "half precision note", env_overrides=env)
+
+    stdout, _, code = _run_cli(
+        "convert", "--storage", "float16", "--json", env_overrides=env,
+    )
+    assert code == 0
+    data = json.loads(stdout)
+    assert data["previous_storage"] == "float32"
+    assert data["storage"] == "float16"
+    assert data["vectors_converted"] >= 1
+    assert data["quantization"] == "float"  # index untouched
+
+    stdout, _, _ = _run_cli("status", "--json", env_overrides=env)
+    assert json.loads(stdout)["embedding_storage"] == "float16"
+
+    stdout, _, code = _run_cli(
+        "search", "half precision", "--vector", "--json", env_overrides=env,
+    )
+    assert code == 0
+    assert json.loads(stdout)[0]["text"] == "half precision note"
+
+
+def test_cli_convert_pca_dims(tmp_path):
+    """convert --pca-dims builds a reduced index; 0 removes it."""
+    db_path = tmp_path / "test.db"
+    env = {"AGENT_MEMORY_DB": str(db_path)}
+    for text in ("alpha note", "beta note", "gamma note"):
+        _run_cli("add", text, env_overrides=env)
+
+    stdout, _, code = _run_cli("convert", "--pca-dims", "2", "--json", env_overrides=env)
+    assert code == 0
+    assert json.loads(stdout)["pca_dims"] == 2
+    stdout, _, _ = _run_cli("status", "--json", env_overrides=env)
+    assert json.loads(stdout)["pca_dims"] == 2
+
+    stdout, _, code = _run_cli("search", "beta", "--vector", "--json", env_overrides=env)
+    assert code == 0
+    assert json.loads(stdout)[0]["text"] == "beta note"
+
+    _run_cli("convert", "--pca-dims", "0", env_overrides=env)
+    stdout, _, _ = _run_cli("status", "--json", env_overrides=env)
+    assert json.loads(stdout)["pca_dims"] == 0
+
+
+def test_cli_convert_requires_a_target(tmp_path):
+    """convert with neither option is an error."""
+    env = {"AGENT_MEMORY_DB": str(tmp_path / "test.db")}
+    _, stderr, code = _run_cli("convert", env_overrides=env)
+    assert code != 0
+    assert "--storage" in stderr
+
+
+def test_cli_convert_rejects_unknown_type(tmp_path):
+    """convert only accepts the supported storage types."""
+    env = {"AGENT_MEMORY_DB": str(tmp_path / "test.db")}
+    _, _, code = _run_cli("convert", "--quantization", "int4", env_overrides=env)
+    assert code != 0
+
+
 # --- summarize subcommand ---
 
 
@@ -747,16 +931,36 @@ def test_cli_code_summarize_json(tmp_path):
 def test_cli_install_json(tmp_path):
     """install --json outputs valid JSON with status field."""
     db_path = tmp_path / "test.db"
-    env = {"AGENT_MEMORY_DB": str(db_path)}
+    env = {"AGENT_MEMORY_DB": str(db_path), "AGENT_MEMORY_DIR": str(tmp_path)}
 
     stdout, _, code = _run_cli("install", "--json", env_overrides=env)
     assert code == 0
     data = json.loads(stdout)
     assert data["status"] == "ready"
+    assert data["model_dir"] == str((tmp_path / "models").resolve())
     # JSON mode should not contain progress text
     assert "Downloading" not in stdout
 
 
+def test_cli_install_pins_model_dir(tmp_path):
+    """install --model-dir is recorded in the DB and reported by status."""
+    db_path = tmp_path / "test.db"
+    model_dir = tmp_path / "pinned"
+    env = {"AGENT_MEMORY_DB": str(db_path)}
+
+    stdout, _, code = _run_cli(
+        "install", "--model-dir", str(model_dir), "--json", env_overrides=env
+    )
+    assert code == 0
+    assert json.loads(stdout)["model_dir"] == str(model_dir.resolve())
+
+    stdout, _, code = _run_cli("status", "--load-time", "--json", env_overrides=env)
+    assert code == 0
+    data = json.loads(stdout)
+    assert data["model_dir"] == str(model_dir.resolve())
+    assert data["model_load_seconds"] >= 0
+
+
 # --- error handling ---
 
 
@@ -870,3 +1074,17 @@ def test_cli_index_search_roundtrip(tmp_path):
     data = json.loads(stdout)
     assert len(data) >= 1
     assert any("OAuth" in item["text"] or "authentication" in item["text"].lower() for item in data)
+
+
+def test_cli_invalid_setting_exits_cleanly(tmp_path):
+    """A bad AGENT_MEMORY_* value prints its message, not a traceback."""
+    stdout, stderr, code = _run_cli(
+        "status",
+        env_overrides={
+            "AGENT_MEMORY_DB": str(tmp_path / "m.db"),
+            "AGENT_MEMORY_SQLITE_PROFILE": "bogus",
+        },
+    )
+    assert code == 1
+    assert "AGENT_MEMORY_SQLITE_PROFILE" in stderr
+    assert "Traceback" not in stderr
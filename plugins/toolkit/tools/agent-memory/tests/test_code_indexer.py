@@ -200,3 +200,58 @@ def test_index_stats_fields(code_db, sample_codebase):
     assert hasattr(stats, "files_indexed")
     assert hasattr(stats, "files_skipped")
     assert hasattr(stats, "nodes_created")
+
+
+def test_index_codebase_stat_fast_path_skips_reading(code_db, sample_codebase, monkeypatch):
+    """Files with unchanged mtime and size are skipped without being read."""
+    from agent_memory.code_indexer import index_codebase
+    index_codebase(code_db, str(sample_codebase / "src"))
+
+    def fail_read(self):
+        raise AssertionError(f"unexpected read of {self}")
+
+    monkeypatch.setattr(Path, "read_bytes", fail_read)
+    stats = index_codebase(code_db, str(sample_codebase / "src"))
+    assert stats.files_indexed == 0
+    assert stats.files_skipped > 0
+
+
+def test_index_codebase_verify_hashes_same_stat_edits(code_db, sample_codebase):
+    """verify=True catches an edit that kept mtime and size identical."""
+    import os
+
+    from agent_memory.code_indexer import index_codebase
+    index_codebase(code_db, str(sample_codebase / "src"))
+
+    calc = sample_codebase / "src" / "calc.py"
+    before = calc.stat()
+    original = calc.read_text()
+    calc.write_text(original.replace("add", "sub"))
+    os.utime(calc, ns=(before.st_atime_ns, before.st_mtime_ns))
+
+    assert index_codebase(code_db, str(sample_codebase / "src")).files_indexed == 0
+    stats = index_codebase(code_db, str(sample_codebase / "src"), verify=True)
+    assert stats.files_indexed == 1
+
+
+def test_index_codebase_prunes_renamed_files(code_db, sample_codebase):
+    """Renaming a file drops the old path's nodes, FTS rows, and record."""
+    from agent_memory.code_indexer import index_codebase
+    index_codebase(code_db, str(sample_codebase / "src"))
+    fts_query = "SELECT COUNT(*) FROM code_nodes_fts WHERE code_nodes_fts MATCH 'Calculator'"
+    fts_before = code_db.execute(fts_query).fetchone()[0]
+
+    old = sample_codebase / "src" / "calc.py"
+    new = sample_codebase / "src" / "calculator.py"
+    old.rename(new)
+    stats = index_codebase(code_db, str(sample_codebase / "src"))
+
+    assert stats.files_pruned == 1
+    assert stats.nodes_pruned > 0
+    assert code_db.execute(
+        "SELECT COUNT(*) FROM code_nodes WHERE file_path = ?", (str(old),)
+    ).fetchone()[0] == 0
+    assert code_db.execute(
+        "SELECT COUNT(*) FROM code_files WHERE path = ?", (str(old),)
+    ).fetchone()[0] == 0
+    assert code_db.execute(fts_query).fetchone()[0] == fts_before
@@ -87,3 +87,167 @@ def test_scan_patterns(monkeypatch, tmp_path):
     ]
     assert len(patterns) == 3
     assert patterns == expected
+
+
+def test_default_socket_path(monkeypatch, tmp_path):
+    """Daemon socket lives inside MEMORY_DIR."""
+    monkeypatch.delenv("AGENT_MEMORY_SOCKET", raising=False)
+    monkeypatch.setenv("AGENT_MEMORY_DIR", str(tmp_path))
+    from agent_memory.config import get_socket_path
+
+    assert get_socket_path() == tmp_path / "agent-memory.sock"
+
+
+def test_socket_path_env_override(monkeypatch, tmp_path):
+    """AGENT_MEMORY_SOCKET env var overrides default."""
+    custom = tmp_path / "custom.sock"
+    monkeypatch.setenv("AGENT_MEMORY_SOCKET", str(custom))
+    from agent_memory.config import get_socket_path
+
+    assert get_socket_path() == custom
+
+
+def test_embed_settings_defaults(monkeypatch):
+    """Embedding parallelism defaults to FastEmbed's own behaviour."""
+    for name in ("BATCH_SIZE", "THREADS", "WORKERS"):
+        monkeypatch.delenv(f"AGENT_MEMORY_EMBED_{name}", raising=False)
+    from agent_memory.config import (
+        EMBED_BATCH_SIZE,
+        get_embed_batch_size,
+        get_embed_threads,
+        get_embed_workers,
+    )
+
+    assert get_embed_batch_size() == EMBED_BATCH_SIZE == 256
+    assert get_embed_threads() is None
+    assert get_embed_workers() is None
+
+
+def test_embed_settings_env_override(monkeypatch):
+    """AGENT_MEMORY_EMBED_* env vars override embedding parallelism."""
+    monkeypatch.setenv("AGENT_MEMORY_EMBED_BATCH_SIZE", "64")
+    monkeypatch.setenv("AGENT_MEMORY_EMBED_THREADS", "4")
+    monkeypatch.setenv("AGENT_MEMORY_EMBED_WORKERS", "8")
+    from agent_memory.config import (
+        get_embed_batch_size,
+        get_embed_threads,
+        get_embed_workers,
+    )
+
+    assert get_embed_batch_size() == 64
+    assert get_embed_threads() == 4
+    assert get_embed_workers() == 8
+
+
+def test_embed_workers_one_means_in_process(monkeypatch):
+    """A single worker is the same as no data parallelism."""
+    monkeypatch.setenv("AGENT_MEMORY_EMBED_WORKERS", "1")
+    from agent_memory.config import get_embed_workers
+
+    assert get_embed_workers() is None
+
+
+def test_embed_settings_reject_garbage(monkeypatch):
+    """Non-integer or negative values raise a clear error."""
+    import pytest
+
+    from agent_memory.config import get_embed_threads, get_embed_workers
+
+    monkeypatch.setenv("AGENT_MEMORY_EMBED_THREADS", "many")
+    with pytest.raises(ValueError, match="AGENT_MEMORY_EMBED_THREADS"):
+        get_embed_threads()
+    monkeypatch.setenv("AGENT_MEMORY_EMBED_WORKERS", "-2")
+    with pytest.raises(ValueError, match="negative"):
+        get_embed_workers()
+
+
+def test_vector_storage_settings(monkeypatch):
+    """Storage types default to full precision and reject unknown names."""
+    import pytest
+
+    from agent_memory.config import get_embed_storage, get_vec_quantization
+
+    monkeypatch.delenv("AGENT_MEMORY_EMBED_STORAGE", raising=False)
+    monkeypatch.delenv("AGENT_MEMORY_VEC_QUANTIZATION", raising=False)
+    assert get_embed_storage() == "float32"
+    assert get_vec_quantization() == "float"
+
+    monkeypatch.setenv("AGENT_MEMORY_EMBED_STORAGE", "Float16")
+    assert get_embed_storage() == "float16"
+    monkeypatch.setenv("AGENT_MEMORY_EMBED_STORAGE", "bf16")
+    with pytest.raises(ValueError, match="AGENT_MEMORY_EMBED_STORAGE"):
+        get_embed_storage()
+
+
+def test_embedding_model_settings(monkeypatch):
+    """AGENT_MEMORY_MODEL picks the model; its dimension comes from the table or env."""
+    import pytest
+
+    from agent_memory.config import (
+        EMBEDDING_DIM,
+        EMBEDDING_MODEL,
+        get_embedding_dim,
+        get_embedding_model,
+    )
+
+    monkeypatch.delenv("AGENT_MEMORY_MODEL", raising=False)
+    monkeypatch.delenv("AGENT_MEMORY_EMBED_DIM", raising=False)
+    assert get_embedding_model() == EMBEDDING_MODEL
+    assert get_embedding_dim() == EMBEDDING_DIM
+
+    monkeypatch.setenv("AGENT_MEMORY_MODEL", "nomic-ai/nomic-embed-text-v1.5-Q")
+    assert get_embedding_dim() == 768
+
+    monkeypatch.setenv("AGENT_MEMORY_MODEL", "acme/custom-embed")
+    with pytest.raises(ValueError, match="AGENT_MEMORY_EMBED_DIM"):
+        get_embedding_dim()
+    monkeypatch.setenv("AGENT_MEMORY_EMBED_DIM", "256")
+    assert get_embedding_dim() == 256
+    assert get_embedding_dim(EMBEDDING_MODEL) == EMBEDDING_DIM  # known models ignore it
+
+
+def test_model_dir_from_env(monkeypatch, tmp_path):
+    """AGENT_MEMORY_MODEL_DIR pins the model directory; unset means no pin."""
+    from agent_memory.config import get_model_dir
+
+    monkeypatch.delenv("AGENT_MEMORY_MODEL_DIR", raising=False)
+    assert get_model_dir() is None
+    monkeypatch.setenv("AGENT_MEMORY_MODEL_DIR", str(tmp_path))
+    assert get_model_dir() == tmp_path
+
+
+def test_chunk_mode_setting(monkeypatch):
+    """AGENT_MEMORY_CHUNK_MODE picks chars, tokens, or content; anything else is an error."""
+    import pytest
+
+    from agent_memory.config import DEFAULT_CHUNK_MODE, get_chunk_mode
+
+    monkeypatch.delenv("AGENT_MEMORY_CHUNK_MODE", raising=False)
+    assert get_chunk_mode() == DEFAULT_CHUNK_MODE == "chars"
+    monkeypatch.setenv("AGENT_MEMORY_CHUNK_MODE", "Tokens")
+    assert get_chunk_mode() == "tokens"
+    monkeypatch.setenv("AGENT_MEMORY_CHUNK_MODE", "content")
+    assert get_chunk_mode() == "content"
+    monkeypatch.setenv("AGENT_MEMORY_CHUNK_MODE", "words")
+    with pytest.raises(ValueError, match="AGENT_MEMORY_CHUNK_MODE"):
+        get_chunk_mode()
+
+
+def test_sqlite_profile_settings(monkeypatch):
+    """AGENT_MEMORY_SQLITE_PROFILE picks the pragmas; the mmap size can be overridden."""
+    import pytest
+
+    from agent_memory.config import SQLITE_PROFILES, get_sqlite_pragmas, get_sqlite_profile
+
+    monkeypatch.delenv("AGENT_MEMORY_SQLITE_PROFILE", raising=False)
+    monkeypatch.delenv("AGENT_MEMORY_SQLITE_MMAP_SIZE", raising=False)
+    assert get_sqlite_profile() == "fast"
+    assert get_sqlite_pragmas() == SQLITE_PROFILES["fast"]
+    assert get_sqlite_pragmas()["synchronous"] == "NORMAL"
+    monkeypatch.setenv("AGENT_MEMORY_SQLITE_PROFILE", "Baseline")
+    assert get_sqlite_pragmas() == {}
+    monkeypatch.setenv("AGENT_MEMORY_SQLITE_MMAP_SIZE", "0")
+    assert get_sqlite_pragmas() == {"mmap_size": 0}
+    monkeypatch.setenv("AGENT_MEMORY_SQLITE_PROFILE", "turbo")
+    with pytest.raises(ValueError, match="AGENT_MEMORY_SQLITE_PROFILE"):
+        get_sqlite_profile()
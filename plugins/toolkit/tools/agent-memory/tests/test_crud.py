@@ -17,6 +17,27 @@ def test_add_memory(tmp_db):
     conn.close()
 
 
+def test_add_memory_records_model(tmp_db, monkeypatch):
+    """add_memory stores the index model with the chunk, as the embedding cache does."""
+    from agent_memory.crud import add_memory
+    from agent_memory.db import has_sqlite_vec, init_db
+    from agent_memory.vectors import get_index_model
+
+    monkeypatch.setenv("AGENT_MEMORY_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    conn = init_db(tmp_db)
+    chunk_id = add_memory(conn, "Pin the model per chunk")
+
+    model = get_index_model(conn)
+    assert model == "sentence-transformers/all-MiniLM-L6-v2"
+    row = conn.execute("SELECT model FROM chunks WHERE id = ?", (chunk_id,)).fetchone()
+    assert row[0] == model
+    if has_sqlite_vec():
+        assert conn.execute(
+            "SELECT DISTINCT model FROM embedding_cache"
+        ).fetchall() == [(model,)]
+    conn.close()
+
+
 def test_add_memory_default_source(tmp_db):
     """add_memory defaults source to 'manual'."""
     from agent_memory.db import init_db
@@ -0,0 +1,227 @@
+# ABOUTME: Tests for daemon module — Unix socket embedding server and its client.
+# ABOUTME: Verifies embed/query/search round trips, fallbacks, and socket cleanup.
+
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+
+class _FakeVector(list):
+    """Stand-in for a numpy row: a list with tolist()."""
+
+    def tolist(self):
+        return list(self)
+
+
+class _FakeModel:
+    """Deterministic model so tests never load FastEmbed."""
+
+    def embed(self, texts, **kwargs):
+        from agent_memory.config import EMBEDDING_DIM
+
+        for t in texts:
+            yield _FakeVector([float(len(t))] + [0.5] * (EMBEDDING_DIM - 1))
+
+    def query_embed(self, text, **kwargs):
+        return self.embed([text])
+
+
+@pytest.fixture
+def socket_path(monkeypatch):
+    """Short socket path (AF_UNIX paths are limited to ~104 bytes)."""
+    tmp = tempfile.mkdtemp(prefix="am-", dir="/tmp")
+    path = Path(tmp) / "d.sock"
+    monkeypatch.setenv("AGENT_MEMORY_SOCKET", str(path))
+    yield path
+    shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _use_fake_model(monkeypatch):
+    """Make the fake model the loaded one for the configured model name."""
+    import agent_memory.embedder as embedder
+    from agent_memory.config import get_embedding_model
+
+    monkeypatch.setattr(embedder, "_model", _FakeModel())
+    monkeypatch.setattr(embedder, "_model_name", get_embedding_model())
+
+
+@pytest.fixture
+def daemon(socket_path, monkeypatch):
+    """Run an EmbeddingDaemon with a fake model on a background thread."""
+    import agent_memory.embedder as embedder
+    from agent_memory.daemon import EmbeddingDaemon
+
+    _use_fake_model(monkeypatch)
+    # The daemon turns off daemon routing; restore it after the test
+    monkeypatch.setattr(embedder, "_use_daemon", True)
+
+    server = EmbeddingDaemon(socket_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_ping(daemon):
+    """ping reports the daemon's model and pid."""
+    import os
+
+    from agent_memory.config import EMBEDDING_MODEL
+    from agent_memory.daemon import ping
+
+    info = ping()
+    assert info["model"] == EMBEDDING_MODEL
+    assert info["pid"] == os.getpid()
+
+
+def test_ping_without_daemon(socket_path):
+    """No socket file means no daemon."""
+    from agent_memory.daemon import ping
+
+    assert ping() is None
+
+
+def test_stale_socket_is_ignored_and_replaced(socket_path, monkeypatch):
+    """A leftover socket file with nobody listening falls back, then is reclaimed."""
+    import socket
+
+    import agent_memory.embedder as embedder
+    from agent_memory.daemon import EmbeddingDaemon, ping
+
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(str(socket_path))
+    stale.close()
+    assert socket_path.exists()
+    assert ping() is None
+
+    monkeypatch.setattr(embedder, "_use_daemon", True)
+    server = EmbeddingDaemon(socket_path)
+    server.server_close()
+    assert not socket_path.exists()
+
+
+def test_embed_round_trip(daemon):
+    """Vectors come back intact and in order."""
+    from agent_memory.config import EMBEDDING_DIM, EMBEDDING_MODEL
+    from agent_memory.daemon import embed_query_remote, embed_texts_remote
+
+    vectors = embed_texts_remote(["a", "bbb"], EMBEDDING_MODEL)
+    assert vectors.shape == (2, EMBEDDING_DIM)
+    assert vectors[:, 0].tolist() == [1.0, 3.0]
+    assert embed_query_remote("four", EMBEDDING_MODEL)[0] == 4.0
+
+
+def test_second_daemon_refused(daemon, socket_path):
+    """Starting a daemon on a live socket fails instead of stealing it."""
+    from agent_memory.daemon import EmbeddingDaemon
+
+    with pytest.raises(RuntimeError, match="already running"):
+        EmbeddingDaemon(socket_path)
+
+
+def test_search_via_daemon(daemon, tmp_db):
+    """search op runs against the client's DB on the daemon's connection."""
+    from agent_memory.crud import add_memory
+    from agent_memory.daemon import search_remote
+    from agent_memory.db import init_db
+
+    conn = init_db(tmp_db)
+    add_memory(conn, "daemon keeps the embedding model warm")
+    conn.close()
+
+    results = search_remote(tmp_db, "embedding", "keyword", 5)
+    assert len(results) == 1
+    assert results[0].text == "daemon keeps the embedding model warm"
+    assert str(tmp_db.resolve()) in daemon._conns
+
+
+def test_error_reply_falls_back(daemon):
+    """A failed request returns None rather than raising in the client."""
+    from agent_memory.daemon import request
+
+    assert request({"op": "nope"}) is None
+
+
+def test_busy_daemon_times_out_quickly(socket_path, monkeypatch):
+    """Searches give up on a daemon stuck in a long batch instead of waiting it out."""
+    import socket
+    import time
+
+    import agent_memory.daemon as daemon
+
+    monkeypatch.setattr(daemon, "_REQUEST_TIMEOUT", 0.2)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as busy:
+        busy.bind(str(socket_path))
+        busy.listen(1)
+        start = time.monotonic()
+        assert daemon.ping() is None
+        assert daemon.search_remote(Path("/tmp/x.db"), "q", "keyword", 5) is None
+        assert time.monotonic() - start < 2
+
+
+def test_only_embed_waits_for_long_batches(monkeypatch):
+    """Index batches get the long timeout; interactive requests keep the short one."""
+    import agent_memory.daemon as daemon
+
+    timeouts = {}
+
+    def fake_request(payload, socket_path=None, timeout=None):
+        timeouts[payload["op"]] = timeout
+        return None
+
+    monkeypatch.setattr(daemon, "request", fake_request)
+    daemon.ping()
+    daemon.embed_texts_remote(["a"], "m")
+    daemon.embed_query_remote("a", "m")
+    daemon.search_remote(Path("/tmp/x.db"), "q", "keyword", 5)
+    assert timeouts == {
+        "ping": None, "embed": daemon._EMBED_TIMEOUT, "query": None, "search": None,
+    }
+    assert daemon._REQUEST_TIMEOUT < 10
+
+
+def test_embedder_routes_through_daemon(socket_path, monkeypatch):
+    """embed_texts uses the daemon when it answers and never loads the model."""
+    import numpy as np
+
+    import agent_memory.daemon as daemon_mod
+    import agent_memory.embedder as embedder
+
+    def no_model(model_name=None):
+        raise AssertionError("model should not load")
+
+    monkeypatch.setattr(embedder, "_use_daemon", True)
+    monkeypatch.setattr(embedder, "_get_model", no_model)
+    monkeypatch.setattr(
+        daemon_mod, "embed_texts_remote",
+        lambda texts, model: np.ones((len(texts), 1), dtype=np.float32),
+    )
+    monkeypatch.setattr(
+        daemon_mod, "embed_query_remote",
+        lambda text, model: np.array([2.0], dtype=np.float32),
+    )
+
+    assert embedder.embed_texts(["x", "y"]) == [[1.0], [1.0]]
+    assert embedder.embed_query("q") == [2.0]
+
+
+def test_embedder_falls_back_without_daemon(socket_path, monkeypatch):
+    """With no daemon listening, embedding happens in-process."""
+    import agent_memory.embedder as embedder
+
+    monkeypatch.setattr(embedder, "_use_daemon", True)
+    _use_fake_model(monkeypatch)
+
+    assert embedder.embed_texts(["abc"])[0][0] == 3.0
+
+
+def test_server_close_removes_socket(daemon, socket_path):
+    """Shutting down cleans up the socket file."""
+    daemon.shutdown()
+    daemon.server_close()
+    assert not socket_path.exists()
@@ -7,12 +7,12 @@ def test_init_db_creates_tables(tmp_db):
 
     conn = init_db(tmp_db)
     cursor = conn.execute(
-        "SELECT name FROM sqlite_master WHERE type='table' ORDER BY name"
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') ORDER BY name"
     )
     tables = {row[0] for row in cursor.fetchall()}
     conn.close()
 
-    assert "chunks" in tables
+    assert {"chunks", "chunk_texts", "chunk_locations"} <= tables
     assert "files" in tables
     assert "embedding_cache" in tables
     assert "meta" in tables
@@ -111,3 +111,286 @@ def test_files_table_schema(tmp_db):
 
     expected = {"path", "hash", "mtime", "size"}
     assert expected.issubset(columns)
+
+
+def test_init_db_records_configured_model(tmp_db, monkeypatch):
+    """A new database records AGENT_MEMORY_MODEL and its dimension."""
+    from agent_memory.db import init_db, meta_get
+
+    monkeypatch.setenv("AGENT_MEMORY_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    conn = init_db(tmp_db)
+    assert meta_get(conn, "embedding_model") == "sentence-transformers/all-MiniLM-L6-v2"
+    assert meta_get(conn, "embedding_dim") == "384"
+    conn.close()
+
+
+def test_init_db_migrates_hash_keyed_cache(tmp_db, monkeypatch):
+    """Older caches keyed by hash alone are re-keyed under the original model."""
+    import sqlite3
+
+    from agent_memory.config import EMBEDDING_MODEL
+    from agent_memory.db import init_db, meta_get
+
+    old = sqlite3.connect(str(tmp_db))
+    old.executescript("""
+        CREATE TABLE chunks (
+            id TEXT PRIMARY KEY, path TEXT NOT NULL, source TEXT NOT NULL,
+            start_line INTEGER NOT NULL, end_line INTEGER NOT NULL,
+            hash TEXT NOT NULL, model TEXT NOT NULL DEFAULT '',
+            text TEXT NOT NULL,
+            created_at TEXT NOT NULL DEFAULT (datetime('now')),
+            updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+        );
+        CREATE TABLE embedding_cache (hash TEXT PRIMARY KEY, embedding BLOB NOT NULL);
+        INSERT INTO chunks (id, path, source, start_line, end_line, hash, text)
+            VALUES ('c1', '/a.md', 'daily', 1, 2, 'h1', 'old note');
+        INSERT INTO embedding_cache VALUES ('h1', x'0000803f');
+    """)
+    old.close()
+
+    monkeypatch.setenv("AGENT_MEMORY_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    conn = init_db(tmp_db)
+    assert meta_get(conn, "embedding_model") == EMBEDDING_MODEL
+    assert conn.execute("SELECT hash, model FROM embedding_cache").fetchall() == [
+        ("h1", EMBEDDING_MODEL)
+    ]
+    assert conn.execute("SELECT model FROM chunks").fetchone()[0] == EMBEDDING_MODEL
+    conn.close()
+
+
+def test_init_db_migrates_chunks_table(tmp_db, monkeypatch):
+    """A pre-dedup chunks table is split into texts and locations, keeping FTS and vectors."""
+    import sqlite3
+
+    import numpy as np
+
+    from agent_memory.config import EMBEDDING_DIM
+    from agent_memory.db import _load_vec, has_sqlite_vec, init_db
+
+    monkeypatch.setenv("AGENT_MEMORY_VEC_QUANTIZATION", "float")
+    old = sqlite3.connect(str(tmp_db))
+    _load_vec(old)
+    old.executescript("""
+        CREATE TABLE chunks (
+            id TEXT PRIMARY KEY, path TEXT NOT NULL, source TEXT NOT NULL,
+            start_line INTEGER NOT NULL, end_line INTEGER NOT NULL,
+            hash TEXT NOT NULL, model TEXT NOT NULL DEFAULT '',
+            text TEXT NOT NULL,
+            created_at TEXT NOT NULL DEFAULT (datetime('now')),
+            updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+        );
+        CREATE VIRTUAL TABLE chunks_fts USING fts5(
+            text, content='chunks', content_rowid='rowid', tokenize='porter unicode61'
+        );
+        INSERT INTO chunks (id, path, source, start_line, end_line, hash, text) VALUES
+            ('c1', '/a.md', 'daily', 1, 2, 'h-plan', 'the shared plan'),
+            ('c2', '/a.md', 'daily', 3, 4, 'h-note', 'a lone note'),
+            ('c3', '/b.md', 'session', 7, 8, 'h-plan', 'the shared plan');
+        INSERT INTO chunks_fts (chunks_fts) VALUES ('rebuild');
+    """)
+    vectors = np.eye(3, EMBEDDING_DIM, dtype=np.float32)
+    if has_sqlite_vec():
+        old.execute(
+            "CREATE VIRTUAL TABLE chunks_vec USING vec0("
+            f"embedding float[{EMBEDDING_DIM}] distance_metric=cosine)"
+        )
+        old.executemany(
+            "INSERT INTO chunks_vec (rowid, embedding) VALUES (?, ?)",
+            [(i + 1, vectors[i].tobytes()) for i in range(3)],
+        )
+    old.commit()
+    old.close()
+
+    conn = init_db(tmp_db)
+    assert conn.execute("SELECT COUNT(*) FROM chunk_texts").fetchone()[0] == 2
+    rows = conn.execute(
+        "SELECT id, path, start_line, text_id FROM chunks ORDER BY id"
+    ).fetchall()
+    assert [r[:3] for r in rows] == [("c1", "/a.md", 1), ("c2", "/a.md", 3), ("c3", "/b.md", 7)]
+    assert rows[0][3] == rows[2][3] != rows[1][3]
+    assert conn.execute(
+        "SELECT rowid FROM chunks_fts WHERE chunks_fts MATCH 'plan'"
+    ).fetchall() == [(rows[0][3],)]
+    if has_sqlite_vec():
+        from agent_memory.vectors import knn
+
+        assert conn.execute("SELECT COUNT(*) FROM chunks_vec").fetchone()[0] == 2
+        assert knn(conn, vectors[1], 1)[0][0] == rows[1][3]
+    conn.close()
+
+
+def test_init_db_sets_schema_version(tmp_db):
+    """New databases start at the current schema version."""
+    from agent_memory.db import SCHEMA_VERSION, init_db
+
+    conn = init_db(tmp_db)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    conn.close()
+
+
+def test_init_db_adds_indexes_to_unversioned_db(tmp_db):
+    """A database from before user_version was set gets the secondary indexes."""
+    from agent_memory.db import _SECONDARY_INDEXES, SCHEMA_VERSION, init_db
+
+    conn = init_db(tmp_db)
+    for name in _SECONDARY_INDEXES:
+        conn.execute(f"DROP INDEX {name}")
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    conn.close()
+
+    conn = init_db(tmp_db)
+    indexes = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index'"
+    )}
+    assert set(_SECONDARY_INDEXES) <= indexes
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    conn.close()
+
+
+def test_init_db_rejects_newer_schema(tmp_db):
+    """A database written by a newer release is refused before any DDL runs."""
+    import sqlite3
+
+    import pytest
+
+    from agent_memory.db import SCHEMA_VERSION, init_db, open_db
+
+    conn = init_db(tmp_db)
+    # A future layout: a table renamed away, so the old DDL would recreate it
+    conn.execute("ALTER TABLE files RENAME TO tracked_files")
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION + 1}")
+    conn.commit()
+    schema = "SELECT type, name, sql FROM sqlite_master ORDER BY name"
+    before = conn.execute(schema).fetchall()
+    conn.close()
+
+    for open_fn in (init_db, open_db):
+        with pytest.raises(RuntimeError, match="newer"):
+            open_fn(tmp_db)
+
+    conn = sqlite3.connect(str(tmp_db))
+    assert conn.execute(schema).fetchall() == before
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION + 1
+    conn.close()
+
+
+HOT_QUERIES = [
+    # indexer: _sync_chunks, _chunk_ids, _delete_chunks_for_paths
+    ("SELECT rowid, id, hash, start_line, end_line FROM chunks "
+     "WHERE path = ? AND start_line >= ?", ("/a.md", 0)),
+    ("SELECT hash, COUNT(*) FROM chunks "
+     "WHERE path = ? AND start_line < ? GROUP BY hash", ("/a.md", 10)),
+    ("SELECT rowid FROM chunk_locations WHERE path IN (?, ?)", ("/a.md", "/b.md")),
+    # crud: list_memories
+    ("SELECT id, text, path, source, start_line, end_line, created_at "
+     "FROM chunks WHERE source = ? ORDER BY created_at DESC LIMIT ?", ("memory", 20)),
+    ("SELECT id, text, path, source, start_line, end_line, created_at "
+     "FROM chunks ORDER BY created_at DESC LIMIT ?", (20,)),
+    # tree: get_children, store_nodes, delete_file_nodes, resolve_refs
+    ("SELECT id FROM code_nodes WHERE parent_id = ? ORDER BY start_line", (1,)),
+    ("DELETE FROM code_nodes WHERE file_path = ? AND repo_path = ?", ("a.py", "/repo")),
+    ("SELECT id FROM code_nodes WHERE name = ? OR qualified_name = ? LIMIT 1", ("f", "f")),
+    ("SELECT cr.id FROM code_refs cr WHERE cr.source_id = ?", (1,)),
+    ("UPDATE code_refs SET target_id = NULL WHERE target_id IN (?, ?)", (1, 2)),
+]
+
+
+def _query_plan(conn, sql, params):
+    return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def test_hot_queries_use_indexes(tmp_db):
+    """Each hot lookup is answered from an index rather than a full table scan."""
+    import re
+
+    from agent_memory.db import init_db
+
+    conn = init_db(tmp_db)
+    for sql, params in HOT_QUERIES:
+        plan = _query_plan(conn, sql, params)
+        assert any("INDEX" in step for step in plan), (sql, plan)
+        # A bare "SCAN <table>" reads every row; "SCAN ... USING INDEX" walks
+        # an index in order and stops at the LIMIT.
+        assert not any(re.fullmatch(r"SCAN \w+", step) for step in plan), (sql, plan)
+    conn.close()
+
+
+def test_init_db_skips_ddl_when_current(tmp_db):
+    """A database already at SCHEMA_VERSION is opened without re-running the DDL."""
+    from agent_memory.db import init_db
+
+    conn = init_db(tmp_db)
+    conn.execute("DROP INDEX idx_code_refs_target")
+    conn.commit()
+    conn.close()
+
+    conn = init_db(tmp_db)
+    assert conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'idx_code_refs_target'"
+    ).fetchone() is None
+    conn.close()
+
+
+def test_open_db_read_only(tmp_db):
+    """open_db(read_only=True) reads a current database but can't write to it."""
+    import sqlite3
+
+    import numpy as np
+    import pytest
+
+    from agent_memory.config import EMBEDDING_DIM
+    from agent_memory.db import has_sqlite_vec, init_db, open_db
+
+    init_db(tmp_db).close()
+    conn = open_db(tmp_db, read_only=True)
+    assert conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0] == 0
+    with pytest.raises(sqlite3.OperationalError, match="readonly"):
+        conn.execute("INSERT INTO meta (key, value) VALUES ('k', 'v')")
+    with pytest.raises(sqlite3.OperationalError):
+        conn.execute("SELECT vec_version()")  # not loaded until needed
+    if has_sqlite_vec():
+        from agent_memory.vectors import knn
+
+        assert knn(conn, np.ones(EMBEDDING_DIM, dtype=np.float32), 3) == []
+    conn.close()
+
+
+def test_open_db_falls_back_to_init_db(tmp_path):
+    """A missing or outdated database is created or migrated by init_db."""
+    from agent_memory.db import SCHEMA_VERSION, open_db
+
+    db = tmp_path / "new" / "memory.db"
+    conn = open_db(db, read_only=True)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    conn.execute("DROP INDEX idx_code_refs_target")
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+
+    conn = open_db(db)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    assert conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'idx_code_refs_target'"
+    ).fetchone() is not None
+    conn.close()
+
+
+def test_connections_use_sqlite_profile(tmp_db, monkeypatch):
+    """init_db and open_db apply the configured profile's pragmas."""
+    from agent_memory.db import init_db, open_db
+
+    monkeypatch.delenv("AGENT_MEMORY_SQLITE_PROFILE", raising=False)
+    monkeypatch.setenv("AGENT_MEMORY_SQLITE_MMAP_SIZE", str(1 << 20))
+    for conn in (init_db(tmp_db), open_db(tmp_db), open_db(tmp_db, read_only=True)):
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+        assert conn.execute("PRAGMA cache_size").fetchone()[0] == -64 * 1024
+        assert conn.execute("PRAGMA mmap_size").fetchone()[0] == 1 << 20
+        conn.close()
+
+    monkeypatch.setenv("AGENT_MEMORY_SQLITE_PROFILE", "baseline")
+    monkeypatch.delenv("AGENT_MEMORY_SQLITE_MMAP_SIZE")
+    conn = open_db(tmp_db)
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 2  # FULL
+    conn.close()
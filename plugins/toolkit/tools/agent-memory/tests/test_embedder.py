@@ -38,6 +38,42 @@ def test_serialize_f32_roundtrip():
         assert abs(a - b) < 1e-6
 
 
+def test_serialize_f32_ndarray_is_zero_copy():
+    """A float32 ndarray serializes to a view of its own buffer."""
+    import numpy as np
+
+    from agent_memory.embedder import deserialize_f32_array, serialize_f32
+
+    vec = np.array([1.0, 2.0, 3.0], dtype=np.float32)
+    blob = serialize_f32(vec)
+    assert np.shares_memory(np.asarray(blob), vec)
+    assert bytes(blob) == struct.pack("3f", 1.0, 2.0, 3.0)
+    assert deserialize_f32_array(bytes(blob)).tolist() == [1.0, 2.0, 3.0]
+
+
+def test_serialize_f32_converts_float64():
+    """Non-float32 arrays are converted before packing."""
+    import numpy as np
+
+    from agent_memory.embedder import serialize_f32
+
+    assert bytes(serialize_f32(np.array([0.5, 1.5]))) == struct.pack("2f", 0.5, 1.5)
+
+
+def test_embed_texts_array_shape_and_dtype():
+    """embed_texts_array returns one contiguous float32 row per text."""
+    import numpy as np
+
+    from agent_memory.config import EMBEDDING_DIM
+    from agent_memory.embedder import embed_texts_array
+
+    vectors = embed_texts_array(["hello world", "test embedding"])
+    assert vectors.shape == (2, EMBEDDING_DIM)
+    assert vectors.dtype == np.float32
+    assert vectors.flags["C_CONTIGUOUS"]
+    assert embed_texts_array([]).shape == (0, EMBEDDING_DIM)
+
+
 def test_embed_texts_returns_correct_shape():
     """embed_texts returns list of vectors with correct dimension."""
     from agent_memory.embedder import embed_texts
@@ -75,3 +111,181 @@ def test_embed_texts_empty_list():
     from agent_memory.embedder import embed_texts
 
     assert embed_texts([]) == []
+
+
+def test_embed_texts_passes_batch_size_and_workers(monkeypatch):
+    """Local embedding forwards the configured batch size and worker count."""
+    import agent_memory.embedder as embedder
+    from agent_memory.config import EMBEDDING_DIM
+
+    seen = {}
+
+    class RecordingModel:
+        def embed(self, texts, batch_size=256, parallel=None):
+            seen.update(batch_size=batch_size, parallel=parallel)
+            return [[0.0] * EMBEDDING_DIM for _ in texts]
+
+    monkeypatch.setattr(embedder, "_model", RecordingModel())
+    monkeypatch.setattr(embedder, "_model_name", embedder.get_embedding_model())
+    monkeypatch.setattr(embedder, "_use_daemon", False)
+    monkeypatch.setattr(embedder, "_workers", None)
+    monkeypatch.setenv("AGENT_MEMORY_EMBED_BATCH_SIZE", "32")
+    monkeypatch.setenv("AGENT_MEMORY_EMBED_WORKERS", "3")
+
+    embedder.embed_texts_array(["a", "b"])
+    assert seen == {"batch_size": 32, "parallel": 3}
+
+    embedder.set_workers(0)
+    embedder.embed_texts_array(["a"])
+    assert seen["parallel"] == 0
+
+    embedder.set_workers(1)
+    embedder.embed_texts_array(["a"])
+    assert seen["parallel"] is None
+
+
+def _slow_fastembed(monkeypatch, release):
+    """Install a fake fastembed whose model load blocks until release is set."""
+    import sys
+    import types
+
+    loads = []
+
+    class TextEmbedding:
+        def __init__(self, model_name, threads=None):
+            loads.append(model_name)
+            release.wait(5)
+
+    module = types.ModuleType("fastembed")
+    module.TextEmbedding = TextEmbedding
+    monkeypatch.setitem(sys.modules, "fastembed", module)
+    return loads
+
+
+def test_warm_up_loads_in_background(monkeypatch):
+    """warm_up returns at once; a later load waits for it instead of reloading."""
+    import threading
+
+    import agent_memory.embedder as embedder
+
+    monkeypatch.setattr(embedder, "_model", None)
+    monkeypatch.setattr(embedder, "_model_name", None)
+    monkeypatch.setattr(embedder, "_use_daemon", False)
+    release = threading.Event()
+    loads = _slow_fastembed(monkeypatch, release)
+
+    embedder.warm_up()
+    assert embedder._model is None  # still loading
+    embedder.warm_up()  # already warming: no second thread
+
+    release.set()
+    model = embedder._get_model()
+    embedder._warmup_thread.join(5)
+    assert embedder._model is model
+    assert len(loads) == 1
+
+
+def test_warm_up_skipped_when_daemon_running(monkeypatch):
+    """No local load when a daemon will serve the embeddings."""
+    import threading
+
+    import agent_memory.daemon as daemon
+    import agent_memory.embedder as embedder
+
+    monkeypatch.setattr(embedder, "_model", None)
+    monkeypatch.setattr(embedder, "_model_name", None)
+    monkeypatch.setattr(embedder, "_use_daemon", True)
+    monkeypatch.setattr(daemon, "ping", lambda: {"ok": True})
+    loads = _slow_fastembed(monkeypatch, threading.Event())
+
+    embedder.warm_up()
+    assert loads == []
+
+
+def test_warm_up_failure_surfaces_on_real_call(monkeypatch):
+    """A failed warm-up is silent; the next embed call raises the error."""
+    import sys
+
+    import pytest
+
+    import agent_memory.embedder as embedder
+
+    monkeypatch.setattr(embedder, "_model", None)
+    monkeypatch.setattr(embedder, "_model_name", None)
+    monkeypatch.setattr(embedder, "_use_daemon", False)
+    monkeypatch.setitem(sys.modules, "fastembed", None)  # import fails
+
+    embedder.warm_up()
+    embedder._warmup_thread.join(5)
+    with pytest.raises(ImportError):
+        embedder._get_model()
+
+
+def _recording_fastembed(monkeypatch):
+    """Install a fake fastembed that records constructor arguments."""
+    import sys
+    import types
+
+    calls = []
+
+    class TextEmbedding:
+        def __init__(self, model_name, threads=None, **kwargs):
+            calls.append({"model_name": model_name, **kwargs})
+
+    module = types.ModuleType("fastembed")
+    module.TextEmbedding = TextEmbedding
+    monkeypatch.setitem(sys.modules, "fastembed", module)
+    return calls
+
+
+def test_pinned_model_dir_loads_local_files_only(tmp_path, monkeypatch):
+    """A pinned directory is passed as cache_dir with network lookups off."""
+    import agent_memory.embedder as embedder
+
+    monkeypatch.setattr(embedder, "_model", None)
+    monkeypatch.setattr(embedder, "_model_name", None)
+    monkeypatch.setattr(embedder, "_model_dir", None)
+    monkeypatch.delenv("AGENT_MEMORY_MODEL_DIR", raising=False)
+    calls = _recording_fastembed(monkeypatch)
+
+    embedder.set_model_dir(tmp_path)
+    assert embedder.measure_load() >= 0
+    assert calls == [{
+        "model_name": embedder.get_embedding_model(),
+        "cache_dir": str(tmp_path),
+        "local_files_only": True,
+    }]
+
+
+def test_pinned_model_dir_missing_fails_fast(tmp_path, monkeypatch):
+    """A missing pinned model raises FileNotFoundError naming the fix."""
+    import pytest
+
+    import agent_memory.embedder as embedder
+
+    monkeypatch.setattr(embedder, "_model", None)
+    monkeypatch.setattr(embedder, "_model_name", None)
+    monkeypatch.setattr(embedder, "_model_dir", None)
+    monkeypatch.setenv("AGENT_MEMORY_MODEL_DIR", str(tmp_path / "absent"))
+    calls = _recording_fastembed(monkeypatch)
+
+    with pytest.raises(FileNotFoundError, match="agent-memory install --model-dir"):
+        embedder._get_model()
+    assert calls == []
+
+
+def test_init_db_pins_recorded_model_dir(tmp_db, tmp_path, monkeypatch):
+    """Opening a DB whose meta records model_dir pins the embedder to it."""
+    import agent_memory.embedder as embedder
+    from agent_memory.db import init_db, meta_set
+
+    monkeypatch.setattr(embedder, "_model_dir", None)
+    monkeypatch.delenv("AGENT_MEMORY_MODEL_DIR", raising=False)
+
+    conn = init_db(tmp_db)
+    assert embedder.pinned_model_dir() is None
+    meta_set(conn, "model_dir", str(tmp_path))
+    conn.close()
+
+    init_db(tmp_db).close()
+    assert embedder.pinned_model_dir() == tmp_path
@@ -157,3 +157,667 @@ def test_index_stats_fields(tmp_db, sample_memory_dir):
     assert hasattr(stats, "files_skipped")
     assert hasattr(stats, "chunks_created")
     conn.close()
+
+
+def test_index_all_reuses_embedding_cache(tmp_db, sample_memory_dir, monkeypatch):
+    """Re-indexing a changed file only embeds chunks whose text is new."""
+    import agent_memory.indexer as indexer
+    from agent_memory.db import init_db
+    from agent_memory.indexer import index_all
+
+    real_embed = indexer.embed_texts_array
+    embedded: list[str] = []
+
+    def spy(texts, model_name=None):
+        embedded.extend(texts)
+        return real_embed(texts, model_name)
+
+    monkeypatch.setattr(indexer, "embed_texts_array", spy)
+
+    conn = init_db(tmp_db)
+    daily = sample_memory_dir / "agent-memory" / "daily-logs" / "2026-02-11.md"
+    patterns = [str(sample_memory_dir / "agent-memory" / "daily-logs" / "*.md")]
+    index_all(conn, patterns)
+    first_run = len(embedded)
+
+    daily.write_text(daily.read_text() + "\n## Session 2\n\n- Added a cache\n")
+    index_all(conn, patterns)
+    conn.close()
+
+    assert first_run > 0
+    assert embedded[first_run:] == ["## Session 2\n\n- Added a cache"]
+
+
+def test_index_all_batches_across_files(tmp_db, tmp_path, monkeypatch):
+    """Chunks from many small files are embedded in a few shared batches."""
+    import numpy as np
+
+    import agent_memory.indexer as indexer
+    from agent_memory.config import EMBEDDING_DIM
+    from agent_memory.db import init_db
+    from agent_memory.indexer import index_all
+
+    sessions = tmp_path / "sessions"
+    sessions.mkdir()
+    for i in range(10):
+        (sessions / f"s{i}.md").write_text(f"# Session {i}\n\nNote number {i}.\n")
+
+    calls: list[int] = []
+
+    def fake_embed(texts, model_name=None):
+        calls.append(len(texts))
+        return np.ones((len(texts), EMBEDDING_DIM), dtype=np.float32)
+
+    monkeypatch.setattr(indexer, "embed_texts_array", fake_embed)
+    monkeypatch.setattr(indexer, "warm_up", lambda model_name=None: None)
+
+    conn = init_db(tmp_db)
+    stats = index_all(conn, [str(sessions / "*.md")], batch_size=4)
+    count = conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+    conn.close()
+
+    assert stats.files_indexed == 10
+    assert stats.embed_batches == 3
+    assert calls == [4, 4, 2]
+    assert count == 10
+
+
+def test_index_all_reports_stage_times(tmp_db, sample_memory_dir):
+    """IndexStats records busy/idle seconds for each pipeline stage."""
+    from agent_memory.db import init_db
+    from agent_memory.indexer import index_all
+
+    conn = init_db(tmp_db)
+    patterns = [str(sample_memory_dir / "agent-memory" / "*" / "*.md")]
+    stats = index_all(conn, patterns)
+    conn.close()
+
+    assert set(stats.stage_times) == {"read", "embed", "write"}
+    for times in stats.stage_times.values():
+        assert times["busy"] >= 0
+        assert times["idle"] >= 0
+
+
+def test_index_all_propagates_embed_errors(tmp_db, sample_memory_dir, monkeypatch):
+    """A failure inside the embedding stage surfaces to the caller."""
+    import pytest
+
+    import agent_memory.indexer as indexer
+    from agent_memory.db import init_db
+    from agent_memory.indexer import index_all
+
+    def broken(texts, model_name=None):
+        raise ImportError("fastembed missing")
+
+    monkeypatch.setattr(indexer, "embed_texts_array", broken)
+    monkeypatch.setattr(indexer, "warm_up", lambda model_name=None: None)
+
+    conn = init_db(tmp_db)
+    patterns = [str(sample_memory_dir / "agent-memory" / "*" / "*.md")]
+    with pytest.raises(ImportError):
+        index_all(conn, patterns)
+    count = conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+    conn.close()
+    assert count == 0
+
+
+def test_index_all_stat_fast_path_skips_reading(tmp_db, sample_memory_dir, monkeypatch):
+    """Files with unchanged mtime and size are skipped without being read."""
+    from agent_memory.db import init_db
+    from agent_memory.indexer import index_all
+
+    conn = init_db(tmp_db)
+    patterns = [str(sample_memory_dir / "agent-memory" / "*" / "*.md")]
+    index_all(conn, patterns)
+
+    def fail_read(self):
+        raise AssertionError(f"unexpected read of {self}")
+
+    monkeypatch.setattr(Path, "read_bytes", fail_read)
+    stats = index_all(conn, patterns)
+    conn.close()
+    assert stats.files_skipped == 2
+    assert stats.files_indexed == 0
+
+
+def test_index_all_touched_file_refreshes_record(tmp_db, sample_memory_dir):
+    """A touched but identical file is hashed once, then takes the fast path."""
+    import os
+
+    from agent_memory.db import init_db
+    from agent_memory.indexer import index_all
+
+    conn = init_db(tmp_db)
+    daily = sample_memory_dir / "agent-memory" / "daily-logs" / "2026-02-11.md"
+    patterns = [str(daily)]
+    index_all(conn, patterns)
+
+    os.utime(daily, (1_000_000_000, 1_000_000_000))
+    stats = index_all(conn, patterns)
+    mtime = conn.execute(
+        "SELECT mtime FROM files WHERE path = ?", (str(daily),)
+    ).fetchone()[0]
+    conn.close()
+
+    assert stats.files_skipped == 1
+    assert mtime == 1_000_000_000
+
+
+def test_index_all_verify_hashes_same_stat_edits(tmp_db, sample_memory_dir):
+    """verify=True catches an edit that kept mtime and size identical."""
+    import os
+
+    from agent_memory.db import init_db
+    from agent_memory.indexer import index_all
+
+    conn = init_db(tmp_db)
+    daily = sample_memory_dir / "agent-memory" / "daily-logs" / "2026-02-11.md"
+    patterns = [str(daily)]
+    index_all(conn, patterns)
+
+    before = daily.stat()
+    daily.write_text(daily.read_text().replace("FastEmbed", "FASTEMBED"))
+    os.utime(daily, ns=(before.st_atime_ns, before.st_mtime_ns))
+
+    assert index_all(conn, patterns).files_indexed == 0
+    assert index_all(conn, patterns, verify=True).files_indexed == 1
+    conn.close()
+
+
+def test_index_all_prunes_deleted_files(tmp_db, sample_memory_dir):
+    """Chunks, FTS rows, and records of deleted files are removed."""
+    from agent_memory.db import init_db
+    from agent_memory.indexer import index_all
+
+    conn = init_db(tmp_db)
+    daily = sample_memory_dir / "agent-memory" / "daily-logs" / "2026-02-11.md"
+    patterns = [str(sample_memory_dir / "agent-memory" / "*" / "*.md")]
+    index_all(conn, patterns)
+
+    daily.unlink()
+    stats = index_all(conn, patterns)
+
+    assert stats.files_pruned == 1
+    assert stats.chunks_pruned > 0
+    assert conn.execute(
+        "SELECT COUNT(*) FROM chunks WHERE path = ?", (str(daily),)
+    ).fetchone()[0] == 0
+    assert conn.execute(
+        "SELECT COUNT(*) FROM chunks_fts WHERE chunks_fts MATCH 'FastEmbed'"
+    ).fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM files").fetchone()[0] == 1
+    conn.close()
+
+
+def test_index_all_prune_ignores_other_patterns(tmp_db, sample_memory_dir):
+    """Files indexed through other patterns are not pruned."""
+    from agent_memory.db import init_db
+    from agent_memory.indexer import index_all
+
+    conn = init_db(tmp_db)
+    daily_pattern = str(sample_memory_dir / "agent-memory" / "daily-logs" / "*.md")
+    session_pattern = str(sample_memory_dir / "agent-memory" / "sessions" / "*.md")
+    index_all(conn, [daily_pattern])
+    stats = index_all(conn, [session_pattern])
+    conn.close()
+
+    assert stats.files_pruned == 0
+
+
+def test_index_all_prune_ignores_relative_patterns(tmp_db, sample_memory_dir, monkeypatch):
+    """A relative pattern run elsewhere doesn't prune files recorded by absolute path."""
+    from agent_memory.db import init_db
+    from agent_memory.indexer import index_all
+
+    daily = sample_memory_dir / "agent-memory" / "daily-logs" / "2026-02-11.md"
+    conn = init_db(tmp_db)
+    index_all(conn, [str(daily.parent / "*.md")])
+    other = sample_memory_dir / "elsewhere"
+    other.mkdir()
+    (other / "note.md").write_text("# Note\n\nUnrelated.\n")
+    monkeypatch.chdir(other)
+    stats = index_all(conn, ["*.md"])
+
+    assert stats.files_pruned == 0
+    assert conn.execute(
+        "SELECT COUNT(*) FROM chunks WHERE path = ?", (str(daily),)
+    ).fetchone()[0] > 0
+    conn.close()
+
+
+def test_prune_matching_follows_glob():
+    """Recorded paths are matched the way glob.glob would have found them."""
+    from agent_memory.indexer import _matches_any
+
+    assert _matches_any("/m/daily-logs/a.md", ["/m/daily-logs/*.md"])
+    assert not _matches_any("/m/sessions/a.md", ["*.md"])
+    assert not _matches_any("/m/x/daily-logs/a.md", ["daily-logs/*.md"])
+    assert not _matches_any("/other/m/daily-logs/a.md", ["/m/daily-logs/*.md"])
+    assert _matches_any("/m/notes/a/b/c.md", ["/m/notes/**/*.md"])
+    assert _matches_any("/m/notes/c.md", ["/m/notes/**/*.md"])
+    assert not _matches_any("/m/notes/.git/c.md", ["/m/notes/**/*.md"])
+    assert not _matches_any("/m/notes/.hidden.md", ["/m/notes/*.md"])
+    assert _matches_any("notes/a.md", ["notes/*.md"])
+
+
+def test_index_all_prunes_nested_files(tmp_db, tmp_path):
+    """Files found through a ** pattern are pruned once deleted."""
+    from agent_memory.db import init_db
+    from agent_memory.indexer import index_all
+
+    nested = tmp_path / "notes" / "a" / "b" / "deep.md"
+    nested.parent.mkdir(parents=True)
+    nested.write_text("# Deep\n\nNested note.\n")
+    pattern = str(tmp_path / "notes" / "**" / "*.md")
+    conn = init_db(tmp_db)
+    assert index_all(conn, [pattern]).files_indexed == 1
+    nested.unlink()
+    stats = index_all(conn, [pattern])
+    conn.close()
+    assert stats.files_pruned == 1
+
+
+def test_index_all_keeps_unchanged_chunk_rows(tmp_db, tmp_path):
+    """Editing one section keeps the other chunks' rows, FTS, and vectors."""
+    from agent_memory.db import init_db, has_sqlite_vec
+    from agent_memory.indexer import index_all
+
+    memory = tmp_path / "MEMORY.md"
+    memory.write_text(
+        "# Memory\n\nIntro text.\n\n"
+        "## Decisions\n\n- Use SQLite\n\n"
+        "## Conventions\n\n- Always use TDD\n"
+    )
+    conn = init_db(tmp_db)
+    index_all(conn, [str(memory)])
+    before = dict(conn.execute("SELECT hash, rowid FROM chunks").fetchall())
+
+    # Insert a section near the top: later chunks shift down but keep text
+    memory.write_text(
+        "# Memory\n\nIntro text.\n\n"
+        "## Goals\n\n- Ship it\n\n"
+        "## Decisions\n\n- Use SQLite\n\n"
+        "## Conventions\n\n- Prefer simple solutions\n"
+    )
+    stats = index_all(conn, [str(memory)])
+    after = dict(conn.execute("SELECT hash, rowid FROM chunks").fetchall())
+    lines = dict(conn.execute(
+        "SELECT text, start_line FROM chunks"
+    ).fetchall())
+
+    assert stats.chunks_unchanged == 2
+    assert stats.chunks_created == 2
+    assert stats.chunks_deleted == 1
+    kept = set(before) & set(after)
+    assert len(kept) == 2
+    assert all(before[h] == after[h] for h in kept)
+    assert lines["## Decisions\n\n- Use SQLite"] == 9
+    assert conn.execute(
+        "SELECT COUNT(*) FROM chunks_fts WHERE chunks_fts MATCH 'TDD'"
+    ).fetchone()[0] == 0
+    if has_sqlite_vec():
+        assert conn.execute("SELECT COUNT(*) FROM chunks_vec").fetchone()[0] == 4
+    conn.close()
+
+
+def _chunk_rows(conn):
+    """Return sorted (start_line, end_line, text) rows from the chunks table."""
+    return sorted(conn.execute(
+        "SELECT start_line, end_line, text FROM chunks"
+    ).fetchall())
+
+
+def test_index_all_reads_only_appended_tail(tmp_db, tmp_path, monkeypatch):
+    """Appending to a daily log chunks only the tail, matching a full index."""
+    import agent_memory.indexer as indexer
+    from agent_memory.db import init_db
+    from agent_memory.indexer import index_all
+
+    daily_dir = tmp_path / "daily-logs"
+    daily_dir.mkdir()
+    daily = daily_dir / "2026-02-12.md"
+    daily.write_text(
+        "# 2026-02-12\n\n## Session 1\n\n- Morning work\n\n"
+        "## Session 2\n\n- Started lunch review\n"
+    )
+    conn = init_db(tmp_db)
+    index_all(conn, [str(daily)])
+    first = dict(conn.execute("SELECT text, rowid FROM chunks").fetchall())
+
+    chunked: list[str] = []
+    real_chunk = indexer.iter_chunks
+
+    def spy(stream, source_path, **kwargs):
+        lines = list(stream)
+        chunked.append("".join(lines))
+        return real_chunk(lines, source_path, **kwargs)
+
+    monkeypatch.setattr(indexer, "iter_chunks", spy)
+    with daily.open("a") as f:
+        f.write("- Finished lunch review\n\n## Session 3\n\n- Evening\n")
+    stats = index_all(conn, [str(daily)])
+
+    assert stats.files_appended == 1
+    assert chunked == [
+        "## Session 2\n\n- Started lunch review\n"
+        "- Finished lunch review\n\n## Session 3\n\n- Evening\n"
+    ]
+    # Earlier sections kept their rows
+    kept = dict(conn.execute("SELECT text, rowid FROM chunks").fetchall())
+    assert kept["## Session 1\n\n- Morning work"] == first["## Session 1\n\n- Morning work"]
+
+    # Same result as indexing the final file from scratch
+    fresh = init_db(tmp_path / "fresh.db")
+    monkeypatch.setattr(indexer, "iter_chunks", real_chunk)
+    index_all(fresh, [str(daily)])
+    assert _chunk_rows(conn) == _chunk_rows(fresh)
+    fresh.close()
+    conn.close()
+
+
+def test_index_all_rewritten_log_falls_back_to_full(tmp_db, tmp_path):
+    """A daily log whose earlier content changed is re-chunked in full."""
+    from agent_memory.db import init_db
+    from agent_memory.indexer import index_all
+
+    daily_dir = tmp_path / "daily-logs"
+    daily_dir.mkdir()
+    daily = daily_dir / "2026-02-12.md"
+    daily.write_text("# 2026-02-12\n\n## Session 1\n\n- Morning work\n")
+    conn = init_db(tmp_db)
+    index_all(conn, [str(daily)])
+
+    daily.write_text("# 2026-02-12\n\n## Session 1\n\n- Edited morning work\n- More\n")
+    stats = index_all(conn, [str(daily)])
+    texts = {row[0] for row in conn.execute("SELECT text FROM chunks")}
+    conn.close()
+
+    assert stats.files_appended == 0
+    assert stats.files_indexed == 1
+    assert "## Session 1\n\n- Edited morning work\n- More" in texts
+
+
+def test_index_all_warms_up_model_once(tmp_db, sample_memory_dir, monkeypatch):
+    """The model starts loading once new text is found, and not for a no-op run."""
+    import agent_memory.indexer as indexer
+    from agent_memory.db import init_db
+    from agent_memory.indexer import index_all
+
+    calls = []
+    monkeypatch.setattr(indexer, "warm_up", lambda model_name=None: calls.append(1))
+
+    conn = init_db(tmp_db)
+    patterns = [str(sample_memory_dir / "agent-memory" / "*" / "*.md")]
+    index_all(conn, patterns)
+    first = len(calls)
+    index_all(conn, patterns)
+    conn.close()
+
+    assert first == 1
+    assert len(calls) == 1
+
+
+def _model_embedder(monkeypatch, fail_on_call=None):
+    """Fake embedder whose vectors have the dimension of the requested model."""
+    import numpy as np
+
+    import agent_memory.indexer as indexer
+    from agent_memory.config import get_embedding_dim
+
+    calls: list[tuple[str, int]] = []
+
+    def fake_embed(texts, model_name=None):
+        calls.append((model_name, len(texts)))
+        if fail_on_call == len(calls):
+            raise RuntimeError("interrupted")
+        vectors = np.zeros((len(texts), get_embedding_dim(model_name)), dtype=np.float32)
+        vectors[:, 0] = 1.0
+        return vectors
+
+    monkeypatch.setattr(indexer, "embed_texts_array", fake_embed)
+    monkeypatch.setattr(indexer, "warm_up", lambda model_name=None: None)
+    return calls
+
+
+def test_index_all_records_chunk_model(tmp_db, sample_memory_dir, monkeypatch):
+    """Chunks and cache entries are tagged with the model that embedded them."""
+    from agent_memory.config import EMBEDDING_MODEL
+    from agent_memory.db import init_db
+    from agent_memory.indexer import index_all
+
+    calls = _model_embedder(monkeypatch)
+    conn = init_db(tmp_db)
+    index_all(conn, [str(sample_memory_dir / "agent-memory" / "*" / "*.md")])
+    chunk_models = {row[0] for row in conn.execute("SELECT model FROM chunks")}
+    cache_models = {row[0] for row in conn.execute("SELECT model FROM embedding_cache")}
+    conn.close()
+
+    assert chunk_models == cache_models == {EMBEDDING_MODEL}
+    assert {model for model, _ in calls} == {EMBEDDING_MODEL}
+
+
+def test_reembed_switches_model_and_dimension(tmp_db, sample_memory_dir, monkeypatch):
+    """reembed_all embeds every chunk once with the new model, then swaps the index."""
+    from agent_memory.config import EMBEDDING_MODEL
+    from agent_memory.db import has_sqlite_vec, init_db
+    from agent_memory.indexer import index_all, reembed_all
+    from agent_memory.vectors import get_index_dim, get_index_model
+
+    new_model = "BAAI/bge-base-en-v1.5"
+    calls = _model_embedder(monkeypatch)
+    conn = init_db(tmp_db)
+    index_all(conn, [str(sample_memory_dir / "agent-memory" / "*" / "*.md")])
+    total = conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+    calls.clear()
+
+    stats = reembed_all(conn, new_model, batch_size=1)
+    assert stats.previous_model == EMBEDDING_MODEL
+    assert stats.chunks_embedded == total
+    assert stats.batches == total
+    assert {model for model, _ in calls} == {new_model}
+    assert get_index_model(conn) == new_model
+    assert get_index_dim(conn) == 768
+    assert {row[0] for row in conn.execute("SELECT model FROM chunks")} == {new_model}
+    if has_sqlite_vec():
+        assert stats.index_rebuilt
+        assert conn.execute("SELECT COUNT(*) FROM chunks_vec").fetchone()[0] == total
+
+    again = reembed_all(conn, new_model)
+    conn.close()
+    assert (again.chunks_embedded, again.batches, again.index_rebuilt) == (0, 0, False)
+
+
+def test_reembed_resumes_after_interruption(tmp_db, sample_memory_dir, monkeypatch):
+    """An interrupted run keeps finished batches and the old index; a rerun finishes."""
+    import pytest
+
+    from agent_memory.config import EMBEDDING_MODEL
+    from agent_memory.db import init_db
+    from agent_memory.indexer import index_all, reembed_all
+    from agent_memory.vectors import get_index_model
+
+    new_model = "BAAI/bge-base-en-v1.5"
+    _model_embedder(monkeypatch)
+    conn = init_db(tmp_db)
+    index_all(conn, [str(sample_memory_dir / "agent-memory" / "*" / "*.md")])
+    total = conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    _model_embedder(monkeypatch, fail_on_call=2)
+    with pytest.raises(RuntimeError):
+        reembed_all(conn, new_model, batch_size=1)
+    done = conn.execute(
+        "SELECT COUNT(*) FROM chunks WHERE model = ?", (new_model,)
+    ).fetchone()[0]
+    assert done == 1
+    assert get_index_model(conn) == EMBEDDING_MODEL  # search still on the old index
+
+    calls = _model_embedder(monkeypatch)
+    stats = reembed_all(conn, new_model, batch_size=1)
+    conn.close()
+    assert stats.chunks_embedded == total - 1
+    assert len(calls) == total - 1
+
+
+def test_index_all_token_mode_counts_truncation(tmp_db, tmp_path, monkeypatch):
+    """Token mode chunks by the model tokenizer and re-chunks on a mode switch."""
+    from types import SimpleNamespace
+
+    import agent_memory.indexer as indexer
+    from agent_memory.db import init_db, meta_get
+    from agent_memory.indexer import index_all
+
+    class WordTokenizer:
+        def encode_batch(self, texts, add_special_tokens=True):
+            return [SimpleNamespace(ids=text.split()) for text in texts]
+
+    _model_embedder(monkeypatch)
+    monkeypatch.setattr(indexer, "load_tokenizer", lambda model: (WordTokenizer(), 20))
+    (tmp_path / "notes.md").write_text(
+        "".join(f"# Note {i}\nsome words here\n" for i in range(8))
+        + "# Long\n" + "token " * 40 + "\n"
+    )
+    pattern = str(tmp_path / "*.md")
+    conn = init_db(tmp_db)
+
+    monkeypatch.delenv("AGENT_MEMORY_CHUNK_MODE", raising=False)
+    stats = index_all(conn, [pattern])
+    assert stats.chunks_truncated == 0
+    by_chars = conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+    assert by_chars == 9  # one chunk per heading
+
+    monkeypatch.setenv("AGENT_MEMORY_CHUNK_MODE", "tokens")
+    stats = index_all(conn, [pattern])  # unchanged file, but re-chunked
+    assert stats.files_indexed == 1
+    assert stats.chunks_truncated == 1
+    assert conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0] < by_chars
+    assert meta_get(conn, "chunk_mode") == "tokens"
+
+    assert index_all(conn, [pattern]).files_skipped == 1
+    conn.close()
+
+
+
+def test_index_all_content_mode_keeps_ids_and_vectors(tmp_db, tmp_path, monkeypatch):
+    """In content mode an insertion near the top re-embeds only nearby chunks.
+
+    Chunk IDs leave out line numbers, so chunks below the edit keep them.
+    """
+    import random
+
+    from agent_memory.db import init_db
+    from agent_memory.indexer import index_all
+
+    calls = _model_embedder(monkeypatch)
+    monkeypatch.setenv("AGENT_MEMORY_CHUNK_MODE", "content")
+    rng = random.Random(0)
+    words = ["index", "vector", "search", "session", "sqlite", "agent", "deploy"]
+    lines = ["# Log\n"] + [
+        " ".join(rng.choices(words, k=rng.randint(3, 12))) + "\n" for _ in range(1500)
+    ]
+    log = tmp_path / "log.md"
+    log.write_text("".join(lines))
+    conn = init_db(tmp_db)
+    index_all(conn, [str(log)])
+    before = dict(conn.execute("SELECT id, start_line FROM chunks").fetchall())
+
+    log.write_text("".join(lines[:20] + ["a freshly inserted line\n"] + lines[20:]))
+    calls.clear()
+    stats = index_all(conn, [str(log)])
+    after = dict(conn.execute("SELECT id, start_line FROM chunks").fetchall())
+
+    assert stats.chunks_created <= 3
+    assert sum(n for _, n in calls) == stats.chunks_created
+    kept = set(before) & set(after)
+    assert len(kept) >= len(after) - 3
+    assert any(after[i] == before[i] + 1 for i in kept)  # moved down, same ID
+    conn.close()
+
+
+def test_index_all_numbers_repeated_chunks(tmp_db, tmp_path):
+    """Identical chunks in one file get distinct IDs, also across an appended tail."""
+    from agent_memory.db import init_db
+    from agent_memory.indexer import index_all
+
+    log = tmp_path / "sessions" / "repeat.md"
+    log.parent.mkdir()
+    log.write_text("## Step\n\n- retry\n\n## Step\n\n- retry\n")
+    conn = init_db(tmp_db)
+    index_all(conn, [str(log)])
+    with log.open("a") as f:
+        f.write("\n## Step\n\n- retry\n")
+    index_all(conn, [str(log)])
+
+    rows = conn.execute("SELECT id, hash FROM chunks").fetchall()
+    assert len(rows) == 3
+    assert len({h for _, h in rows}) == 1
+    assert len({i for i, _ in rows}) == 3
+    conn.close()
+
+
+def test_index_all_streams_crlf_log_tail(tmp_db, tmp_path):
+    """Tail offsets found while streaming CRLF files match a fresh index."""
+    from agent_memory.db import init_db
+    from agent_memory.indexer import index_all
+
+    session = tmp_path / "sessions" / "crlf.md"
+    session.parent.mkdir()
+    session.write_bytes(
+        "# Session\r\n\r\n## One\r\n\r\n- café notes\r\n\r\n## Two\r\n\r\n- open\r\n"
+        .encode("utf-8")
+    )
+    conn = init_db(tmp_db)
+    index_all(conn, [str(session)])
+    with session.open("ab") as f:
+        f.write(b"- still open\r\n\r\n## Three\r\n\r\n- done\r\n")
+    stats = index_all(conn, [str(session)])
+    assert stats.files_appended == 1
+
+    fresh = init_db(tmp_path / "fresh.db")
+    index_all(fresh, [str(session)])
+    assert _chunk_rows(conn) == _chunk_rows(fresh)
+    for db in (conn, fresh):
+        record = db.execute("SELECT hash, size, tail_offset, tail_line FROM files").fetchone()
+        assert record == fresh.execute(
+            "SELECT hash, size, tail_offset, tail_line FROM files"
+        ).fetchone()
+    data = session.read_bytes()
+    assert data[record[2]:].startswith(b"## Three")
+    fresh.close()
+    conn.close()
+
+
+def test_index_all_content_mode_appends_match_fresh_index(tmp_db, tmp_path, monkeypatch):
+    """In content mode, tail-indexing appended lines gives the chunks of a full index."""
+    import random
+
+    from agent_memory.db import init_db
+    from agent_memory.indexer import index_all
+
+    monkeypatch.setenv("AGENT_MEMORY_CHUNK_MODE", "content")
+    rng = random.Random(1)
+    words = ["index", "vector", "search", "session", "sqlite", "agent", "deploy"]
+    log = tmp_path / "daily-logs" / "2026-03-01.md"
+    log.parent.mkdir()
+    log.write_text("# 2026-03-01\n")
+    conn = init_db(tmp_db)
+    index_all(conn, [str(log)])
+    for _ in range(10):
+        with log.open("a") as f:
+            for _ in range(rng.randint(5, 150)):
+                roll = rng.random()
+                if roll < 0.05:
+                    f.write("\n")
+                elif roll < 0.07:  # some sections end before a split would
+                    f.write(f"## Session {rng.randint(1, 9)}\n")
+                else:
+                    f.write(" ".join(rng.choices(words, k=rng.randint(2, 30))) + "\n")
+        assert index_all(conn, [str(log)]).files_appended == 1
+
+    fresh = init_db(tmp_path / "fresh.db")
+    index_all(fresh, [str(log)])
+    assert len(_chunk_rows(fresh)) > 8
+    assert _chunk_rows(conn) == _chunk_rows(fresh)
+    ids = "SELECT id FROM chunks ORDER BY id"
+    assert conn.execute(ids).fetchall() == fresh.execute(ids).fetchall()
+    fresh.close()
+    conn.close()
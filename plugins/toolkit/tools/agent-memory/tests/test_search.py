@@ -173,3 +173,57 @@ def test_hybrid_search_with_hyphen(tmp_db, sample_memory_dir):
     results = search_hybrid(conn, "sqlite-vec")
     assert isinstance(results, list)
     conn.close()
+
+
+def test_repeated_query_uses_query_cache(tmp_db, sample_memory_dir, monkeypatch):
+    """A repeated hybrid search reuses the cached query vector, skipping the model."""
+    import agent_memory.search as search
+    from agent_memory.db import init_db, has_sqlite_vec
+    from agent_memory.search import search_hybrid
+
+    conn = init_db(tmp_db)
+    if not has_sqlite_vec():
+        conn.close()
+        return
+
+    _index_sample(conn, sample_memory_dir)
+    first = search_hybrid(conn, "FastEmbed embeddings", min_score=0.0)
+
+    def no_model(query):
+        raise AssertionError("query should come from the cache")
+
+    monkeypatch.setattr(search, "embed_query_array", no_model)
+    monkeypatch.setattr(search, "warm_up", no_model)
+    second = search_hybrid(conn, "FastEmbed embeddings", min_score=0.0)
+    conn.close()
+
+    assert first and not any(r.query_cached for r in first)
+    assert [r.chunk_id for r in second] == [r.chunk_id for r in first]
+    assert all(r.query_cached for r in second)
+
+
+def test_search_reports_every_location_or_collapses(tmp_db, tmp_path):
+    """Text pasted into two files is one hit, shown at both places unless collapsed."""
+    from agent_memory.db import init_db
+    from agent_memory.indexer import index_all
+    from agent_memory.search import search_keyword
+
+    plan = "## Plan\n\nMigrate the vector store to quantized int8 tables.\n"
+    (tmp_path / "2026-01-01.md").write_text(plan)
+    (tmp_path / "2026-01-02.md").write_text(plan)
+    (tmp_path / "other.md").write_text("## Other\n\nUnrelated quantized notes.\n")
+    conn = init_db(tmp_db)
+    index_all(conn, [str(tmp_path / "*.md")])
+
+    results = search_keyword(conn, "migrate quantized")
+    assert sorted(r.path for r in results) == [
+        str(tmp_path / "2026-01-01.md"), str(tmp_path / "2026-01-02.md"),
+    ]
+    assert {r.locations for r in results} == {2}
+    assert results[0].score == results[1].score
+
+    collapsed = search_keyword(conn, "migrate quantized", collapse=True)
+    assert len(collapsed) == 1
+    assert collapsed[0].locations == 2
+    assert len(search_keyword(conn, "migrate quantized", limit=1)) == 1
+    conn.close()
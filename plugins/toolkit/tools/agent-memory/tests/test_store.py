@@ -0,0 +1,160 @@
+# ABOUTME: Tests for store module — bulk chunk writes into chunks, FTS, and vec tables.
+# ABOUTME: Verifies rowid mapping, table population, statement counts, deletes, and text dedup.
+
+
+def _rows(n, path="/notes/a.md"):
+    """Build n distinct chunk rows for path."""
+    return [
+        (f"id-{path}-{i}", path, "daily", i + 1, i + 1, f"hash-{i}", "",
+         f"note number {i} about sqlite")
+        for i in range(n)
+    ]
+
+
+def _vectors(n):
+    """Build n unit-ish vectors of the configured dimension."""
+    from agent_memory.config import EMBEDDING_DIM
+
+    return [[1.0 if j == i % EMBEDDING_DIM else 0.0 for j in range(EMBEDDING_DIM)]
+            for i in range(n)]
+
+
+def test_insert_chunks_returns_rowids_in_order(tmp_db):
+    """insert_chunks returns the text id of each row, in input order."""
+    from agent_memory.db import init_db
+    from agent_memory.store import insert_chunks
+
+    conn = init_db(tmp_db)
+    rows = _rows(250)
+    rowids = insert_chunks(conn, rows, _vectors(250))
+
+    stored = dict(conn.execute("SELECT id, text_id FROM chunks").fetchall())
+    conn.close()
+    assert rowids == [stored[row[0]] for row in rows]
+
+
+def test_insert_chunks_populates_fts_and_vec(tmp_db):
+    """Every inserted chunk gets an FTS row and, with sqlite-vec, a vector."""
+    from agent_memory.db import init_db, has_sqlite_vec
+    from agent_memory.store import insert_chunks
+
+    conn = init_db(tmp_db)
+    insert_chunks(conn, _rows(120), _vectors(120))
+
+    assert conn.execute(
+        "SELECT COUNT(*) FROM chunks_fts WHERE chunks_fts MATCH 'sqlite'"
+    ).fetchone()[0] == 120
+    if has_sqlite_vec():
+        assert conn.execute("SELECT COUNT(*) FROM chunks_vec").fetchone()[0] == 120
+    conn.close()
+
+
+def test_insert_chunks_without_vectors(tmp_db):
+    """Passing vectors=None skips the vec table."""
+    from agent_memory.db import init_db, has_sqlite_vec
+    from agent_memory.store import insert_chunks
+
+    conn = init_db(tmp_db)
+    insert_chunks(conn, _rows(3), None)
+    if has_sqlite_vec():
+        assert conn.execute("SELECT COUNT(*) FROM chunks_vec").fetchone()[0] == 0
+    conn.close()
+
+
+def test_insert_chunks_uses_few_statements(tmp_db):
+    """Writing 200 chunks issues a handful of top-level statements, not 800."""
+    from agent_memory.db import init_db
+    from agent_memory.store import insert_chunks
+
+    conn = init_db(tmp_db)
+    statements: list[str] = []
+    conn.set_trace_callback(statements.append)
+    insert_chunks(conn, _rows(200), _vectors(200))
+    conn.set_trace_callback(None)
+    conn.close()
+
+    # Nested statements run by FTS5/vec0 internals are prefixed with "--"
+    top_level = [s for s in statements if not s.startswith("--") and s != "BEGIN "]
+    assert len(top_level) <= 8
+
+
+def test_delete_chunk_rows(tmp_db):
+    """delete_chunk_rows removes chunks with their FTS and vec entries."""
+    from agent_memory.db import init_db, has_sqlite_vec
+    from agent_memory.store import delete_chunk_rows, insert_chunks
+
+    conn = init_db(tmp_db)
+    insert_chunks(conn, _rows(5), _vectors(5))
+    rowids = [row[0] for row in conn.execute("SELECT rowid FROM chunks WHERE start_line <= 3")]
+    delete_chunk_rows(conn, rowids)
+
+    assert conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0] == 2
+    assert conn.execute(
+        "SELECT COUNT(*) FROM chunks_fts WHERE chunks_fts MATCH 'sqlite'"
+    ).fetchone()[0] == 2
+    if has_sqlite_vec():
+        assert conn.execute("SELECT COUNT(*) FROM chunks_vec").fetchone()[0] == 2
+    conn.close()
+
+
+def test_insert_chunks_stores_repeated_text_once(tmp_db):
+    """Text repeated across files gets one text row, FTS row, and vector, and every location."""
+    from agent_memory.db import init_db, has_sqlite_vec
+    from agent_memory.store import insert_chunks
+
+    conn = init_db(tmp_db)
+    first = insert_chunks(conn, _rows(3, "/notes/a.md"), _vectors(3))
+    second = insert_chunks(conn, _rows(3, "/notes/b.md") + _rows(1, "/notes/c.md"), _vectors(4))
+
+    assert second == first + first[:1]
+    assert conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0] == 7
+    assert conn.execute("SELECT COUNT(*) FROM chunk_texts").fetchone()[0] == 3
+    assert conn.execute(
+        "SELECT COUNT(*) FROM chunks_fts WHERE chunks_fts MATCH 'sqlite'"
+    ).fetchone()[0] == 3
+    if has_sqlite_vec():
+        assert conn.execute("SELECT COUNT(*) FROM chunks_vec").fetchone()[0] == 3
+    conn.close()
+
+
+def test_delete_chunk_rows_keeps_shared_text(tmp_db):
+    """Text outlives a deleted location while another location still uses it."""
+    from agent_memory.db import init_db, has_sqlite_vec
+    from agent_memory.store import delete_chunk_rows, insert_chunks
+
+    conn = init_db(tmp_db)
+    insert_chunks(conn, _rows(2, "/notes/a.md") + _rows(1, "/notes/b.md"), _vectors(3))
+
+    def locations(path):
+        return [r[0] for r in conn.execute("SELECT rowid FROM chunks WHERE path = ?", (path,))]
+
+    delete_chunk_rows(conn, locations("/notes/a.md"))
+    assert conn.execute("SELECT text FROM chunk_texts").fetchall() == [
+        ("note number 0 about sqlite",)
+    ]
+    if has_sqlite_vec():
+        assert conn.execute("SELECT COUNT(*) FROM chunks_vec").fetchone()[0] == 1
+
+    delete_chunk_rows(conn, locations("/notes/b.md"))
+    assert conn.execute("SELECT COUNT(*) FROM chunk_texts").fetchone()[0] == 0
+    assert conn.execute(
+        "SELECT COUNT(*) FROM chunks_fts WHERE chunks_fts MATCH 'sqlite'"
+    ).fetchone()[0] == 0
+    conn.close()
+
+
+def test_insert_chunks_replacing_id_drops_old_text(tmp_db):
+    """Re-inserting a chunk ID with new text removes the text it pointed at."""
+    from agent_memory.db import init_db
+    from agent_memory.store import insert_chunks
+
+    conn = init_db(tmp_db)
+    insert_chunks(conn, _rows(1), _vectors(1))
+    changed = [("id-/notes/a.md-0", "/notes/a.md", "daily", 1, 1, "hash-new", "", "rewritten")]
+    insert_chunks(conn, changed, _vectors(1))
+
+    assert conn.execute("SELECT id, text FROM chunks").fetchall() == [
+        ("id-/notes/a.md-0", "rewritten")
+    ]
+    assert conn.execute("SELECT COUNT(*) FROM chunk_texts").fetchone()[0] == 1
+    conn.close()
@@ -0,0 +1,259 @@
+# ABOUTME: Tests for vectors module — float/int8/bit chunks_vec storage and KNN.
+# ABOUTME: Verifies quantization, PCA projection, two-stage re-ranking, and in-place conversion.
+
+import pytest
+
+
+def _random_vectors(n, seed=0):
+    import numpy as np
+
+    from agent_memory.config import EMBEDDING_DIM
+
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, EMBEDDING_DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _populate(conn, vectors):
+    """Store one chunk per vector, caching the float32 vectors like the indexer does."""
+    from agent_memory.cache import cache_store
+    from agent_memory.store import insert_chunks
+
+    rows = [
+        (f"id-{i}", "/notes/a.md", "daily", i, i, f"hash-{i}", "", f"chunk {i}")
+        for i in range(len(vectors))
+    ]
+    cache_store(conn, {f"hash-{i}": v for i, v in enumerate(vectors)})
+    rowids = insert_chunks(conn, rows, vectors)
+    conn.commit()
+    return rowids
+
+
+def _vec_db(tmp_db, monkeypatch, quantization):
+    from agent_memory.db import has_sqlite_vec, init_db
+
+    if not has_sqlite_vec():
+        pytest.skip("sqlite-vec not installed")
+    monkeypatch.setenv("AGENT_MEMORY_VEC_QUANTIZATION", quantization)
+    return init_db(tmp_db)
+
+
+def test_quantize_int8_uses_full_range():
+    """int8 rows are scaled per vector so the largest component is ±127."""
+    import numpy as np
+
+    from agent_memory.vectors import quantize
+
+    q = quantize(np.array([[0.01, -0.02, 0.005]]), "int8")
+    assert q.dtype == np.int8
+    assert q.tolist() == [[64, -127, 32]]
+
+
+def test_quantize_bit_packs_signs():
+    """bit rows keep one sign bit per dimension."""
+    import numpy as np
+
+    from agent_memory.vectors import quantize
+
+    q = quantize(np.array([1, -1, 1, -1, -1, -1, -1, 1, 1], dtype=np.float32), "bit")
+    assert q.tolist() == [0b10100001, 0b10000000]
+
+
+def test_new_db_records_quantization(tmp_db, monkeypatch):
+    """AGENT_MEMORY_VEC_QUANTIZATION picks the layout of a new database."""
+    from agent_memory.vectors import get_quantization
+
+    conn = _vec_db(tmp_db, monkeypatch, "bit")
+    assert get_quantization(conn) == "bit"
+    sql = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE name = 'chunks_vec'"
+    ).fetchone()[0]
+    conn.close()
+    assert "bit[" in sql
+
+
+@pytest.mark.parametrize("quantization", ["int8", "bit"])
+def test_quantized_knn_reranks_with_float(tmp_db, monkeypatch, quantization):
+    """Quantized KNN returns exact float32 cosine scores for the shortlist."""
+    import numpy as np
+
+    from agent_memory.vectors import knn
+
+    conn = _vec_db(tmp_db, monkeypatch, quantization)
+    vectors = _random_vectors(200)
+    rowids = _populate(conn, vectors)
+
+    query = vectors[17] + 0.05 * _random_vectors(1, seed=1)[0]
+    results = knn(conn, query, 5)
+    conn.close()
+
+    exact = vectors @ query / np.linalg.norm(query)
+    assert results[0][0] == rowids[17]
+    assert results[0][1] == pytest.approx(float(exact[17]), abs=1e-5)
+    assert [s for _, s in results] == sorted((s for _, s in results), reverse=True)
+
+
+def test_quantized_knn_without_cache_uses_approximate_scores(tmp_db, monkeypatch):
+    """Chunks missing from the embedding cache keep their quantized score."""
+    from agent_memory.vectors import knn
+
+    conn = _vec_db(tmp_db, monkeypatch, "int8")
+    vectors = _random_vectors(20)
+    rowids = _populate(conn, vectors)
+    conn.execute("DELETE FROM embedding_cache")
+
+    results = knn(conn, vectors[3], 3)
+    conn.close()
+    assert results[0][0] == rowids[3]
+    assert results[0][1] == pytest.approx(1.0, abs=0.01)
+
+
+def test_rebuild_vec_table_converts_in_place(tmp_db, monkeypatch):
+    """Converting float → int8 → float keeps every vector searchable."""
+    from agent_memory.vectors import get_quantization, knn, rebuild_vec_table
+
+    conn = _vec_db(tmp_db, monkeypatch, "float")
+    vectors = _random_vectors(50)
+    rowids = _populate(conn, vectors)
+
+    assert rebuild_vec_table(conn, "int8") == 50
+    assert get_quantization(conn) == "int8"
+    assert knn(conn, vectors[9], 1)[0][0] == rowids[9]
+
+    rebuild_vec_table(conn, "float")
+    count = conn.execute("SELECT COUNT(*) FROM chunks_vec").fetchone()[0]
+    top = knn(conn, vectors[9], 1)[0][0]
+    conn.close()
+    assert count == 50
+    assert top == rowids[9]
+
+
+def test_rebuild_rejects_unknown_type(tmp_db, monkeypatch):
+    """Unknown storage types fail before touching the index."""
+    from agent_memory.vectors import rebuild_vec_table
+
+    conn = _vec_db(tmp_db, monkeypatch, "float")
+    with pytest.raises(ValueError):
+        rebuild_vec_table(conn, "int4")
+    count = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE name = 'chunks_vec'"
+    ).fetchone()[0]
+    conn.close()
+    assert count == 1
+
+
+def _low_rank_vectors(n, rank=16, seed=0):
+    """Unit vectors near a rank-dimensional subspace, like real embeddings."""
+    import numpy as np
+
+    from agent_memory.config import EMBEDDING_DIM
+
+    rng = np.random.default_rng(seed)
+    basis = rng.standard_normal((rank, EMBEDDING_DIM))
+    vectors = rng.standard_normal((n, rank)) @ basis
+    vectors += 0.01 * rng.standard_normal((n, EMBEDDING_DIM))
+    vectors = vectors.astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_fit_pca_finds_principal_axes():
+    """fit_pca recovers the mean and the highest-variance axes from batches."""
+    import numpy as np
+
+    from agent_memory.vectors import fit_pca
+
+    rng = np.random.default_rng(0)
+    rows = np.zeros((1000, 4), dtype=np.float32)
+    rows[:, 0] = 5.0 * rng.standard_normal(1000) + 1.0
+    rows[:, 2] = 2.0 * rng.standard_normal(1000)
+    rows[:, [1, 3]] = 0.1 * rng.standard_normal((1000, 2))
+
+    mean, components = fit_pca(iter([rows[:400], rows[400:]]), 2)
+    assert mean == pytest.approx(rows.mean(axis=0), abs=1e-4)
+    assert np.abs(components[0]) == pytest.approx([1, 0, 0, 0], abs=0.05)
+    assert np.abs(components[1]) == pytest.approx([0, 0, 1, 0], abs=0.05)
+    with pytest.raises(ValueError):
+        fit_pca(iter([rows]), 4)
+
+
+def test_pca_knn_reranks_with_full_vectors(tmp_db, monkeypatch):
+    """The reduced index finds the neighbours; scores are exact full cosine."""
+    import numpy as np
+
+    from agent_memory.vectors import build_projection, get_projection, knn
+
+    conn = _vec_db(tmp_db, monkeypatch, "float")
+    vectors = _low_rank_vectors(300)
+    rowids = _populate(conn, vectors)
+    assert build_projection(conn, 32) == 300
+    assert get_projection(conn)[1].shape == (32, vectors.shape[1])
+
+    query = _low_rank_vectors(1, seed=0)[0]
+    results = knn(conn, query, 5)
+    conn.close()
+
+    exact = vectors @ query
+    expected = np.argsort(-exact)[:5]
+    assert [rowid for rowid, _ in results] == [rowids[i] for i in expected]
+    assert results[0][1] == pytest.approx(float(exact[expected[0]]), abs=1e-5)
+
+
+def test_pca_index_follows_writes(tmp_db, monkeypatch):
+    """Chunks added or deleted after fitting are kept in the PCA index."""
+    from agent_memory.store import delete_chunk_rows, insert_chunks
+    from agent_memory.vectors import (
+        build_projection,
+        drop_projection,
+        get_projection,
+        knn,
+    )
+
+    conn = _vec_db(tmp_db, monkeypatch, "float")
+    vectors = _low_rank_vectors(60)
+    _populate(conn, vectors[:50])
+    build_projection(conn, 8)
+
+    rows = [
+        (f"late-{i}", "/notes/b.md", "daily", i, i, f"late-hash-{i}", "", f"late {i}")
+        for i in range(10)
+    ]
+    late = insert_chunks(conn, rows, vectors[50:])
+    assert conn.execute("SELECT COUNT(*) FROM chunks_vec_pca").fetchone()[0] == 60
+    assert knn(conn, vectors[55], 1)[0][0] == late[5]
+
+    delete_chunk_rows(conn, [
+        row[0] for row in conn.execute("SELECT rowid FROM chunks WHERE path = '/notes/b.md'")
+    ])
+    assert conn.execute("SELECT COUNT(*) FROM chunks_vec_pca").fetchone()[0] == 50
+
+    drop_projection(conn)
+    conn.commit()
+    assert get_projection(conn) is None
+    assert len(knn(conn, vectors[0], 3)) == 3
+    conn.close()
+
+
+def test_rebuild_caches_vectors_of_legacy_db(tmp_db, monkeypatch):
+    """Converting a database whose vectors are only in chunks_vec doesn't re-embed."""
+    import agent_memory.embedder as embedder
+    from agent_memory.vectors import get_quantization, knn, rebuild_vec_table
+
+    conn = _vec_db(tmp_db, monkeypatch, "float")
+    vectors = _random_vectors(30)
+    rowids = _populate(conn, vectors)
+    # As migrated from a database that had no embedding cache yet
+    conn.execute("DELETE FROM embedding_cache")
+    conn.commit()
+
+    def no_model(*args, **kwargs):
+        raise AssertionError("conversion should not embed")
+
+    monkeypatch.setattr(embedder, "embed_texts_array", no_model)
+    assert rebuild_vec_table(conn, "int8") == 30
+    assert get_quantization(conn) == "int8"
+    assert conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0] == 30
+    assert knn(conn, vectors[7], 1)[0][0] == rowids[7]
+
+    rebuild_vec_table(conn, "float")  # back again, from the cache alone
+    assert knn(conn, vectors[7], 1)[0][0] == rowids[7]
+    conn.close()